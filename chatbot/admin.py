@@ -1,17 +1,24 @@
 from django.contrib import admin
-from .models import Document, ChatLog, VectorStat
+from .models import Document, ChatLog, VectorStat, IngestionJob
 
 @admin.register(Document)
 class DocumentAdmin(admin.ModelAdmin):
-    list_display = ("id", "name", "file_type", "uploaded_at", "embedded", "num_chunks")
-    list_filter = ("file_type", "embedded")
-    search_fields = ("name",)
+    list_display = ("id", "name", "namespace", "file_type", "uploaded_at", "embedded", "num_chunks", "size_bytes")
+    list_filter = ("namespace", "file_type", "embedded")
+    search_fields = ("name", "content_hash")
 
 @admin.register(ChatLog)
 class ChatLogAdmin(admin.ModelAdmin):
     list_display = ("id", "created_at",)
-    readonly_fields = ("question", "answer", "sources", "created_at")
+    ordering = ("-created_at", "-id")
+    readonly_fields = ("question", "answer", "sources", "timings", "created_at")
 
 @admin.register(VectorStat)
 class VectorStatAdmin(admin.ModelAdmin):
     list_display = ("key", "value", "updated_at")
+
+@admin.register(IngestionJob)
+class IngestionJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "doc_name", "status", "stage", "progress", "num_chunks", "created_at", "finished_at")
+    list_filter = ("status",)
+    readonly_fields = ("error",)
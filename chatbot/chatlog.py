@@ -0,0 +1,149 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from django.conf import settings
+from django.db import OperationalError, close_old_connections
+from django.utils import timezone
+from .models import ChatLog
+from .utils import metrics
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+class ChatLogWriter:
+    """
+    Background sink for ChatLog rows. Records are queued in memory and a
+    single thread writes them with bulk_create once `batch_size` are
+    waiting or `interval` seconds have passed, so answering never waits on
+    SQLite's writer lock. A full queue blocks the caller for at most
+    `put_timeout` seconds, then the record is dropped and counted.
+    """
+
+    def __init__(self, batch_size: int = 100, interval: float = 1.0, max_queue: int = 10000,
+                 put_timeout: float = 0.5):
+        self.batch_size = max(1, batch_size)
+        self.interval = max(0.01, interval)
+        self.put_timeout = max(0.0, put_timeout)
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, max_queue))
+        self._thread = threading.Thread(target=self._run, name="chatlog-writer", daemon=True)
+        self._thread.start()
+
+    def put(self, row: ChatLog) -> bool:
+        """Queue an unsaved ChatLog. False when it was dropped because the queue stayed full."""
+        try:
+            self._queue.put(row, timeout=self.put_timeout)
+            return True
+        except queue.Full:
+            metrics.inc("chatlog_rows_total", result="dropped")
+            logger.warning(f"ChatLog queue full ({self._queue.maxsize}), dropping a record")
+            return False
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until everything queued so far is written. False on timeout."""
+        deadline = time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, timeout: float = 5.0):
+        """Write what is queued and stop the thread."""
+        if not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.error(f"ChatLog writer could not stop cleanly, {self._queue.qsize()} records lost")
+            return
+        self._thread.join(timeout)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    self._queue.task_done()
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, batch: List[ChatLog]):
+        close_old_connections()
+        try:
+            for attempt in range(3):
+                try:
+                    ChatLog.objects.bulk_create(batch, batch_size=self.batch_size)
+                    metrics.inc("chatlog_rows_total", len(batch), result="written")
+                    return
+                except OperationalError as e:
+                    # "database is locked": back off and retry the whole batch
+                    if attempt == 2:
+                        raise
+                    logger.warning(f"ChatLog flush of {len(batch)} rows failed ({e}), retrying")
+                    time.sleep(0.2 * (attempt + 1))
+        except Exception as e:
+            metrics.inc("chatlog_rows_total", len(batch), result="failed")
+            logger.error(f"Failed to write {len(batch)} ChatLog rows: {e}")
+        finally:
+            close_old_connections()
+
+_WRITER: Optional[ChatLogWriter] = None
+_WRITER_PID = 0
+_LOCK = threading.Lock()
+
+def get_writer() -> Optional[ChatLogWriter]:
+    """The process-wide writer (restarted after fork), or None when CHATLOG_ASYNC is off."""
+    global _WRITER, _WRITER_PID
+    if not getattr(settings, "CHATLOG_ASYNC", True):
+        return None
+    if _WRITER is None or _WRITER_PID != os.getpid():
+        with _LOCK:
+            if _WRITER is None or _WRITER_PID != os.getpid():
+                _WRITER = ChatLogWriter(
+                    batch_size=int(getattr(settings, "CHATLOG_BATCH_SIZE", 100)),
+                    interval=float(getattr(settings, "CHATLOG_FLUSH_INTERVAL", 1.0)),
+                    max_queue=int(getattr(settings, "CHATLOG_MAX_QUEUE", 10000)),
+                    put_timeout=float(getattr(settings, "CHATLOG_PUT_TIMEOUT", 0.5)),
+                )
+                _WRITER_PID = os.getpid()
+                atexit.register(_WRITER.close)
+    return _WRITER
+
+def log_chat(question: str, answer: str, sources: List[Dict[str, Any]], timings: Optional[Dict[str, float]] = None):
+    """Record one answered question, through the background writer when enabled."""
+    row = ChatLog(question=question, answer=answer, sources=sources, timings=timings or {},
+                  created_at=timezone.now())
+    writer = get_writer()
+    if writer is not None:
+        writer.put(row)
+        return
+    try:
+        row.save()
+    except Exception as e:
+        logger.error(f"Failed to write ChatLog: {e}")
@@ -0,0 +1,171 @@
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from .models import Document, VectorStat
+
+logger = logging.getLogger(__name__)
+
+# Corpus counters live in VectorStat rows so every worker sees the same
+# numbers; they are adjusted when a document is indexed or removed instead
+# of being recounted. Keys:
+#   chunks, docs, bytes                      corpus totals
+#   type:<file_type>                         documents per file type
+#   ns:<namespace>:{chunks,docs,bytes}       per-namespace totals
+_TOTALS = ("chunks", "docs", "bytes")
+
+_LOCK = threading.Lock()
+_CACHED: Optional[Dict[str, Any]] = None
+_CACHED_AT = 0.0
+
+def _invalidate():
+    global _CACHED
+    with _LOCK:
+        _CACHED = None
+
+def _add(deltas: Dict[str, int]):
+    """Atomically add `deltas` to their counters, creating missing rows."""
+    with transaction.atomic():
+        for key, delta in deltas.items():
+            if not delta:
+                continue
+            if VectorStat.objects.filter(key=key).update(value=F("value") + delta):
+                continue
+            try:
+                with transaction.atomic():
+                    VectorStat.objects.create(key=key, value=delta)
+            except IntegrityError:
+                # Another worker created it first
+                VectorStat.objects.filter(key=key).update(value=F("value") + delta)
+    _invalidate()
+
+def _apply(deltas: Dict[str, int]):
+    # Counters that were never built (fresh database or upgrade) start from a full recount
+    if not VectorStat.objects.filter(key="docs").exists():
+        rebuild()
+    else:
+        _add(deltas)
+
+def _doc_deltas(namespace: str, file_type: str, chunks: int, size: int, docs: int) -> Dict[str, int]:
+    ns = f"ns:{namespace}:"
+    return {
+        "chunks": chunks, "docs": docs, "bytes": size,
+        f"type:{file_type}": docs,
+        f"{ns}chunks": chunks, f"{ns}docs": docs, f"{ns}bytes": size,
+    }
+
+def _merge(a: Dict[str, int], b: Dict[str, int]) -> Dict[str, int]:
+    out = dict(a)
+    for k, v in b.items():
+        out[k] = out.get(k, 0) + v
+    return out
+
+def record_indexed(doc: Document, previous: Optional[Dict[str, Any]] = None):
+    """
+    Count a document that finished indexing.
+
+    Args:
+        doc: Document with its new num_chunks, size_bytes and file_type saved
+        previous: snapshot() of the document before re-indexing; the old
+            version is subtracted when it was already counted
+    """
+    deltas = _doc_deltas(doc.namespace, doc.file_type, doc.num_chunks, doc.size_bytes, 1)
+    if previous and previous["embedded"]:
+        deltas = _merge(deltas, _doc_deltas(previous["namespace"], previous["file_type"],
+                                            -previous["num_chunks"], -previous["size_bytes"], -1))
+    try:
+        _apply(deltas)
+    except Exception as e:
+        logger.error(f"Failed to update corpus counters for doc {doc.id}: {e}")
+
+def record_removed(doc: Document):
+    """Uncount a document after doc.delete()."""
+    if not doc.embedded:
+        return
+    try:
+        _apply(_doc_deltas(doc.namespace, doc.file_type, -doc.num_chunks, -doc.size_bytes, -1))
+    except Exception as e:
+        logger.error(f"Failed to update corpus counters for '{doc.name}': {e}")
+
+def snapshot(doc: Document) -> Dict[str, Any]:
+    """The counted fields of a document, taken before it is re-indexed."""
+    return {
+        "embedded": doc.embedded,
+        "namespace": doc.namespace,
+        "file_type": doc.file_type,
+        "num_chunks": doc.num_chunks,
+        "size_bytes": doc.size_bytes,
+    }
+
+def rebuild(backfill_sizes: bool = False) -> Dict[str, Any]:
+    """
+    Recompute every counter from the Document table.
+
+    Args:
+        backfill_sizes: Stat the stored files of indexed documents that have
+            no size_bytes yet (documents indexed before sizes were tracked)
+    """
+    indexed = Document.objects.filter(embedded=True)
+    if backfill_sizes:
+        for doc in indexed.filter(size_bytes=0).only("id", "file").iterator():
+            try:
+                size = doc.file.size
+            except Exception as e:
+                logger.warning(f"Cannot stat file of doc {doc.id}: {e}")
+                continue
+            Document.objects.filter(id=doc.id).update(size_bytes=size)
+
+    counters: Dict[str, int] = {k: 0 for k in _TOTALS}
+    for row in indexed.values("namespace", "file_type").annotate(
+        docs=Count("id"), chunks=Sum("num_chunks"), size=Sum("size_bytes")
+    ):
+        counters = _merge(counters, _doc_deltas(row["namespace"], row["file_type"],
+                                                row["chunks"] or 0, row["size"] or 0, row["docs"]))
+
+    with transaction.atomic():
+        VectorStat.objects.all().delete()
+        VectorStat.objects.bulk_create([VectorStat(key=k, value=v) for k, v in counters.items()])
+    _invalidate()
+    return corpus_stats(fresh=True)
+
+def _shape(rows: Dict[str, int]) -> Dict[str, Any]:
+    out: Dict[str, Any] = {
+        "chunks": rows.get("chunks", 0),
+        "documents": rows.get("docs", 0),
+        "bytes": rows.get("bytes", 0),
+        "types": {},
+        "namespaces": {},
+    }
+    for key, value in rows.items():
+        if key.startswith("type:"):
+            if value:
+                out["types"][key[5:]] = value
+        elif key.startswith("ns:"):
+            ns, _, field = key[3:].rpartition(":")
+            out["namespaces"].setdefault(ns, {"chunks": 0, "documents": 0, "bytes": 0})
+            out["namespaces"][ns]["documents" if field == "docs" else field] = value
+    out["namespaces"] = {ns: v for ns, v in out["namespaces"].items() if v["documents"]}
+    return out
+
+def corpus_stats(fresh: bool = False) -> Dict[str, Any]:
+    """
+    Corpus totals plus per-type and per-namespace counts, served from a
+    per-process cache for CORPUS_STATS_TTL seconds. The first call on a
+    database without counters builds them from the Document table.
+    """
+    global _CACHED, _CACHED_AT
+    ttl = float(getattr(settings, "CORPUS_STATS_TTL", 5) or 0)
+    with _LOCK:
+        if not fresh and _CACHED is not None and time.monotonic() - _CACHED_AT < ttl:
+            return _CACHED
+
+    rows = dict(VectorStat.objects.values_list("key", "value"))
+    if "docs" not in rows:
+        return rebuild()
+    result = _shape(rows)
+    with _LOCK:
+        _CACHED, _CACHED_AT = result, time.monotonic()
+    return result
@@ -1,13 +1,20 @@
 from django import forms
 from .models import Document
+from .utils.vectorstore import normalize_namespace
 
 class DocumentUploadForm(forms.ModelForm):
     class Meta:
         model = Document
-        fields = ["file"]
+        fields = ["file", "namespace"]
 
     def clean_file(self):
         f = self.cleaned_data["file"]
         if f.size > 1024 * 1024 * 25:
             raise forms.ValidationError("File too large (max 25MB).")
         return f
+
+    def clean_namespace(self):
+        try:
+            return normalize_namespace(self.cleaned_data.get("namespace"))
+        except ValueError as e:
+            raise forms.ValidationError(str(e))
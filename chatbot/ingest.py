@@ -0,0 +1,161 @@
+import hashlib
+import logging
+from typing import Callable, Iterable, Iterator, Optional
+from django.conf import settings
+from django.db import transaction
+from django.db.models.fields.files import FieldFile
+from .models import Document
+from .utils.file_io import extract_text, extract_text_stream, pdf_page_count
+from .utils.text_splitter import chunk_blocks, chunk_stream
+from .utils.vectorstore import upsert_chunks, upsert_chunk_stream, delete_doc
+from .utils import metrics
+from . import corpus_stats
+
+logger = logging.getLogger(__name__)
+
+ProgressCallback = Callable[[str, float], None]
+
+class DocumentRemoved(Exception):
+    """The document was deleted while it was being indexed."""
+
+def _noop(stage: str, progress: float):
+    pass
+
+def _chunk(fragments: Iterable[str]) -> Iterator[str]:
+    """Chunk text fragments with the configured CHUNKER ("tokens" or "chars")."""
+    if (getattr(settings, "CHUNKER", "tokens") or "tokens").lower() == "chars":
+        return chunk_stream(fragments)
+    return chunk_blocks(
+        fragments,
+        max_tokens=int(getattr(settings, "CHUNK_MAX_TOKENS", 256)),
+        overlap_tokens=int(getattr(settings, "CHUNK_OVERLAP_TOKENS", 32)),
+        min_tokens=int(getattr(settings, "CHUNK_MIN_TOKENS", 12)),
+    )
+
+def content_hash(f) -> str:
+    """SHA-256 of an uploaded or stored file, read in chunks."""
+    h = hashlib.sha256()
+    for block in f.chunks():
+        h.update(block)
+    f.seek(0)
+    return h.hexdigest()
+
+def _ingest_buffered(doc: Document, path: str, report: ProgressCallback, incremental: bool) -> int:
+    report("extracting", 0.05)
+    text, ftype = extract_text(path)
+    doc.file_type = ftype
+
+    # Validate extracted text is not empty
+    if not text or len(text.strip()) < 10:
+        raise ValueError(f"Document '{doc.name}' contains no readable text or is too short (extracted {len(text)} chars)")
+
+    report("chunking", 0.3)
+    with metrics.span("chunk"):
+        chunks = list(_chunk([text]))
+
+    # Validate chunks were created
+    if not chunks:
+        raise ValueError(f"Failed to create chunks from document '{doc.name}'. Text length: {len(text)}")
+
+    report("embedding", 0.4)
+    meta = {"doc_id": str(doc.id), "doc_name": doc.name, "namespace": doc.namespace}
+    return upsert_chunks(doc_id=meta["doc_id"], chunks=chunks, metadoc=meta, incremental=incremental,
+                         namespace=doc.namespace)
+
+def _ingest_streaming(doc: Document, path: str, report: ProgressCallback, incremental: bool) -> int:
+    """Page-by-page extract -> chunk -> windowed embed/upsert; memory is bounded by the window."""
+    report("extracting", 0.05)
+    fragments, ftype = extract_text_stream(path)
+    doc.file_type = ftype
+    total_pages = pdf_page_count(path) if ftype == "pdf" else 0
+    seen = 0
+
+    def counted() -> Iterator[str]:
+        nonlocal seen
+        for frag in fragments:
+            seen += 1
+            yield frag
+
+    def on_window(n: int):
+        frac = min(1.0, seen / total_pages) if total_pages else 0.5
+        report("embedding", 0.1 + 0.85 * frac)
+
+    meta = {"doc_id": str(doc.id), "doc_name": doc.name, "namespace": doc.namespace}
+    try:
+        n = upsert_chunk_stream(meta["doc_id"], _chunk(counted()), meta,
+                                on_window=on_window, incremental=incremental,
+                                namespace=doc.namespace)
+    except Exception:
+        # Drop whatever windows already landed so a failed upload leaves no vectors behind;
+        # an update has already rolled back to the previous version
+        if not incremental:
+            delete_doc(meta["doc_id"], doc.namespace)
+        raise
+
+    if n == 0:
+        raise ValueError(f"Document '{doc.name}' contains no readable text or is too short")
+    return n
+
+@metrics.timed("ingest")
+def ingest_document(doc: Document, on_progress: Optional[ProgressCallback] = None,
+                    incremental: bool = False, source: Optional[FieldFile] = None) -> int:
+    """
+    Extract, chunk, embed and upsert a stored document.
+
+    Uses the streaming pipeline when INGEST_STREAMING is on, otherwise
+    materializes the full text and chunk list first.
+
+    Args:
+        doc: Document whose file has already been saved
+        on_progress: Optional callback receiving (stage, fraction complete)
+        incremental: Only embed chunks that changed since the document was
+            last indexed and delete chunks that disappeared
+        source: Stored file to index instead of doc.file (the staged new
+            version of an update); it replaces doc.file once indexed
+
+    Returns:
+        Number of chunks indexed
+
+    Raises:
+        ValueError: If the document has no usable text
+        DocumentRemoved: If the document was deleted during ingestion; the
+            chunks written for it are removed again
+    """
+    report = on_progress or _noop
+    source = source or doc.file
+    path = source.path
+    previous = corpus_stats.snapshot(doc)
+
+    if getattr(settings, "INGEST_STREAMING", True):
+        n = _ingest_streaming(doc, path, report, incremental)
+    else:
+        n = _ingest_buffered(doc, path, report, incremental)
+
+    report("finalizing", 0.95)
+    doc.num_chunks = n
+    doc.embedded = True
+    try:
+        doc.size_bytes = source.size
+    except Exception as e:
+        logger.warning(f"Cannot stat file of doc {doc.id}: {e}")
+    replaced = doc.file.name if doc.file.name != source.name else ""
+    doc.file.name = source.name
+    # remove_document deletes the row under the same lock before dropping its
+    # chunks: saving without the row would re-insert it, and the chunks
+    # upserted since it was removed would stay searchable
+    with transaction.atomic():
+        if not Document.objects.select_for_update().filter(id=doc.id).exists():
+            removed = True
+        else:
+            removed = False
+            doc.save()
+            corpus_stats.record_indexed(doc, previous)
+    if removed:
+        delete_doc(str(doc.id), doc.namespace)
+        raise DocumentRemoved(f"Document '{doc.name}' was removed during ingestion")
+    if replaced:
+        try:
+            doc.file.storage.delete(replaced)
+        except Exception as e:
+            logger.warning(f"Cannot delete previous file of doc {doc.id}: {e}")
+    return n
@@ -0,0 +1,189 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Optional, Set
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Document, IngestionJob
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = (IngestionJob.STATUS_QUEUED, IngestionJob.STATUS_RUNNING)
+
+_EXECUTOR = None
+_EXECUTOR_LOCK = threading.Lock()
+# Jobs queued or running in this process. Their rows are touched every
+# INGEST_HEARTBEAT seconds; an active row that goes quiet for
+# INGEST_STALE_AFTER seconds belonged to a worker that died or restarted.
+_OWNED: Set[int] = set()
+_LAST_RECOVERY = 0.0
+
+def _heartbeat_interval() -> float:
+    return max(1.0, float(getattr(settings, "INGEST_HEARTBEAT", 15) or 15))
+
+def _executor() -> ThreadPoolExecutor:
+    """Process-local worker pool that runs ingestion outside the request thread."""
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        with _EXECUTOR_LOCK:
+            if _EXECUTOR is None:
+                workers = max(1, int(getattr(settings, "INGEST_WORKERS", 2) or 1))
+                _EXECUTOR = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest")
+                threading.Thread(target=_heartbeat, name="ingest-heartbeat", daemon=True).start()
+                logger.info(f"Ingestion worker pool started with {workers} workers")
+    return _EXECUTOR
+
+def _enqueue(job_id: int):
+    with _EXECUTOR_LOCK:
+        _OWNED.add(job_id)
+    _executor().submit(run_job, job_id)
+
+def _heartbeat():
+    while True:
+        time.sleep(_heartbeat_interval())
+        with _EXECUTOR_LOCK:
+            owned = list(_OWNED)
+        try:
+            if owned:
+                IngestionJob.objects.filter(id__in=owned, status__in=ACTIVE_STATUSES).update(updated_at=timezone.now())
+            recover_stale_jobs()
+        except Exception as e:
+            logger.warning(f"Ingestion heartbeat failed: {e}")
+        finally:
+            close_old_connections()
+
+def recover_stale_jobs(force: bool = False) -> int:
+    """
+    Take over active jobs whose worker stopped heartbeating (restart,
+    deploy, crash). Each is re-queued in this process until it has been
+    started INGEST_MAX_ATTEMPTS times, then marked failed. Runs at most
+    once per heartbeat interval unless `force`.
+
+    Returns:
+        Number of jobs re-queued or failed
+    """
+    global _LAST_RECOVERY
+    now = time.monotonic()
+    with _EXECUTOR_LOCK:
+        if not force and now - _LAST_RECOVERY < _heartbeat_interval():
+            return 0
+        _LAST_RECOVERY = now
+
+    stale_after = max(3 * _heartbeat_interval(), float(getattr(settings, "INGEST_STALE_AFTER", 120) or 120))
+    max_attempts = max(1, int(getattr(settings, "INGEST_MAX_ATTEMPTS", 2) or 1))
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    recovered = 0
+    for job in IngestionJob.objects.filter(status__in=ACTIVE_STATUSES, updated_at__lt=cutoff).select_related("document"):
+        # Claim the row so only one process recovers it
+        retry = job.document is not None and job.attempts < max_attempts
+        claimed = IngestionJob.objects.filter(id=job.id, status=job.status, updated_at=job.updated_at).update(
+            status=IngestionJob.STATUS_QUEUED if retry else IngestionJob.STATUS_FAILED,
+            stage="requeued" if retry else job.stage,
+            updated_at=timezone.now(),
+        )
+        if not claimed:
+            continue
+        recovered += 1
+        if retry:
+            logger.warning(f"Ingestion job {job.id} was orphaned ({job.status}), re-queueing")
+            transaction.on_commit(lambda job_id=job.id: _enqueue(job_id))
+        else:
+            logger.error(f"Ingestion job {job.id} was orphaned after {job.attempts} attempts, giving up")
+            _fail(job, job.document, "The worker running this job stopped before it finished")
+    return recovered
+
+def submit_ingestion(doc: Document, incremental: bool = False, upload=None, content_hash: str = "") -> IngestionJob:
+    """
+    Create a queued job for `doc` and hand it to the worker pool once the
+    surrounding transaction (if any) commits.
+
+    Args:
+        doc: Document to index
+        incremental: Re-ingest an already indexed document, diffing chunks
+        upload: New version of the file for an update; staged on the job and
+            only swapped into the document when indexing succeeds
+        content_hash: SHA-256 of `upload`
+    """
+    job = IngestionJob(document=doc, doc_name=doc.name, incremental=incremental, content_hash=content_hash)
+    if upload is not None:
+        job.file.save(upload.name, upload, save=False)
+    job.save()
+    transaction.on_commit(lambda: _enqueue(job.id))
+    return job
+
+def _discard_staged(job: IngestionJob):
+    """Delete the staged file of a failed update; the document keeps its current one."""
+    if job.file:
+        try:
+            job.file.delete(save=False)
+        except Exception as e:
+            logger.warning(f"Cannot delete staged file of job {job.id}: {e}")
+
+def _update(job: IngestionJob, **fields):
+    for k, v in fields.items():
+        setattr(job, k, v)
+    job.save(update_fields=[*fields.keys(), "updated_at"])
+
+def _fail(job: IngestionJob, doc: Optional[Document], error: str):
+    """Record a failed job. A failed update keeps the indexed version; a failed first upload is removed."""
+    from .utils.vectorstore import delete_doc
+
+    if doc is not None and not job.incremental:
+        # Drop whatever part of a first upload already landed
+        delete_doc(str(doc.id), doc.namespace)
+        doc.delete()
+    _discard_staged(job)
+    _update(job, status=IngestionJob.STATUS_FAILED, error=error, file="", finished_at=timezone.now())
+
+def run_job(job_id: int):
+    """Run one ingestion job to completion, recording state and progress on the row."""
+    from .ingest import DocumentRemoved, ingest_document
+
+    close_old_connections()
+    try:
+        # Start only a job that is still queued (not already taken over elsewhere)
+        if not IngestionJob.objects.filter(id=job_id, status=IngestionJob.STATUS_QUEUED).update(
+            status=IngestionJob.STATUS_RUNNING, stage="starting", progress=0.0,
+            attempts=F("attempts") + 1, updated_at=timezone.now(),
+        ):
+            return
+        job = IngestionJob.objects.select_related("document").get(id=job_id)
+        doc = job.document
+        if doc is None:
+            _fail(job, None, "Document was removed before ingestion")
+            return
+
+        def on_progress(stage: str, progress: float):
+            _update(job, stage=stage, progress=progress)
+
+        if job.content_hash:
+            # Saved together with the new file by ingest_document, only on success
+            doc.content_hash = job.content_hash
+        try:
+            n = ingest_document(doc, on_progress=on_progress, incremental=job.incremental,
+                                source=job.file or None)
+        except DocumentRemoved as e:
+            logger.warning(f"Ingestion job {job_id} stopped: {e}")
+            # Its chunks are already gone and there is no document to roll back
+            _fail(job, None, str(e))
+            return
+        except Exception as e:
+            logger.exception(f"Ingestion job {job_id} failed for '{doc.name}': {e}")
+            # An update keeps the previously indexed version, file and hash
+            _fail(job, doc, str(e))
+            return
+
+        # The staged file now belongs to the document
+        _update(job, status=IngestionJob.STATUS_SUCCEEDED, stage="done", progress=1.0,
+                num_chunks=n, file="", finished_at=timezone.now())
+        logger.info(f"Ingestion job {job_id} finished: {n} chunks for '{doc.name}'")
+    except Exception as e:
+        logger.exception(f"Ingestion job {job_id} crashed: {e}")
+    finally:
+        with _EXECUTOR_LOCK:
+            _OWNED.discard(job_id)
+        close_old_connections()
@@ -0,0 +1,56 @@
+import json
+import sys
+import time
+from django.core.management.base import BaseCommand, CommandError
+from chatbot.utils.rag_pipeline import ask_batch
+
+class Command(BaseCommand):
+    help = (
+        "Answer a file of questions (one per line, or JSON lines with a 'question' "
+        "field) and write one JSON line per answer, in input order."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("questions", help="Question file, or '-' for stdin")
+        parser.add_argument("-o", "--output", default="-", help="Output file (default stdout)")
+        parser.add_argument("-k", type=int, default=6)
+        parser.add_argument("--namespace", default="")
+        parser.add_argument("--doc-ids", default="", help="Comma-separated document ids to search")
+        parser.add_argument("--concurrency", type=int, default=0, help="Parallel LLM calls (default ASK_BATCH_CONCURRENCY)")
+
+    def _questions(self, path: str):
+        src = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+        try:
+            for line in src:
+                line = line.strip()
+                if not line:
+                    continue
+                if line.startswith("{"):
+                    line = json.loads(line).get("question") or ""
+                yield line
+        finally:
+            if src is not sys.stdin:
+                src.close()
+
+    def handle(self, *args, **options):
+        try:
+            questions = list(self._questions(options["questions"]))
+        except OSError as e:
+            raise CommandError(str(e))
+        doc_ids = [d.strip() for d in options["doc_ids"].split(",") if d.strip()] or None
+
+        out = sys.stdout if options["output"] == "-" else open(options["output"], "w", encoding="utf-8")
+        started = time.perf_counter()
+        n = 0
+        try:
+            for row in ask_batch(questions, k=options["k"], namespace=options["namespace"],
+                                 doc_ids=doc_ids, concurrency=options["concurrency"] or None):
+                out.write(json.dumps(row) + "\n")
+                out.flush()
+                n += 1
+        finally:
+            if out is not sys.stdout:
+                out.close()
+
+        elapsed = time.perf_counter() - started
+        self.stderr.write(f"Answered {n} questions in {elapsed:.1f}s ({n / elapsed if elapsed else 0:.2f}/s)")
@@ -0,0 +1,267 @@
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from chatbot.utils import embed_cache, lexical_index, vectorstore
+from chatbot.utils.embeddings import embed_texts, _embed_uncached
+from chatbot.utils.file_io import extract_text, iter_txt
+from chatbot.utils.synthetic import Corpus
+from chatbot.utils.text_splitter import chunk_blocks, chunk_stream, chunk_text, clean_text
+
+_UNITS = {"kb": 1024, "mb": 1024 ** 2, "gb": 1024 ** 3}
+_SUITES = ("extract", "chunk", "embed", "index")
+
+def _size(value: str) -> int:
+    v = value.strip().lower()
+    for unit, mult in _UNITS.items():
+        if v.endswith(unit):
+            return int(float(v[:-len(unit)]) * mult)
+    return int(v)
+
+def _sizes(value: str) -> List[int]:
+    return [_size(v) for v in value.split(",") if v.strip()]
+
+def _timed(fn: Callable[[], Any], repeat: int = 1):
+    """Median wall time of `repeat` runs, plus the last result."""
+    times, result = [], None
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times), result
+
+def _percentiles(samples_ms: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples_ms)
+
+    def pct(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+    return {
+        "n": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "p50_ms": round(pct(50), 3),
+        "p95_ms": round(pct(95), 3),
+        "p99_ms": round(pct(99), 3),
+    }
+
+def _random_fragments(text: str, seed: int, pieces: int = 256) -> List[str]:
+    """`text` cut at random offsets, the way page or read boundaries fall."""
+    cuts = sorted(random.Random(seed).sample(range(len(text) + 1), min(len(text) + 1, pieces)))
+    return [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, timeout=5).stdout.strip()
+    except Exception:
+        return ""
+
+@contextmanager
+def _sandbox(workdir: str, backend: str, hybrid: bool) -> Iterator[None]:
+    """
+    Point the vector store, lexical index and embedding cache at a scratch
+    directory with the offline hash embedder, so the real index is never
+    touched and no API key is needed.
+    """
+    saved = (vectorstore._CLIENT, dict(vectorstore._COLLECTIONS), lexical_index._INDEX, embed_cache._CACHE)
+    vectorstore._CLIENT = None
+    vectorstore._COLLECTIONS.clear()
+    vectorstore._COUNTS.clear()
+    lexical_index._INDEX = None
+    embed_cache._CACHE = None
+    try:
+        with override_settings(
+            CHROMA_PERSIST_DIR=os.path.join(workdir, "index"),
+            VECTOR_BACKEND=backend,
+            HYBRID_SEARCH=hybrid,
+            EMBED_BACKEND="hash",
+            EMBED_CACHE_PATH=os.path.join(workdir, "embed_cache.sqlite3"),
+            ANSWER_CACHE_ENABLED=False,
+            RERANK_ENABLED=False,
+            OCR_PDF_FALLBACK=False,
+        ):
+            yield
+    finally:
+        vectorstore._CLIENT, collections, lexical_index._INDEX, embed_cache._CACHE = saved
+        vectorstore._COLLECTIONS.clear()
+        vectorstore._COLLECTIONS.update(collections)
+
+class Command(BaseCommand):
+    help = (
+        "Offline microbenchmarks for extraction, cleaning/chunking, embedding "
+        "(deterministic hash backend), upsert rate and query latency. Results "
+        "are written as JSON so runs can be compared."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--suites", default=",".join(_SUITES), help=f"Comma-separated subset of {', '.join(_SUITES)}")
+        parser.add_argument("--sizes", default="1MB,10MB,100MB", help="Text corpus sizes, e.g. 1MB,100MB,1GB")
+        parser.add_argument("--in-memory-limit", default="256MB",
+                            help="Largest corpus also benchmarked with the in-memory clean_text/chunk_text path")
+        parser.add_argument("--pdf-pages", type=int, default=50)
+        parser.add_argument("--docx-paragraphs", type=int, default=2000)
+        parser.add_argument("--embed-chunks", type=int, default=5000)
+        parser.add_argument("--index-sizes", default="1000,10000,50000", help="Chunk counts to measure queries at")
+        parser.add_argument("--queries", type=int, default=200)
+        parser.add_argument("--backend", choices=["numpy", "chroma"], default="numpy")
+        parser.add_argument("--no-hybrid", action="store_true", help="Benchmark dense search only")
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--workdir", default="", help="Keeps generated corpora between runs (default: a temp dir)")
+        parser.add_argument("-o", "--output", default="benchmark.json")
+
+    def _log(self, msg: str):
+        self.stderr.write(msg)
+
+    # ---- suites ----
+    def bench_extract(self, corpus: Corpus, workdir: str, opts) -> Dict[str, Any]:
+        repeat = opts["repeat"]
+        txt = corpus.write_text(os.path.join(workdir, f"extract_{opts['seed']}.txt"), _size("10MB"))
+        pdf = corpus.write_pdf(os.path.join(workdir, f"extract_{opts['seed']}_{opts['pdf_pages']}p.pdf"), opts["pdf_pages"])
+        docx = corpus.write_docx(os.path.join(workdir, f"extract_{opts['seed']}_{opts['docx_paragraphs']}.docx"),
+                                 opts["docx_paragraphs"])
+        out = {}
+        for label, path in (("txt", txt), ("pdf", pdf), ("docx", docx)):
+            secs, (text, _) = _timed(lambda: extract_text(path), repeat)
+            out[label] = {
+                "file_bytes": os.path.getsize(path),
+                "text_chars": len(text),
+                "seconds": round(secs, 4),
+                "mb_per_s": round(len(text) / 1e6 / secs, 2) if secs else None,
+            }
+            if label == "pdf":
+                out[label]["pages_per_s"] = round(opts["pdf_pages"] / secs, 1) if secs else None
+            self._log(f"extract {label}: {out[label]}")
+        return out
+
+    def bench_chunk(self, corpus: Corpus, workdir: str, opts) -> Dict[str, Any]:
+        limit = _size(opts["in_memory_limit"])
+        out = {}
+        for nbytes in _sizes(opts["sizes"]):
+            path = corpus.write_text(os.path.join(workdir, f"corpus_{opts['seed']}_{nbytes}.txt"), nbytes)
+            mb = os.path.getsize(path) / 1e6
+            row: Dict[str, Any] = {"bytes": os.path.getsize(path)}
+
+            secs, n = _timed(lambda: sum(1 for _ in chunk_stream(iter_txt(path))), 1 if nbytes > limit else opts["repeat"])
+            row["stream"] = {"seconds": round(secs, 4), "mb_per_s": round(mb / secs, 2), "chunks": n}
+            secs, n = _timed(lambda: sum(1 for _ in chunk_blocks(iter_txt(path))), 1 if nbytes > limit else opts["repeat"])
+            row["blocks"] = {"seconds": round(secs, 4), "mb_per_s": round(mb / secs, 2), "chunks": n}
+
+            if nbytes <= limit:
+                with open(path, "r", encoding="utf-8") as f:
+                    text = f.read()
+                secs, _ = _timed(lambda: clean_text(text), opts["repeat"])
+                row["clean_text"] = {"seconds": round(secs, 4), "mb_per_s": round(mb / secs, 2)}
+                secs, chunks = _timed(lambda: chunk_text(text), opts["repeat"])
+                row["chunk_text"] = {"seconds": round(secs, 4), "mb_per_s": round(mb / secs, 2), "chunks": len(chunks)}
+                # chunk_stream must reproduce chunk_text wherever the fragment boundaries fall
+                for fragments in (iter_txt(path), _random_fragments(text, opts["seed"])):
+                    if list(chunk_stream(fragments)) != chunks:
+                        raise CommandError(f"chunk_stream output differs from chunk_text on {path}")
+                del text, chunks
+            out[f"{nbytes}"] = row
+            self._log(f"chunk {nbytes} bytes: {row}")
+        return out
+
+    def _chunks(self, corpus: Corpus, workdir: str, opts, n: int) -> List[str]:
+        chunks: List[str] = []
+        path = corpus.write_text(os.path.join(workdir, f"chunks_{opts['seed']}.txt"), max(n * 1500, 1024 * 1024))
+        for c in chunk_stream(iter_txt(path)):
+            chunks.append(c)
+            if len(chunks) >= n:
+                break
+        return chunks
+
+    def bench_embed(self, corpus: Corpus, workdir: str, opts) -> Dict[str, Any]:
+        chunks = self._chunks(corpus, workdir, opts, opts["embed_chunks"])
+        out = {"chunks": len(chunks)}
+        secs, _ = _timed(lambda: _embed_uncached(chunks, "hash"), opts["repeat"])
+        out["backend"] = {"seconds": round(secs, 4), "chunks_per_s": round(len(chunks) / secs, 1)}
+
+        # Through embed_texts: cold cache (every chunk misses), then warm
+        cache_path = os.path.join(workdir, "embed_cache.sqlite3")
+        if os.path.exists(cache_path):
+            os.remove(cache_path)
+        embed_cache._CACHE = None
+        secs, _ = _timed(lambda: embed_texts(chunks))
+        out["cache_cold"] = {"seconds": round(secs, 4), "chunks_per_s": round(len(chunks) / secs, 1)}
+        secs, _ = _timed(lambda: embed_texts(chunks), opts["repeat"])
+        out["cache_warm"] = {"seconds": round(secs, 4), "chunks_per_s": round(len(chunks) / secs, 1)}
+        self._log(f"embed: {out}")
+        return out
+
+    def bench_index(self, corpus: Corpus, workdir: str, opts) -> Dict[str, Any]:
+        targets = sorted(int(v) for v in opts["index_sizes"].split(",") if v.strip())
+        chunks = self._chunks(corpus, workdir, opts, targets[-1])
+        questions = corpus.questions(opts["queries"])
+        namespace = "bench"
+        out = {"backend": opts["backend"], "hybrid": not opts["no_hybrid"], "points": []}
+        # Precompute vectors so the upsert figure measures the index, not the embedder
+        embed_texts(chunks)
+
+        stored = 0
+        doc_size = 1000
+        for target in targets:
+            target = min(target, len(chunks))
+            started = time.perf_counter()
+            while stored < target:
+                window = chunks[stored:min(target, stored + doc_size)]
+                doc_id = f"bench-{stored // doc_size}-{stored}"
+                vectorstore.upsert_chunks(doc_id, window, {"doc_id": doc_id, "doc_name": doc_id, "namespace": namespace},
+                                          namespace=namespace)
+                stored += len(window)
+            upsert_s = time.perf_counter() - started
+
+            latencies = []
+            for q in questions:
+                t0 = time.perf_counter()
+                vectorstore.query(q, k=6, namespace=namespace)
+                latencies.append((time.perf_counter() - t0) * 1000)
+            point = {"index_size": stored, "upsert_seconds": round(upsert_s, 3),
+                     "query": _percentiles(latencies)}
+            out["points"].append(point)
+            self._log(f"index {stored}: {point}")
+        return out
+
+    def handle(self, *args, **options):
+        suites = [s.strip() for s in options["suites"].split(",") if s.strip()]
+        unknown = set(suites) - set(_SUITES)
+        if unknown:
+            raise CommandError(f"Unknown suites: {', '.join(sorted(unknown))}")
+
+        workdir = options["workdir"] or tempfile.mkdtemp(prefix="docchat-bench-")
+        os.makedirs(workdir, exist_ok=True)
+        self._log(f"Working in {workdir}")
+
+        started = time.perf_counter()
+        corpus = Corpus(seed=options["seed"])
+        results: Dict[str, Any] = {}
+        with _sandbox(workdir, options["backend"], not options["no_hybrid"]):
+            for suite in suites:
+                results[suite] = getattr(self, f"bench_{suite}")(corpus, workdir, options)
+
+        report = {
+            "meta": {
+                "commit": _git_commit(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "seed": options["seed"],
+                "args": {k: options[k] for k in ("suites", "sizes", "index_sizes", "queries", "backend",
+                                                 "no_hybrid", "repeat", "embed_chunks", "pdf_pages")},
+                "elapsed_s": round(time.perf_counter() - started, 1),
+            },
+            "results": results,
+        }
+        with open(options["output"], "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
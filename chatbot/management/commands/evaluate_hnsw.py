@@ -0,0 +1,150 @@
+import itertools
+import json
+import time
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from chatbot.utils.embeddings import embed_texts
+from chatbot.utils.vectorstore import collection_name, hnsw_metadata, hnsw_params, namespace_collection
+
+def _int_list(value: str):
+    return [int(v) for v in value.split(",") if v.strip()]
+
+def _percentile(values, p):
+    return float(np.percentile(values, p)) if values else 0.0
+
+def _read_questions(path: str):
+    questions = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                line = (json.loads(line).get("question") or "").strip()
+            if line:
+                questions.append(line)
+    return questions
+
+class Command(BaseCommand):
+    help = (
+        "Replay a question set against the stored vectors and report recall@k, "
+        "p50/p95 query latency and build time for a grid of HNSW parameters, "
+        "measured against exact brute-force search."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("questions", help="Text file (one question per line) or JSON lines with a 'question' field")
+        parser.add_argument("-k", type=int, default=6)
+        parser.add_argument("--namespace", default="", help="Namespace whose vectors are evaluated")
+        parser.add_argument("--m", default="8,16,32", help="Comma-separated HNSW M values")
+        parser.add_argument("--ef-construction", default="100,200", help="Comma-separated ef_construction values")
+        parser.add_argument("--ef-search", default="10,50,100", help="Comma-separated ef_search values")
+        parser.add_argument("--limit", type=int, default=0, help="Only use the first N stored chunks (0 = all)")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--json", dest="json_path", default="", help="Also write the results to this file")
+
+    def _load_corpus(self, namespace: str, batch: int, limit: int):
+        col = namespace_collection(namespace)
+        ids, vectors = [], []
+        offset = 0
+        while not limit or len(ids) < limit:
+            size = batch if not limit else min(batch, limit - len(ids))
+            got = col.get(limit=size, offset=offset, include=["embeddings"])
+            got_ids = got.get("ids") or []
+            if not got_ids:
+                break
+            ids.extend(got_ids)
+            vectors.extend(got["embeddings"])
+            offset += len(got_ids)
+        return ids, np.asarray(vectors, dtype=np.float32)
+
+    def handle(self, *args, **options):
+        import chromadb
+        from chromadb.config import Settings
+
+        k = options["k"]
+        batch = options["batch_size"]
+        questions = _read_questions(options["questions"])
+        if not questions:
+            raise CommandError("No questions found")
+
+        ids, corpus = self._load_corpus(options["namespace"], batch, options["limit"])
+        if not ids:
+            raise CommandError("No chunks indexed yet")
+        k = min(k, len(ids))
+        self.stdout.write(f"Loaded {len(ids)} chunks, {len(questions)} questions (k={k})")
+
+        queries = np.asarray(embed_texts(questions), dtype=np.float32)
+
+        # Exact cosine baseline
+        corpus_n = corpus / np.maximum(np.linalg.norm(corpus, axis=1, keepdims=True), 1e-12)
+        queries_n = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        exact_ms = []
+        truth = []
+        for qv in queries_n:
+            started = time.perf_counter()
+            scores = corpus_n @ qv
+            top = np.argpartition(-scores, k - 1)[:k]
+            exact_ms.append((time.perf_counter() - started) * 1000)
+            truth.append({ids[i] for i in top})
+        self.stdout.write(
+            f"exact: p50={_percentile(exact_ms, 50):.2f}ms p95={_percentile(exact_ms, 95):.2f}ms"
+        )
+
+        grid = list(itertools.product(
+            _int_list(options["m"]),
+            _int_list(options["ef_construction"]),
+            _int_list(options["ef_search"]),
+        ))
+        client = chromadb.Client(Settings(is_persistent=False, anonymized_telemetry=False))
+        current = hnsw_params(collection_name(options["namespace"]))
+        results = []
+        for m, ef_c, ef_s in grid:
+            name = f"hnsw_eval_{m}_{ef_c}_{ef_s}"
+            params = {"M": m, "ef_construction": ef_c, "ef_search": ef_s}
+            try:
+                client.delete_collection(name)
+            except Exception:
+                pass
+            col = client.create_collection(name=name, metadata=hnsw_metadata(params=params))
+
+            started = time.perf_counter()
+            for i in range(0, len(ids), batch):
+                col.add(ids=ids[i:i + batch], embeddings=corpus[i:i + batch].tolist())
+            build_s = time.perf_counter() - started
+
+            latencies, recalls = [], []
+            for qv, expected in zip(queries, truth):
+                started = time.perf_counter()
+                res = col.query(query_embeddings=[qv.tolist()], n_results=k, include=[])
+                latencies.append((time.perf_counter() - started) * 1000)
+                got = set(res["ids"][0])
+                recalls.append(len(got & expected) / k)
+
+            client.delete_collection(name)
+            row = {
+                **params,
+                "recall_at_k": round(float(np.mean(recalls)), 4),
+                "p50_ms": round(_percentile(latencies, 50), 3),
+                "p95_ms": round(_percentile(latencies, 95), 3),
+                "build_s": round(build_s, 3),
+                "current": params == current,
+            }
+            results.append(row)
+            self.stdout.write(
+                f"M={m:<3} ef_c={ef_c:<4} ef_s={ef_s:<4} recall@{k}={row['recall_at_k']:.3f} "
+                f"p50={row['p50_ms']:.2f}ms p95={row['p95_ms']:.2f}ms build={row['build_s']:.2f}s"
+                + ("  (current)" if row["current"] else "")
+            )
+
+        if options["json_path"]:
+            report = {
+                "chunks": len(ids),
+                "questions": len(questions),
+                "k": k,
+                "exact": {"p50_ms": _percentile(exact_ms, 50), "p95_ms": _percentile(exact_ms, 95)},
+                "grid": results,
+            }
+            with open(options["json_path"], "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['json_path']}"))
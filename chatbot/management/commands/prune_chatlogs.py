@@ -0,0 +1,63 @@
+import gzip
+import json
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from chatbot.models import ChatLog
+
+class Command(BaseCommand):
+    help = (
+        "Delete ChatLog rows older than the retention period, optionally "
+        "archiving them first as JSON lines (gzipped when the path ends in .gz)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=0, help="Keep this many days (default CHATLOG_RETENTION_DAYS)")
+        parser.add_argument("--archive", default="", help="Append deleted rows to this .jsonl or .jsonl.gz file")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--dry-run", action="store_true", help="Only report how many rows would go")
+
+    def handle(self, *args, **options):
+        days = options["days"] or int(getattr(settings, "CHATLOG_RETENTION_DAYS", 90))
+        if days <= 0:
+            raise CommandError("Retention must be at least one day")
+        cutoff = timezone.now() - timedelta(days=days)
+        old = ChatLog.objects.filter(created_at__lt=cutoff)
+
+        if options["dry_run"]:
+            self.stdout.write(f"{old.count()} ChatLog rows older than {cutoff:%Y-%m-%d %H:%M} would be removed")
+            return
+
+        path = options["archive"]
+        archive = None
+        if path:
+            archive = gzip.open(path, "at", encoding="utf-8") if path.endswith(".gz") else open(path, "a", encoding="utf-8")
+
+        batch = max(1, options["batch_size"])
+        total = 0
+        try:
+            # Short per-batch transactions keep the writer lock free for new logs
+            while True:
+                rows = list(old.order_by("id")[:batch])
+                if not rows:
+                    break
+                if archive is not None:
+                    for r in rows:
+                        archive.write(json.dumps({
+                            "id": r.id,
+                            "created_at": r.created_at.isoformat(),
+                            "question": r.question,
+                            "answer": r.answer,
+                            "sources": r.sources,
+                            "timings": r.timings,
+                        }) + "\n")
+                    archive.flush()
+                ChatLog.objects.filter(id__in=[r.id for r in rows]).delete()
+                total += len(rows)
+        finally:
+            if archive is not None:
+                archive.close()
+
+        where = f", archived to {path}" if path else ""
+        self.stdout.write(self.style.SUCCESS(f"Removed {total} ChatLog rows older than {days} days{where}"))
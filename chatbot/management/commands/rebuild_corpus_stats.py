@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from chatbot.corpus_stats import rebuild
+from chatbot.utils.vectorstore import stats
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the corpus counters (chunks, documents, bytes, per type and "
+        "per namespace) from the Document table, optionally checking them "
+        "against the vector store."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--backfill-sizes", action="store_true",
+                            help="Stat stored files of documents indexed before sizes were tracked")
+        parser.add_argument("--check", action="store_true", help="Compare chunk counts with the vector store")
+
+    def handle(self, *args, **options):
+        result = rebuild(backfill_sizes=options["backfill_sizes"])
+        self.stdout.write(
+            f"{result['documents']} documents, {result['chunks']} chunks, {result['bytes']} bytes "
+            f"in {len(result['namespaces'])} namespace(s)"
+        )
+        if options["check"]:
+            stored = stats()["namespaces"]
+            for ns in sorted(set(stored) | set(result["namespaces"])):
+                counted = result["namespaces"].get(ns, {}).get("chunks", 0)
+                if counted != stored.get(ns, 0):
+                    self.stdout.write(self.style.WARNING(
+                        f"namespace '{ns}': counters say {counted} chunks, vector store has {stored.get(ns, 0)}"
+                    ))
+        self.stdout.write(self.style.SUCCESS("Corpus counters rebuilt"))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from chatbot.utils.lexical_index import get_lexical_index
+from chatbot.utils.vectorstore import namespace_collection, namespaces
+
+class Command(BaseCommand):
+    help = "Rebuild the BM25 lexical index from the chunks stored in every namespace."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        index = get_lexical_index()
+        if index is None:
+            raise CommandError("Hybrid search is disabled (HYBRID_SEARCH=false) or SQLite lacks FTS5")
+
+        batch = options["batch_size"]
+        index.clear()
+        total = 0
+        for ns in namespaces():
+            col = namespace_collection(ns)
+            offset = 0
+            while True:
+                got = col.get(limit=batch, offset=offset, include=["documents", "metadatas"])
+                ids = got.get("ids") or []
+                if not ids:
+                    break
+                # Chunks indexed before namespaces existed carry no namespace key
+                metas = [{**m, "namespace": ns} for m in got["metadatas"]]
+                index.add(ids, got["documents"], metas)
+                total += len(ids)
+                offset += len(ids)
+                self.stdout.write(f"Indexed {total} chunks...")
+
+        self.stdout.write(self.style.SUCCESS(f"Lexical index rebuilt with {total} chunks"))
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 class Document(models.Model):
     FILE_TYPES = [
@@ -12,7 +13,12 @@ class Document(models.Model):
     file_type = models.CharField(max_length=16, choices=FILE_TYPES)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     num_chunks = models.IntegerField(default=0)
+    # Size of the indexed file, kept for the corpus counters
+    size_bytes = models.BigIntegerField(default=0)
     embedded = models.BooleanField(default=False)
+    content_hash = models.CharField(max_length=64, blank=True, default="", db_index=True)
+    # Vector collection the document is indexed into ("" = shared default)
+    namespace = models.CharField(max_length=48, blank=True, default="", db_index=True)
 
     def __str__(self):
         return f"{self.name} ({self.file_type})"
@@ -21,9 +27,67 @@ class ChatLog(models.Model):
     question = models.TextField()
     answer = models.TextField()
     sources = models.JSONField(default=list)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Milliseconds per pipeline stage, e.g. {"embed": 41.2, "retrieve": 12.0, "generate": 1830.5}
+    timings = models.JSONField(default=dict, blank=True)
+    # Set when the answer is produced, not when the background writer flushes it
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=["-created_at", "-id"], name="chatlog_recent_idx")]
 
 class VectorStat(models.Model):
+    # Corpus counter maintained by chatbot.corpus_stats, e.g. "chunks" or "ns:hr:docs"
     key = models.CharField(max_length=64, unique=True)
-    value = models.IntegerField(default=0)
+    value = models.BigIntegerField(default=0)
     updated_at = models.DateTimeField(auto_now=True)
+
+class IngestionJob(models.Model):
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_SUCCEEDED = "succeeded"
+    STATUS_FAILED = "failed"
+    STATUSES = [
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_SUCCEEDED, "Succeeded"),
+        (STATUS_FAILED, "Failed"),
+    ]
+    document = models.ForeignKey(Document, null=True, blank=True, on_delete=models.SET_NULL, related_name="jobs")
+    doc_name = models.CharField(max_length=255)
+    status = models.CharField(max_length=16, choices=STATUSES, default=STATUS_QUEUED)
+    stage = models.CharField(max_length=32, blank=True, default="")
+    progress = models.FloatField(default=0.0)
+    incremental = models.BooleanField(default=False)
+    # New version of an updated document, staged until it is indexed; the
+    # document keeps its current file (and content_hash) if the job fails
+    file = models.FileField(upload_to="uploads/", blank=True, default="")
+    content_hash = models.CharField(max_length=64, blank=True, default="")
+    num_chunks = models.IntegerField(default=0)
+    # Times a worker started the job; orphaned jobs are re-queued up to INGEST_MAX_ATTEMPTS
+    attempts = models.IntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    @property
+    def done(self) -> bool:
+        return self.status in (self.STATUS_SUCCEEDED, self.STATUS_FAILED)
+
+    def as_dict(self):
+        return {
+            "id": self.id,
+            "doc_id": self.document_id,
+            "doc_name": self.doc_name,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": round(self.progress, 3),
+            "chunks": self.num_chunks,
+            "incremental": self.incremental,
+            "attempts": self.attempts,
+            "error": self.error,
+            "done": self.done,
+        }
+
+    def __str__(self):
+        return f"Job {self.id} {self.doc_name} [{self.status}]"
@@ -3,6 +3,19 @@ const fileInput = document.getElementById('fileInput');
 const askBtn = document.getElementById('askBtn');
 const questionInput = document.getElementById('question');
 const chatBox = document.getElementById('chatBox');
+// Document namespace from the page URL, e.g. /chat/?ns=hr
+const NAMESPACE = new URLSearchParams(window.location.search).get('ns') || '';
+
+function renderSources(wrap, sources) {
+  if (!sources || !sources.length) return;
+  const ul = document.createElement('ul');
+  sources.forEach(s => {
+    const li = document.createElement('li');
+    li.textContent = `[${s.index}] ${s.doc_name}: ${s.snippet}`;
+    ul.appendChild(li);
+  });
+  wrap.appendChild(ul);
+}
 
 function pushMessage(role, text, sources=[]) {
   const wrap = document.createElement('div');
@@ -10,17 +23,10 @@ function pushMessage(role, text, sources=[]) {
   const r = document.createElement('div'); r.className='role'; r.textContent = role.toUpperCase();
   const b = document.createElement('div'); b.className='bubble'; b.textContent = text;
   wrap.appendChild(r); wrap.appendChild(b);
-  if (sources && sources.length) {
-    const ul = document.createElement('ul');
-    sources.forEach(s => {
-      const li = document.createElement('li');
-      li.textContent = `[${s.index}] ${s.doc_name}: ${s.snippet}`;
-      ul.appendChild(li);
-    });
-    wrap.appendChild(ul);
-  }
+  renderSources(wrap, sources);
   chatBox.appendChild(wrap);
   chatBox.scrollTop = chatBox.scrollHeight;
+  return { wrap, bubble: b };
 }
 
 uploadBtn.onclick = async () => {
@@ -28,16 +34,57 @@ uploadBtn.onclick = async () => {
   for (const f of fileInput.files) {
     const fd = new FormData();
     fd.append('file', f);
+    fd.append('namespace', NAMESPACE);
     fd.append('csrfmiddlewaretoken', getCSRF());
     pushMessage('system', `Uploading ${f.name}...`);
     const res = await fetch('/api/upload/', { method:'POST', body: fd });
     const data = await res.json();
-    if (!data.ok) pushMessage('system', `Upload error: ${data.error || res.statusText}`);
-    else pushMessage('system', `Embedded ${f.name} (${data.chunks} chunks).`);
+    if (!data.ok) { pushMessage('system', `Upload error: ${data.error || res.statusText}`); continue; }
+    if (data.duplicate) { pushMessage('system', `${f.name} is already indexed (${data.chunks} chunks).`); continue; }
+    pushMessage('system', `Queued ${f.name} for processing...`);
+    pollJob(data.job_id, f.name);
   }
   fileInput.value = '';
 };
 
+// Job polling backs off from 1s to 10s between checks (30s after network errors)
+// and gives up after POLL_MAX_MS or POLL_MAX_ERRORS failed requests in a row.
+const POLL_MAX_MS = 30 * 60 * 1000;
+const POLL_MAX_ERRORS = 8;
+
+async function pollJob(jobId, name) {
+  let lastStage = '';
+  let delay = 1000;
+  let errors = 0;
+  const started = Date.now();
+  while (Date.now() - started < POLL_MAX_MS) {
+    await new Promise(r => setTimeout(r, delay));
+    let data;
+    try {
+      const res = await fetch(`/api/jobs/${jobId}/`);
+      data = await res.json();
+    } catch (e) {
+      if (++errors >= POLL_MAX_ERRORS) {
+        pushMessage('system', `${name}: lost contact with the server, stopped checking on processing.`);
+        return;
+      }
+      delay = Math.min(delay * 2, 30000);
+      continue;
+    }
+    errors = 0;
+    if (!data.ok) { pushMessage('system', `Upload error: ${data.error}`); return; }
+    const job = data.job;
+    if (job.status === 'succeeded') { pushMessage('system', `Embedded ${name} (${job.chunks} chunks).`); return; }
+    if (job.status === 'failed') { pushMessage('system', `Upload error: ${job.error || 'ingestion failed'}`); return; }
+    if (job.stage && job.stage !== lastStage) {
+      lastStage = job.stage;
+      pushMessage('system', `${name}: ${job.stage} (${Math.round(job.progress * 100)}%)`);
+    }
+    delay = Math.min(Math.round(delay * 1.5), 10000);
+  }
+  pushMessage('system', `${name}: still processing after ${POLL_MAX_MS / 60000} minutes, stopped checking.`);
+}
+
 askBtn.onclick = async () => {
   const q = questionInput.value.trim();
   if (!q) return;
@@ -45,13 +92,50 @@ askBtn.onclick = async () => {
   questionInput.value = '';
   const fd = new FormData();
   fd.append('question', q);
+  fd.append('namespace', NAMESPACE);
   fd.append('csrfmiddlewaretoken', getCSRF());
-  const res = await fetch('/api/ask/', { method:'POST', body: fd });
-  const data = await res.json();
-  if (!data.ok) pushMessage('assistant', data.answer || 'Error');
-  else pushMessage('assistant', data.answer, data.sources);
+  const res = await fetch('/api/ask/stream/', { method:'POST', body: fd });
+  if (!res.ok || !res.body) {
+    const data = await res.json().catch(() => ({}));
+    pushMessage('assistant', data.answer || 'Error');
+    return;
+  }
+  await readAnswerStream(res.body);
 };
 
+// Renders an SSE answer stream progressively: sources arrive first, then tokens.
+async function readAnswerStream(body) {
+  const { wrap, bubble } = pushMessage('assistant', '');
+  let sources = [];
+  let buffer = '';
+  const reader = body.getReader();
+  const decoder = new TextDecoder();
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let sep;
+    while ((sep = buffer.indexOf('\n\n')) !== -1) {
+      const raw = buffer.slice(0, sep);
+      buffer = buffer.slice(sep + 2);
+      let event = 'message', data = '';
+      raw.split('\n').forEach(line => {
+        if (line.startsWith('event: ')) event = line.slice(7);
+        else if (line.startsWith('data: ')) data += line.slice(6);
+      });
+      const payload = data ? JSON.parse(data) : null;
+      if (event === 'sources') sources = payload || [];
+      else if (event === 'token') bubble.textContent += payload;
+      else if (event === 'error') bubble.textContent += (bubble.textContent ? '\n\n' : '') + payload;
+      else if (event === 'done') {
+        bubble.textContent = payload.answer;
+        renderSources(wrap, sources);
+      }
+      chatBox.scrollTop = chatBox.scrollHeight;
+    }
+  }
+}
+
 function getCSRF(){
   const n = 'csrftoken=';
   const c = document.cookie.split(';').find(x=>x.trim().startsWith(n));
@@ -0,0 +1,42 @@
+from django.test import SimpleTestCase, override_settings
+
+from chatbot.utils.rag_pipeline import _EXCERPT_OVERHEAD_TOKENS, _MIN_EXCERPT_TOKENS, _pack_context
+from chatbot.utils.text_splitter import approx_tokens
+
+
+def _ctx(docs, metas, distances=None):
+    return {"docs": docs, "metas": metas, "distances": distances or [0.1 * (i + 1) for i in range(len(docs))],
+            "low_confidence": False}
+
+
+class PackContextTests(SimpleTestCase):
+    @override_settings(CONTEXT_TOKEN_BUDGET=0)
+    def test_overlapping_neighbours_are_stitched(self):
+        a = "Employees accrue leave monthly. Leave requests go to the line manager first."
+        b = "Leave requests go to the line manager first. Unused leave expires in March."
+        out = _pack_context(_ctx([b, a], [{"doc_id": "1", "chunk_index": 4}, {"doc_id": "1", "chunk_index": 3}]))
+        self.assertEqual(out["docs"], [a + " Unused leave expires in March."])
+        self.assertEqual(out["metas"][0]["chunk_index"], 3)
+        self.assertEqual(out["metas"][0]["chunk_end"], 4)
+        self.assertEqual(out["distances"], [0.1])
+
+    @override_settings(CONTEXT_TOKEN_BUDGET=0)
+    def test_unrelated_chunks_stay_separate(self):
+        out = _pack_context(_ctx(["First document text.", "Second document text."],
+                                 [{"doc_id": "1", "chunk_index": 0}, {"doc_id": "2", "chunk_index": 0}]))
+        self.assertEqual(len(out["docs"]), 2)
+
+    @override_settings(CONTEXT_TOKEN_BUDGET=60)
+    def test_budget_is_respected(self):
+        docs = [" ".join(["word"] * 30) + f" doc{i}" for i in range(5)]
+        out = _pack_context(_ctx(docs, [{"doc_id": str(i), "chunk_index": 0} for i in range(5)]))
+        used = sum(approx_tokens(d) + _EXCERPT_OVERHEAD_TOKENS for d in out["docs"])
+        self.assertLessEqual(used, 60)
+        self.assertTrue(out["docs"][0].endswith("doc0"))
+
+    @override_settings(CONTEXT_TOKEN_BUDGET=8)
+    def test_tiny_budget_keeps_a_minimum_excerpt(self):
+        doc = " ".join(f"w{i}" for i in range(200))
+        out = _pack_context(_ctx([doc], [{"doc_id": "1", "chunk_index": 0}]))
+        self.assertEqual(len(out["docs"]), 1)
+        self.assertEqual(approx_tokens(out["docs"][0]), _MIN_EXCERPT_TOKENS)
@@ -0,0 +1,44 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from chatbot.ingest import DocumentRemoved, ingest_document
+from chatbot.jobs import run_job
+from chatbot.models import Document, IngestionJob
+
+
+def _remove_midway(doc, path, report, incremental):
+    # remove_document runs while the chunks are being written
+    Document.objects.filter(id=doc.id).delete()
+    return 3
+
+
+@override_settings(INGEST_STREAMING=True)
+@mock.patch("chatbot.ingest._ingest_streaming", side_effect=_remove_midway)
+@mock.patch("chatbot.ingest.delete_doc")
+class RemovedDuringIngestionTests(TestCase):
+    def setUp(self):
+        self.doc = Document.objects.create(name="a.txt", file="uploads/a.txt", file_type="txt", namespace="hr")
+
+    def test_document_is_not_reinserted(self, delete_doc, _):
+        with self.assertRaises(DocumentRemoved):
+            ingest_document(self.doc)
+        self.assertFalse(Document.objects.filter(id=self.doc.id).exists())
+        delete_doc.assert_called_once_with(str(self.doc.id), "hr")
+
+    def test_job_is_marked_failed(self, delete_doc, _):
+        job = IngestionJob.objects.create(document=self.doc, doc_name=self.doc.name)
+        run_job(job.id)
+        job.refresh_from_db()
+        self.assertEqual(job.status, IngestionJob.STATUS_FAILED)
+        self.assertIn("removed during ingestion", job.error)
+        self.assertFalse(Document.objects.filter(id=self.doc.id).exists())
+        delete_doc.assert_called_once_with(str(self.doc.id), "hr")
+
+    def test_surviving_document_is_saved(self, delete_doc, ingest):
+        ingest.side_effect = lambda *args: 3
+        self.assertEqual(ingest_document(self.doc), 3)
+        self.doc.refresh_from_db()
+        self.assertTrue(self.doc.embedded)
+        self.assertEqual(self.doc.num_chunks, 3)
+        delete_doc.assert_not_called()
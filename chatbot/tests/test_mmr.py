@@ -0,0 +1,41 @@
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+
+from chatbot.utils.rag_pipeline import _depth, _diversify
+
+
+def _pool(dupes=8, diverse=12, dim=32, seed=0):
+    """`dupes` near-copies of one vector, then `diverse` unrelated ones, by distance."""
+    rng = np.random.default_rng(seed)
+    base = rng.normal(size=dim)
+    vecs = [base + rng.normal(scale=1e-3, size=dim) for _ in range(dupes)]
+    vecs += [rng.normal(size=dim) for _ in range(diverse)]
+    dists = [0.10 + 0.001 * i for i in range(dupes)] + [0.15 + 0.01 * i for i in range(diverse)]
+    return dists, vecs
+
+
+@override_settings(MMR_LAMBDA=0.7, MMR_DUPLICATE_SIM=0.95, MMR_DISTANCE_GAP=0.1, MMR_MIN_K=2)
+class DiversifyTests(SimpleTestCase):
+    def test_duplicates_are_replaced_from_the_candidate_pool(self):
+        dists, vecs = _pool()
+        keep = _diversify(dists, vecs, 8)
+        self.assertEqual(len(keep), 8)
+        self.assertEqual(keep[0], 0)
+        # One of the near-copies, the rest from beyond the top 8
+        self.assertEqual([i for i in keep if i < 8], [0])
+        self.assertEqual(len(set(keep)), 8)
+
+    def test_without_vectors_only_the_depth_cut_applies(self):
+        dists, _ = _pool()
+        self.assertEqual(_diversify(dists, None, 8), list(range(8)))
+
+    def test_depth_cut_bounds_the_count(self):
+        dists = [0.1, 0.12, 0.6, 0.61, 0.62]
+        self.assertEqual(_depth(np.asarray(dists), 5), 2)
+        vecs = list(np.eye(5))
+        self.assertEqual(len(_diversify(dists, vecs, 5)), 2)
+
+    def test_ranked_results_keep_fusion_order_at_the_top(self):
+        dists = [0.9, 0.1, 0.5]
+        keep = _diversify(dists, list(np.eye(3)), 3, ranked=True)
+        self.assertEqual(keep, [0, 1, 2])
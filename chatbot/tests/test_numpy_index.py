@@ -0,0 +1,194 @@
+import shutil
+import tempfile
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from chatbot.utils.numpy_index import NumpyCollection, match_where
+
+
+def _vec(i, dim=8):
+    v = np.zeros(dim, dtype=np.float32)
+    v[i % dim] = 1.0
+    v[(i + 1) % dim] = 0.1 * (i // dim + 1)
+    return v
+
+
+class NumpyCollectionTests(SimpleTestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path, ignore_errors=True)
+
+    def open(self, **kwargs):
+        return NumpyCollection(self.path, **kwargs)
+
+    def put(self, col, ids, doc_id="1"):
+        col.upsert(ids=[f"c{i}" for i in ids], documents=[f"text {i}" for i in ids],
+                   embeddings=[_vec(i) for i in ids], metadatas=[{"doc_id": doc_id, "chunk_index": i} for i in ids])
+
+    def test_upsert_and_query(self):
+        col = self.open()
+        self.put(col, range(5))
+        self.assertEqual(col.count(), 5)
+        res = col.query([_vec(3)], n_results=2)
+        self.assertEqual(res["ids"][0][0], "c3")
+        self.assertEqual(res["documents"][0][0], "text 3")
+        self.assertAlmostEqual(res["distances"][0][0], 0.0, places=5)
+        self.assertEqual(len(res["ids"][0]), 2)
+
+    def test_upsert_replaces_existing_ids(self):
+        col = self.open()
+        self.put(col, range(3))
+        col.upsert(ids=["c1"], documents=["new"], embeddings=[_vec(6)], metadatas=[{"doc_id": "1"}])
+        self.assertEqual(col.count(), 3)
+        self.assertEqual(col.get(ids=["c1"])["documents"], ["new"])
+        self.assertEqual(col.query([_vec(6)], n_results=1)["ids"][0], ["c1"])
+
+    def test_delete_by_ids_and_where(self):
+        col = self.open()
+        self.put(col, range(4), doc_id="1")
+        self.put(col, range(4, 6), doc_id="2")
+        col.delete(ids=["c0"])
+        self.assertEqual(col.count(), 5)
+        col.delete(where={"doc_id": "1"})
+        self.assertEqual(sorted(col.get()["ids"]), ["c4", "c5"])
+        res = col.query([_vec(1)], n_results=10)
+        self.assertEqual(sorted(res["ids"][0]), ["c4", "c5"])
+
+    def test_where_filter_in_query(self):
+        col = self.open()
+        self.put(col, range(3), doc_id="1")
+        self.put(col, range(3, 6), doc_id="2")
+        res = col.query([_vec(0)], n_results=10, where={"doc_id": {"$in": ["2"]}})
+        self.assertEqual(sorted(res["ids"][0]), ["c3", "c4", "c5"])
+
+    def test_other_instance_catches_up(self):
+        reader = self.open()  # opened before the first upsert: no dimension yet
+        writer = self.open()
+        self.put(writer, range(4))
+        self.assertEqual(reader.count(), 4)
+        self.assertEqual(reader.query([_vec(2)], n_results=1)["ids"][0], ["c2"])
+        writer.delete(ids=["c2"])
+        self.assertEqual(reader.count(), 3)
+        self.assertNotIn("c2", reader.query([_vec(2)], n_results=4)["ids"][0])
+
+    def test_compaction_keeps_documents_aligned(self):
+        writer = self.open(compact_ratio=0.1, compact_min=2)
+        reader = self.open()
+        self.put(writer, range(10))
+        self.assertEqual(reader.count(), 10)
+        writer.delete(ids=[f"c{i}" for i in range(0, 10, 2)])  # triggers a compaction
+        for i in range(1, 10, 2):
+            res = reader.query([_vec(i)], n_results=1)
+            self.assertEqual(res["ids"][0], [f"c{i}"])
+            self.assertEqual(res["documents"][0], [f"text {i}"])
+            self.assertEqual(res["metadatas"][0][0]["chunk_index"], i)
+
+    def test_compaction_between_scoring_and_reading(self):
+        writer = self.open()
+        reader = self.open()
+        self.put(writer, range(10))
+        writer.delete(ids=["c0", "c2", "c4"])  # below the compaction threshold
+        self.assertEqual(reader.count(), 7)
+        argpartition = np.argpartition
+        fired = []
+
+        def compact_then_partition(*args, **kwargs):
+            # Another process compacts after the reader scored its snapshot
+            if not fired:
+                fired.append(True)
+                writer.compact()
+            return argpartition(*args, **kwargs)
+
+        with mock.patch("chatbot.utils.numpy_index.np.argpartition", side_effect=compact_then_partition):
+            res = reader.query([_vec(7)], n_results=1)
+        self.assertTrue(fired)
+        self.assertEqual(res["ids"][0], ["c7"])
+        self.assertEqual(res["documents"][0], ["text 7"])
+
+    def test_reopen_from_disk(self):
+        self.put(self.open(), range(3))
+        col = self.open()
+        self.assertEqual(col.count(), 3)
+        self.assertEqual(col.get(ids=["c2"])["documents"], ["text 2"])
+
+    def test_float16_storage(self):
+        col = self.open(dtype="float16")
+        self.put(col, range(4))
+        res = col.query([_vec(1)], n_results=1, include=("documents", "metadatas", "distances", "embeddings"))
+        self.assertEqual(res["ids"][0], ["c1"])
+        self.assertEqual(res["embeddings"][0].shape, (1, 8))
+
+    def test_dimension_mismatch(self):
+        col = self.open()
+        self.put(col, range(2))
+        with self.assertRaises(ValueError):
+            col.upsert(ids=["x"], documents=["x"], embeddings=[[1.0, 0.0]], metadatas=[{}])
+
+    def test_empty_index(self):
+        res = self.open().query([_vec(0)], n_results=3)
+        self.assertEqual(res["ids"], [[]])
+
+
+class ScopedQueryTests(SimpleTestCase):
+    """Document-scoped filters use the doc-id codes and must agree with match_where."""
+
+    WHERES = [
+        {"doc_id": "3"},
+        {"doc_id": {"$eq": "5"}},
+        {"doc_id": {"$in": ["1", "4", "9", "missing"]}},
+        {"doc_id": {"$in": []}},
+        {"doc_id": "missing"},
+        {"doc_id": {"$ne": "2"}},  # per-row path on both sides
+    ]
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path, ignore_errors=True)
+        rng = np.random.default_rng(13)
+        self.col = NumpyCollection(self.path, compact_ratio=0.1, compact_min=20)
+        n = 300
+        self.col.upsert(ids=[f"c{i}" for i in range(n)], documents=[f"text {i}" for i in range(n)],
+                        embeddings=rng.normal(size=(n, 16)),
+                        metadatas=[{"doc_id": str(i % 10), "chunk_index": i} for i in range(n)])
+        self.queries = rng.normal(size=(4, 16))
+
+    def assert_matches_per_row(self):
+        for where in self.WHERES:
+            with self.subTest(where=where):
+                fast = self.col.query(self.queries, n_results=15, where=where)
+                fast_get = self.col.get(where=where)
+                with mock.patch.object(NumpyCollection, "_doc_mask", return_value=None):
+                    slow = self.col.query(self.queries, n_results=15, where=where)
+                    slow_get = self.col.get(where=where)
+                self.assertEqual(fast["ids"], slow["ids"])
+                self.assertEqual(fast["distances"], slow["distances"])
+                self.assertEqual(fast_get["ids"], slow_get["ids"])
+                for metas in fast["metadatas"]:
+                    self.assertTrue(all(match_where(m, where) for m in metas))
+
+    def test_filters_match_per_row_path(self):
+        self.assert_matches_per_row()
+
+    def test_after_relabel_delete_and_compaction(self):
+        self.col.update(ids=["c3", "c13"], metadatas=[{"doc_id": "5"}, {"doc_id": "new"}])
+        self.col.delete(ids=["c9", "c19"])
+        self.assert_matches_per_row()
+        self.col.delete(where={"doc_id": "1"})  # enough dead rows to compact
+        self.assertEqual(self.col.get(where={"doc_id": "1"})["ids"], [])
+        self.assert_matches_per_row()
+        reader = NumpyCollection(self.path)
+        self.assertEqual(reader.get(where={"doc_id": "new"})["ids"], ["c13"])
+
+
+class MatchWhereTests(SimpleTestCase):
+    def test_operators(self):
+        meta = {"doc_id": "3", "namespace": "hr"}
+        self.assertTrue(match_where(meta, None))
+        self.assertTrue(match_where(meta, {"doc_id": "3"}))
+        self.assertTrue(match_where(meta, {"doc_id": {"$in": ["1", "3"]}}))
+        self.assertFalse(match_where(meta, {"doc_id": {"$nin": ["3"]}}))
+        self.assertTrue(match_where(meta, {"$and": [{"doc_id": "3"}, {"namespace": {"$ne": "it"}}]}))
+        self.assertFalse(match_where(meta, {"$or": [{"doc_id": "1"}, {"namespace": "it"}]}))
+        self.assertFalse(match_where(None, {"doc_id": "3"}))
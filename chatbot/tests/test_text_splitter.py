@@ -0,0 +1,110 @@
+import random
+import re
+
+from django.test import SimpleTestCase
+
+from chatbot.utils.text_splitter import approx_tokens, chunk_blocks, chunk_stream, chunk_text
+
+_WORDS = ("policy", "leave", "the", "employee", "shall", "notify", "manager", "days", "in", "advance",
+          "reimbursement", "of", "travel", "expenses", "is", "subject", "to", "approval", "a", "form")
+
+
+def _sentence(rng):
+    words = [rng.choice(_WORDS) for _ in range(rng.randint(1, 25))]
+    if rng.random() < 0.05:
+        words.append("x" * rng.randint(7, 400))  # URL- or table-like run with no spaces
+    return words[0].capitalize() + " " + " ".join(words[1:]) + rng.choice(".?!")
+
+
+def _document(rng):
+    parts = []
+    for _ in range(rng.randint(0, 30)):
+        kind = rng.random()
+        if kind < 0.15:
+            parts.append(rng.choice(["SECTION %d" % rng.randint(1, 9), "1.2 Scope", "Travel Policy"]))
+        elif kind < 0.3:
+            parts.append("\n".join("- " + _sentence(rng) for _ in range(rng.randint(1, 6))))
+        else:
+            parts.append((" " if rng.random() < 0.7 else "\n").join(_sentence(rng) for _ in range(rng.randint(1, 12))))
+    seps = ["\n\n", "\n\n\n\n", "\r\n\r\n", "\n \n", "  \n\n"]
+    text = rng.choice(["", "   \n"])
+    for p in parts:
+        text += p + rng.choice(seps)
+    return text + rng.choice(["", "Regards", "  \n", "\r"])
+
+
+def _split(text, rng):
+    """Random fragmentation of `text`, including empty pieces and cuts inside "\r\n"."""
+    cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, rng.randint(0, 12))))
+    pieces, prev = [], 0
+    for c in cuts:
+        pieces.append(text[prev:c])
+        prev = c
+    pieces.append(text[prev:])
+    return pieces
+
+
+class ChunkStreamTests(SimpleTestCase):
+    def test_matches_chunk_text(self):
+        rng = random.Random(4)
+        for i in range(300):
+            text = _document(rng)
+            params = rng.choice([(1200, 150, 50), (300, 40, 10), (120, 0, 1)])
+            with self.subTest(doc=i, params=params):
+                self.assertEqual(list(chunk_stream(_split(text, rng), *params)), chunk_text(text, *params))
+
+    def test_trailing_whitespace_does_not_move_window_ends(self):
+        # Window ends are decided against the stripped document, as chunk_text does
+        text = ("Leave is granted. " * 200)[:2200].rstrip()
+        for fragments in ([text, " " * 300], [text + "\n" * 150, " " * 250], [text[:1000], text[1000:] + " " * 600]):
+            with self.subTest(tail=len(fragments[-1])):
+                self.assertEqual(list(chunk_stream(fragments)), chunk_text(text))
+
+
+class ChunkBlocksTests(SimpleTestCase):
+    PARAMS = [(256, 32, 12), (20, 4, 12), (40, 10, 5), (8, 0, 3)]
+
+    def test_size_bound(self):
+        rng = random.Random(19)
+        for i in range(500):
+            text = _document(rng)
+            max_tokens, overlap, min_tokens = rng.choice(self.PARAMS)
+            for chunk in chunk_blocks([text], max_tokens, overlap, min_tokens):
+                with self.subTest(doc=i, max_tokens=max_tokens, min_tokens=min_tokens):
+                    self.assertLess(approx_tokens(chunk), max_tokens + min_tokens)
+
+    def test_independent_of_block_boundaries(self):
+        rng = random.Random(7)
+        for i in range(300):
+            text = _document(rng)
+            params = rng.choice(self.PARAMS)
+            with self.subTest(doc=i, params=params):
+                self.assertEqual(list(chunk_blocks(_split(text, rng), *params)),
+                                 list(chunk_blocks([text], *params)))
+
+    def test_no_words_lost(self):
+        rng = random.Random(23)
+        for i in range(300):
+            text = _document(rng)
+            if approx_tokens(text) < 12:
+                continue
+            out = set(re.findall(r"[a-z]+", " ".join(chunk_blocks([text], 40, 8, 12)).lower()))
+            # Runs longer than a chunk are cut into pieces; only ordinary words are compared
+            words = set(re.findall(r"\b[a-z]{1,30}\b", text.lower()))
+            with self.subTest(doc=i):
+                self.assertEqual(words - out, set())
+
+    def test_small_final_remainder_joins_previous_chunk(self):
+        body = " ".join(["The employee shall notify the manager."] * 6)
+        chunks = list(chunk_blocks([body + "\n\nRegards"], max_tokens=40, overlap_tokens=0, min_tokens=12))
+        self.assertTrue(chunks[-1].endswith("Regards"))
+        self.assertNotEqual(chunks[-1], "Regards")
+
+    def test_heading_starts_a_chunk(self):
+        text = "Intro text that is long enough to stand on its own here.\n\nTRAVEL\n\nTravel is reimbursed."
+        chunks = list(chunk_blocks([text], max_tokens=256, overlap_tokens=32, min_tokens=5))
+        self.assertEqual(len(chunks), 2)
+        self.assertTrue(chunks[1].startswith("TRAVEL"))
+
+    def test_tiny_document_yields_nothing(self):
+        self.assertEqual(list(chunk_blocks(["Hi."], min_tokens=12)), [])
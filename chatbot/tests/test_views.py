@@ -0,0 +1,83 @@
+import json
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from chatbot.models import Document
+from chatbot.views import _scope
+
+
+class ScopeTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def scope(self, data):
+        return _scope(self.factory.post("/api/ask/", data))
+
+    def test_comma_separated_doc_ids(self):
+        self.assertEqual(self.scope({"doc_ids": "1, 2,,3"}), ("", ["1", "2", "3"]))
+
+    def test_repeated_doc_ids(self):
+        self.assertEqual(self.scope({"doc_ids": ["1", "2,3"]}), ("", ["1", "2", "3"]))
+
+    def test_no_doc_ids(self):
+        self.assertEqual(self.scope({"doc_ids": " , "}), ("", None))
+        self.assertEqual(self.scope({}), ("", None))
+
+    def test_namespace_is_normalized(self):
+        self.assertEqual(self.scope({"namespace": " HR "}), ("hr", None))
+
+    def test_invalid_namespace(self):
+        with self.assertRaises(ValueError):
+            self.scope({"namespace": "no spaces"})
+
+
+@override_settings(ASK_BATCH_TOKEN="secret")
+class AskBatchValidationTests(SimpleTestCase):
+    def post(self, body, token="secret"):
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        return self.client.post("/api/ask/batch/", json.dumps(body), content_type="application/json",
+                                headers=headers)
+
+    def test_token_required(self):
+        self.assertEqual(self.post({"questions": ["q"]}, token=None).status_code, 401)
+        self.assertEqual(self.post({"questions": ["q"]}, token="wrong").status_code, 401)
+
+    @override_settings(ASK_BATCH_TOKEN="")
+    def test_disabled_without_a_token(self):
+        self.assertEqual(self.post({"questions": ["q"]}, token=None).status_code, 403)
+
+    @override_settings(ASK_BATCH_MAX_QUESTIONS=2)
+    def test_question_cap(self):
+        self.assertEqual(self.post({"questions": ["a", "b", "c"]}).status_code, 400)
+
+    def test_doc_ids_must_be_a_list(self):
+        resp = self.post({"questions": ["q"], "doc_ids": "12"})
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("doc_ids", resp.json()["error"])
+
+    def test_doc_ids_must_hold_ids(self):
+        for bad in ([1.5], [True], [None], [["1"]]):
+            with self.subTest(doc_ids=bad):
+                self.assertEqual(self.post({"questions": ["q"], "doc_ids": bad}).status_code, 400)
+
+    def test_questions_must_be_strings(self):
+        self.assertEqual(self.post({"questions": "q"}).status_code, 400)
+
+
+@mock.patch("chatbot.views.submit_ingestion")
+class UploadTests(TestCase):
+    def post(self, **data):
+        return self.client.post("/api/upload/", {"file": SimpleUploadedFile("policy.txt", b"Leave policy."), **data})
+
+    def test_unknown_doc_id_is_not_created(self, submit):
+        resp = self.post(doc_id="999")
+        self.assertEqual(resp.status_code, 404)
+        self.assertEqual(resp.json()["error"], "Document not found")
+        self.assertFalse(Document.objects.exists())
+        submit.assert_not_called()
+
+    def test_non_numeric_doc_id(self, submit):
+        self.assertEqual(self.post(doc_id="abc").status_code, 400)
+        submit.assert_not_called()
@@ -0,0 +1,37 @@
+import os
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from chatbot.warmup import _serving
+
+
+def serving(argv, env=None):
+    with mock.patch("sys.argv", argv), mock.patch.dict(os.environ):
+        os.environ.pop("RUN_MAIN", None)
+        os.environ.update(env or {})
+        return _serving()
+
+
+@override_settings(WARMUP="")
+class ServingTests(SimpleTestCase):
+    def test_servers_warm_up(self):
+        self.assertTrue(serving(["/venv/bin/gunicorn", "config.wsgi"]))
+        self.assertTrue(serving(["/venv/lib/python3.11/site-packages/gunicorn/__main__.py", "config.wsgi"]))
+        self.assertTrue(serving(["/venv/bin/uvicorn", "config.asgi:application"]))
+
+    def test_runserver_child_only(self):
+        self.assertFalse(serving(["manage.py", "runserver"]))
+        self.assertTrue(serving(["manage.py", "runserver"], {"RUN_MAIN": "true"}))
+        self.assertTrue(serving(["manage.py", "runserver", "--noreload"]))
+
+    def test_other_processes_stay_lazy(self):
+        for argv in (["-c"], ["manage.py", "migrate"], ["/venv/bin/pytest"], ["worker.py"], []):
+            with self.subTest(argv=argv):
+                self.assertFalse(serving(argv))
+
+    def test_explicit_override(self):
+        with override_settings(WARMUP="1"):
+            self.assertTrue(serving(["-c"]))
+        with override_settings(WARMUP="0"):
+            self.assertFalse(serving(["/venv/bin/gunicorn"]))
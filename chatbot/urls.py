@@ -6,6 +6,11 @@ urlpatterns = [
     path("chat/", views.chat, name="chat"),
     path("admin-dashboard/", views.admin_dashboard, name="admin_dashboard"),
     path("api/upload/", views.upload, name="upload"),
+    path("api/jobs/<int:job_id>/", views.job_status, name="job_status"),
     path("api/delete/", views.remove_document, name="remove_document"),
     path("api/ask/", views.ask, name="ask"),
+    path("api/ask/stream/", views.ask_stream, name="ask_stream"),
+    path("api/ask/batch/", views.ask_batch, name="ask_batch"),
+    path("api/startup/", views.startup_view, name="startup"),
+    path("metrics", views.metrics_view, name="metrics"),
 ]
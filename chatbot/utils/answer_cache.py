@@ -0,0 +1,138 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+class SemanticCache:
+    """
+    In-process cache of answers keyed by question embedding.
+
+    A lookup hits when a cached question of the same scope lies within
+    `max_distance` cosine distance of the new one. Entries expire after
+    `ttl` seconds, the least recently used are evicted beyond
+    `max_entries`, and everything is dropped when the corpus version
+    changes.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 3600, max_distance: float = 0.05):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._next_id = 0
+        self._version: Optional[int] = None
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_ids: List[int] = []
+
+    @staticmethod
+    def _unit(vec: List[float]) -> np.ndarray:
+        v = np.asarray(vec, dtype=np.float32)
+        n = float(np.linalg.norm(v))
+        return v / n if n > 0 else v
+
+    def _sync_version(self, version: int) -> bool:
+        """
+        Move to a newer corpus version, clearing the cache. Versions only
+        grow, so an older one comes from a request that read it before an
+        ingest: returns False and leaves the fresh entries alone.
+        """
+        if self._version is not None and version < self._version:
+            return False
+        if self._version != version:
+            if self._entries:
+                logger.info("Corpus changed; clearing semantic answer cache")
+            self._entries.clear()
+            self._matrix = None
+            self._version = version
+        return True
+
+    def _rebuild(self):
+        self._matrix_ids = list(self._entries.keys())
+        if self._matrix_ids:
+            self._matrix = np.stack([self._entries[i]["vec"] for i in self._matrix_ids])
+        else:
+            self._matrix = None
+
+    def get(self, vec: List[float], version: int, scope: Hashable = None) -> Optional[Dict[str, Any]]:
+        """Return the cached value for the nearest matching question, if any."""
+        q = self._unit(vec)
+        now = time.time()
+        with self._lock:
+            if not self._sync_version(version):
+                self.misses += 1
+                return None
+            if self._entries and self._matrix is None:
+                self._rebuild()
+            if self._matrix is None or self._matrix.shape[1] != q.shape[0]:
+                self.misses += 1
+                return None
+
+            dists = 1.0 - self._matrix @ q
+            for idx in np.argsort(dists):
+                if dists[idx] > self.max_distance:
+                    break
+                entry_id = self._matrix_ids[idx]
+                entry = self._entries.get(entry_id)
+                if entry is None or entry["scope"] != scope:
+                    continue
+                if now - entry["created"] > self.ttl:
+                    del self._entries[entry_id]
+                    self._matrix = None
+                    continue
+                self._entries.move_to_end(entry_id)
+                self.hits += 1
+                return entry["value"]
+
+            self.misses += 1
+            return None
+
+    def put(self, vec: List[float], version: int, value: Dict[str, Any], scope: Hashable = None):
+        """Cache an answer computed against corpus `version`; dropped if the corpus has moved on since."""
+        with self._lock:
+            if not self._sync_version(version):
+                return
+            self._entries[self._next_id] = {
+                "vec": self._unit(vec),
+                "scope": scope,
+                "value": value,
+                "created": time.time(),
+            }
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+_CACHE: Optional[SemanticCache] = None
+_CACHE_LOCK = threading.Lock()
+
+def get_answer_cache() -> Optional[SemanticCache]:
+    """Process-wide answer cache, or None when ANSWER_CACHE_ENABLED is off."""
+    global _CACHE
+    if not getattr(settings, "ANSWER_CACHE_ENABLED", True):
+        return None
+    if _CACHE is None:
+        with _CACHE_LOCK:
+            if _CACHE is None:
+                _CACHE = SemanticCache(
+                    max_entries=int(getattr(settings, "ANSWER_CACHE_MAX_ENTRIES", 1000)),
+                    ttl=float(getattr(settings, "ANSWER_CACHE_TTL", 3600)),
+                    max_distance=float(getattr(settings, "ANSWER_CACHE_MAX_DISTANCE", 0.05)),
+                )
+    return _CACHE
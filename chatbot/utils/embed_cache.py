@@ -0,0 +1,194 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    key TEXT PRIMARY KEY,
+    vec BLOB NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used);
+"""
+
+# SQLite caps the number of bound parameters per statement
+_SQL_BATCH = 500
+# Writes between exact recounts of the table; in between, a running count
+# decides whether eviction is needed (other processes' writes are picked up
+# at the next recount)
+_RECOUNT_EVERY = 10_000
+# Eviction trims this fraction below max_entries so a full cache is not
+# recounted and trimmed again on every write
+_EVICT_SLACK = 0.05
+# How long writes wait for another process's lock on the cache file
+_BUSY_TIMEOUT_MS = 30_000
+# A hit only rewrites last_used once it is this many seconds old, so most
+# reads stay read-only and don't queue behind other processes' writes
+_TOUCH_AFTER = 3600.0
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so cosmetic differences map to the same cache key."""
+    return " ".join(text.split())
+
+def cache_key(backend: str, model: str, text: str) -> str:
+    """Content-addressed key: backend, model name and a hash of the normalized text."""
+    digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    return f"{backend}:{model}:{digest}"
+
+def _pack(vec: List[float]) -> bytes:
+    return array("f", vec).tobytes()
+
+def _unpack(blob: bytes) -> List[float]:
+    a = array("f")
+    a.frombytes(blob)
+    return a.tolist()
+
+class EmbeddingCache:
+    """
+    On-disk LRU cache of embedding vectors stored as float32 blobs in SQLite.
+
+    Safe to share between threads; WAL mode lets several worker processes
+    read and write the same file.
+    """
+
+    def __init__(self, path: str, max_entries: int = 200_000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # Running row count (None until first needed), and rows written since it was exact
+        self._count: Optional[int] = None
+        self._since_recount = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=_BUSY_TIMEOUT_MS / 1000)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """
+        Return cached vectors for the given keys and refresh their LRU
+        timestamp when it is older than _TOUCH_AFTER.
+        """
+        found: Dict[str, List[float]] = {}
+        if not keys:
+            return found
+        unique = list(dict.fromkeys(keys))
+        stale: List[str] = []
+        now = time.time()
+        with self._lock:
+            for i in range(0, len(unique), _SQL_BATCH):
+                part = unique[i:i + _SQL_BATCH]
+                marks = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT key, vec, last_used FROM embeddings WHERE key IN ({marks})", part
+                ).fetchall()
+                for k, blob, last_used in rows:
+                    found[k] = _unpack(blob)
+                    if now - last_used >= _TOUCH_AFTER:
+                        stale.append(k)
+            if stale:
+                # Don't wait for the write lock: if another writer holds it the
+                # refresh is skipped and retried at the next hit
+                self._conn.execute("PRAGMA busy_timeout = 0")
+                try:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                        [(now, k) for k in stale],
+                    )
+                    self._conn.commit()
+                except sqlite3.OperationalError as e:
+                    self._conn.rollback()
+                    logger.debug(f"Skipped refreshing {len(stale)} embedding cache entries: {e}")
+                finally:
+                    self._conn.execute(f"PRAGMA busy_timeout = {_BUSY_TIMEOUT_MS}")
+            hit = sum(1 for k in keys if k in found)
+            self.hits += hit
+            self.misses += len(keys) - hit
+        return found
+
+    def put_many(self, items: Iterable[Tuple[str, List[float]]]):
+        """Store vectors and evict least-recently-used entries once there are more than max_entries."""
+        now = time.time()
+        rows = [(k, _pack(v), now) for k, v in items]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vec, last_used) VALUES (?, ?, ?)", rows
+            )
+            self._evict(len(rows))
+            self._conn.commit()
+
+    def _recount(self) -> int:
+        (self._count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        self._since_recount = 0
+        return self._count
+
+    def _evict(self, written: int):
+        if self.max_entries <= 0:
+            return
+        # Replaced keys are counted as new, so the running count only overestimates
+        # this process's share; an exact COUNT(*) confirms before anything is deleted
+        self._since_recount += written
+        if self._count is None or self._since_recount >= _RECOUNT_EVERY:
+            self._recount()
+        else:
+            self._count += written
+            if self._count <= self.max_entries:
+                return
+            self._recount()
+        if self._count <= self.max_entries:
+            return
+        excess = self._count - int(self.max_entries * (1 - _EVICT_SLACK))
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                (excess,),
+            )
+            self._count -= excess
+            logger.info(f"Evicted {excess} entries from embedding cache")
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._count, self._since_recount = 0, 0
+            self.hits = self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            return {"entries": count, "hits": self.hits, "misses": self.misses}
+
+_CACHE: Optional[EmbeddingCache] = None
+_CACHE_LOCK = threading.Lock()
+
+def get_cache() -> Optional[EmbeddingCache]:
+    """Process-wide cache instance, or None when EMBED_CACHE_ENABLED is off."""
+    global _CACHE
+    if not getattr(settings, "EMBED_CACHE_ENABLED", True):
+        return None
+    if _CACHE is None:
+        with _CACHE_LOCK:
+            if _CACHE is None:
+                path = getattr(settings, "EMBED_CACHE_PATH", ".embed_cache.sqlite3")
+                max_entries = int(getattr(settings, "EMBED_CACHE_MAX_ENTRIES", 200_000))
+                try:
+                    _CACHE = EmbeddingCache(str(path), max_entries=max_entries)
+                    logger.info(f"Embedding cache initialized at {path}")
+                except Exception as e:
+                    logger.error(f"Failed to open embedding cache at {path}: {e}")
+                    return None
+    return _CACHE
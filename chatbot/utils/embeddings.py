@@ -1,11 +1,22 @@
 # chatbot/utils/embeddings.py
-from typing import List, Literal
+import atexit
+import hashlib
+import logging
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Literal, Optional
 from django.conf import settings
+from . import metrics
+
+logger = logging.getLogger(__name__)
 
 # ---- Backend selector ----
-def get_backend() -> Literal["google", "sbert"]:
+def get_backend() -> Literal["google", "sbert", "hash"]:
     val = (getattr(settings, "EMBED_BACKEND", "google") or "google").lower()
-    return "google" if val not in ("google", "sbert") else val
+    return "google" if val not in ("google", "sbert", "hash") else val
 
 # ---- Google client (singleton, version tolerant) ----
 _GENAI_CLIENT = None
@@ -28,64 +39,371 @@ def _get_genai_client():
     _GENAI_CLIENT = genai.Client(api_key=api_key)
     return _GENAI_CLIENT
 
+_GOOGLE_EMBED_MODEL = "models/text-embedding-004"
+
+def _embed_settings() -> tuple[int, int, int]:
+    """Batch size, concurrent batches and retry budget for the Google path."""
+    batch_size = max(1, int(getattr(settings, "EMBED_BATCH_SIZE", 100) or 100))
+    concurrency = max(1, int(getattr(settings, "EMBED_MAX_CONCURRENCY", 4) or 4))
+    retries = max(0, int(getattr(settings, "EMBED_MAX_RETRIES", 5) or 0))
+    return batch_size, concurrency, retries
+
+def _normalize_embed_response(resp) -> List[List[float]]:
+    """Normalize an embed_content response across SDK shapes into a list of vectors."""
+    if hasattr(resp, "embedding") and hasattr(resp.embedding, "values"):
+        return [list(resp.embedding.values)]
+    if getattr(resp, "embeddings", None):  # batch-like shape
+        return [list(e.values) for e in resp.embeddings]
+    # Final fallback: try common dict-ish shapes
+    emb = getattr(resp, "data", None)
+    if emb and isinstance(emb, list) and hasattr(emb[0], "embedding"):
+        return [list(e.embedding.values) for e in emb]
+    raise RuntimeError("Unrecognized embed response shape from google-genai")
+
+def _is_rate_limited(exc: Exception) -> bool:
+    code = getattr(exc, "code", None) or getattr(exc, "status_code", None)
+    if code in (429, 503):
+        return True
+    msg = str(exc).upper()
+    return "429" in msg or "RESOURCE_EXHAUSTED" in msg or "RATE LIMIT" in msg or "UNAVAILABLE" in msg
+
+def _embed_call(client, contents, batched: bool):
+    # Prefer the modern path: client.models.embed_content(...)
+    # Fallback to client.embed_content(...) if older shim exists.
+    if hasattr(client, "models") and hasattr(client.models, "embed_content"):
+        fn = client.models.embed_content
+    elif hasattr(client, "embed_content"):
+        fn = client.embed_content
+    else:
+        raise RuntimeError("google-genai Client has no embed_content; upgrade to google-genai>=0.5.0")
+
+    if batched:
+        return fn(
+            model=_GOOGLE_EMBED_MODEL,
+            contents=contents,
+            config={"task_type": "RETRIEVAL_DOCUMENT"},
+        )
+    return fn(
+        model=_GOOGLE_EMBED_MODEL,
+        content=contents,
+        task_type="RETRIEVAL_DOCUMENT",
+    )
+
+def _google_embed_batch(client, batch: List[str], retries: int) -> List[List[float]]:
+    """
+    Embed one batch in a single request, retrying with exponential backoff
+    on rate-limit errors. Older SDKs that only accept a single 'content'
+    fall back to per-item calls for this batch.
+    """
+    attempt = 0
+    while True:
+        try:
+            try:
+                vectors = _normalize_embed_response(_embed_call(client, batch, batched=True))
+            except TypeError:
+                vectors = []
+                for t in batch:
+                    vectors.extend(_normalize_embed_response(_embed_call(client, t, batched=False)))
+            if len(vectors) != len(batch):
+                raise RuntimeError(
+                    f"Embedding count mismatch: got {len(vectors)} embeddings for batch of {len(batch)}"
+                )
+            return vectors
+        except Exception as e:
+            if attempt >= retries or not _is_rate_limited(e):
+                raise
+            delay = min(30.0, 0.5 * (2 ** attempt)) * (0.5 + random.random())
+            logger.warning(f"Embedding batch rate-limited, retrying in {delay:.1f}s ({attempt + 1}/{retries})")
+            time.sleep(delay)
+            attempt += 1
+
 def _google_embed(texts: List[str]) -> List[List[float]]:
     """
-    Version-safe embedder. Handles both batch and per-item pathways,
-    and normalizes returned shapes across SDK versions.
+    Version-safe batched embedder. Packs texts into request-sized batches,
+    runs a bounded number of batches concurrently and returns vectors in
+    input order.
     """
     client = _get_genai_client()
+    batch_size, concurrency, retries = _embed_settings()
+
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    if len(batches) == 1:
+        return _google_embed_batch(client, batches[0], retries)
+
+    results: List[List[List[float]]] = [None] * len(batches)
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(batches))) as pool:
+        futures = {pool.submit(_google_embed_batch, client, b, retries): i for i, b in enumerate(batches)}
+        for fut in as_completed(futures):
+            results[futures[fut]] = fut.result()
 
-    # Some versions accept only single 'content', so do per-text calls to be safe.
     vectors: List[List[float]] = []
-    for t in texts:
-        # Prefer the modern path: client.models.embed_content(...)
-        # Fallback to client.embed_content(...) if older shim exists.
-        resp = None
-        # Try modern
-        if hasattr(client, "models") and hasattr(client.models, "embed_content"):
-            resp = client.models.embed_content(
-                model="models/text-embedding-004",
-                content=t,
-                task_type="RETRIEVAL_DOCUMENT",
-            )
-        # Fallback older
-        elif hasattr(client, "embed_content"):
-            resp = client.embed_content(
-                model="models/text-embedding-004",
-                content=t,
-                task_type="RETRIEVAL_DOCUMENT",
-            )
-        else:
-            raise RuntimeError("google-genai Client has no embed_content; upgrade to google-genai>=0.5.0")
-
-        # Normalize across SDK shapes
-        if hasattr(resp, "embedding") and hasattr(resp.embedding, "values"):
-            vectors.append(list(resp.embedding.values))
-        elif hasattr(resp, "embeddings"):  # batch-like shape
-            vectors.extend([list(e.values) for e in resp.embeddings])
-        else:
-            # Final fallback: try common dict-ish shapes
-            emb = getattr(resp, "data", None) or getattr(resp, "embeddings", None)
-            if emb and isinstance(emb, list) and hasattr(emb[0], "embedding"):
-                vectors.append(list(emb[0].embedding.values))
-            else:
-                raise RuntimeError("Unrecognized embed response shape from google-genai")
+    for r in results:
+        vectors.extend(r)
     return vectors
 
 # ---- SBERT ----
+_SBERT_MODEL_NAME = "all-MiniLM-L6-v2"
 _sbert_model = None
-def _sbert_embed(texts: List[str]) -> List[List[float]]:
+_sbert_pool = None
+_SBERT_LOCK = threading.Lock()
+# The encode pool is a single input/output queue pair that each call drains
+# by chunk id, so only one caller may use it at a time
+_SBERT_POOL_LOCK = threading.Lock()
+
+def _sbert_precision() -> str:
+    val = (getattr(settings, "SBERT_PRECISION", "fp32") or "fp32").lower()
+    return "int8" if val == "int8" else "fp32"
+
+def _sbert_model_name() -> str:
+    # Quantized vectors differ slightly, so they get their own cache keys
+    precision = _sbert_precision()
+    return _SBERT_MODEL_NAME if precision == "fp32" else f"{_SBERT_MODEL_NAME}+{precision}"
+
+def _sbert_batch_size() -> int:
+    return max(1, int(getattr(settings, "SBERT_BATCH_SIZE", 64) or 64))
+
+def _get_sbert_model():
+    """Load the SBERT model once per process, quantized if SBERT_PRECISION=int8."""
     global _sbert_model
-    if _sbert_model is None:
-        from sentence_transformers import SentenceTransformer
-        _sbert_model = SentenceTransformer("all-MiniLM-L6-v2")
-    return _sbert_model.encode(texts, normalize_embeddings=True).tolist()
+    if _sbert_model is not None:
+        return _sbert_model
+    with _SBERT_LOCK:
+        if _sbert_model is None:
+            from sentence_transformers import SentenceTransformer
+
+            started = time.perf_counter()
+            model = SentenceTransformer(_SBERT_MODEL_NAME, device="cpu")
+            if _sbert_precision() == "int8":
+                import torch
+
+                # Dynamic int8 quantization of the Linear layers: ~2x faster on CPU,
+                # cosine scores stay within about 1% of the fp32 model
+                model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            _sbert_model = model
+            logger.info(
+                f"SBERT {_sbert_model_name()} loaded in {time.perf_counter() - started:.1f}s"
+            )
+    return _sbert_model
+
+def _get_sbert_pool():
+    """Start the multi-process encode pool once; stopped at interpreter exit."""
+    global _sbert_pool
+    if _sbert_pool is not None:
+        return _sbert_pool
+    model = _get_sbert_model()
+    with _SBERT_LOCK:
+        if _sbert_pool is None:
+            processes = int(getattr(settings, "SBERT_PROCESSES", 0) or 0)
+            _sbert_pool = model.start_multi_process_pool(target_devices=["cpu"] * processes)
+            atexit.register(_stop_sbert_pool)
+            logger.info(f"SBERT encode pool started with {processes} processes")
+    return _sbert_pool
+
+def _stop_sbert_pool():
+    global _sbert_pool
+    with _SBERT_POOL_LOCK:
+        with _SBERT_LOCK:
+            pool, _sbert_pool = _sbert_pool, None
+        if pool is not None:
+            from sentence_transformers import SentenceTransformer
+
+            SentenceTransformer.stop_multi_process_pool(pool)
+
+def _sbert_encode(texts: List[str]) -> List[List[float]]:
+    """
+    Encode in one process, or across the encode pool for large ingestion
+    jobs (SBERT_PROCESSES > 1 and at least SBERT_POOL_MIN_TEXTS texts).
+    Concurrent pool jobs take turns; each already uses every pool process.
+    """
+    import numpy as np
+
+    model = _get_sbert_model()
+    batch_size = _sbert_batch_size()
+    processes = int(getattr(settings, "SBERT_PROCESSES", 0) or 0)
+    pool_min = int(getattr(settings, "SBERT_POOL_MIN_TEXTS", 2000) or 0)
+    if processes > 1 and len(texts) >= pool_min:
+        pool = _get_sbert_pool()
+        with _SBERT_POOL_LOCK:
+            vectors = model.encode_multi_process(texts, pool, batch_size=batch_size)
+        # encode_multi_process has no normalize flag on older releases
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return (vectors / np.where(norms == 0, 1.0, norms)).tolist()
+    return model.encode(texts, batch_size=batch_size, normalize_embeddings=True).tolist()
+
+class _Coalescer:
+    """
+    Merge small encode calls from concurrent threads into one forward pass.
+
+    The first caller to arrive waits up to `window` seconds (or until
+    `max_texts` are queued) and then encodes everything queued so far;
+    the other callers block until their slice of the result is ready.
+    """
+
+    def __init__(self, encode: Callable[[List[str]], List[List[float]]], window: float, max_texts: int):
+        self._encode = encode
+        self._window = window
+        self._max_texts = max_texts
+        self._cond = threading.Condition()
+        self._pending: List[dict] = []
+        self._queued = 0
+        self._leading = False
+
+    def encode(self, texts: List[str]) -> List[List[float]]:
+        req = {"texts": texts, "vectors": None, "error": None, "done": threading.Event()}
+        with self._cond:
+            self._pending.append(req)
+            self._queued += len(texts)
+            leader = not self._leading
+            if leader:
+                self._leading = True
+            elif self._queued >= self._max_texts:
+                self._cond.notify_all()
+        if not leader:
+            req["done"].wait()
+            if req["error"] is not None:
+                raise req["error"]
+            return req["vectors"]
+
+        with self._cond:
+            deadline = time.monotonic() + self._window
+            while self._queued < self._max_texts:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch, self._pending, self._queued = self._pending, [], 0
+            self._leading = False
+
+        try:
+            vectors = self._encode([t for r in batch for t in r["texts"]])
+            offset = 0
+            for r in batch:
+                r["vectors"] = vectors[offset:offset + len(r["texts"])]
+                offset += len(r["texts"])
+        except Exception as e:
+            for r in batch:
+                r["error"] = e
+        finally:
+            for r in batch:
+                r["done"].set()
+        metrics.inc("embed_coalesced_total", len(batch))
+        if req["error"] is not None:
+            raise req["error"]
+        return req["vectors"]
+
+_coalescer: Optional[_Coalescer] = None
+
+def _get_coalescer() -> Optional[_Coalescer]:
+    """The query-side coalescer, or None when SBERT_COALESCE_MS is 0."""
+    global _coalescer
+    window_ms = float(getattr(settings, "SBERT_COALESCE_MS", 5) or 0)
+    if window_ms <= 0:
+        return None
+    if _coalescer is None:
+        with _SBERT_LOCK:
+            if _coalescer is None:
+                _coalescer = _Coalescer(_sbert_encode, window_ms / 1000.0, _sbert_batch_size())
+    return _coalescer
+
+def _sbert_embed(texts: List[str]) -> List[List[float]]:
+    # Query-sized calls go through the coalescer; ingestion batches encode directly
+    coalescer = _get_coalescer()
+    if coalescer is not None and len(texts) <= int(getattr(settings, "SBERT_COALESCE_MAX_TEXTS", 8) or 0):
+        return coalescer.encode(texts)
+    return _sbert_encode(texts)
+
+# ---- Hash (deterministic, offline) ----
+# Signed feature hashing of word unigrams and bigrams. No model or network,
+# so it is meant for benchmarks and offline development, not retrieval quality.
+_HASH_DIM = 384
+_HASH_MODEL_NAME = f"feature-hash-{_HASH_DIM}"
+_HASH_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+def _hash_embed(texts: List[str]) -> List[List[float]]:
+    import numpy as np
+
+    out = np.zeros((len(texts), _HASH_DIM), dtype=np.float32)
+    for row, text in enumerate(texts):
+        toks = _HASH_TOKEN.findall(text.lower())
+        for tok in toks + [f"{a} {b}" for a, b in zip(toks, toks[1:])]:
+            h = int.from_bytes(hashlib.blake2b(tok.encode("utf-8"), digest_size=8).digest(), "little")
+            out[row, h % _HASH_DIM] += 1.0 if h >> 63 else -1.0
+    norms = np.linalg.norm(out, axis=1, keepdims=True)
+    out /= np.where(norms == 0, 1.0, norms)
+    return out.tolist()
+
+# ---- Cached dispatch ----
+def model_name(backend: str) -> str:
+    if backend == "hash":
+        return _HASH_MODEL_NAME
+    return _GOOGLE_EMBED_MODEL if backend == "google" else _sbert_model_name()
+
+def _embed_uncached(texts: List[str], backend: str) -> List[List[float]]:
+    if backend == "google":
+        return _google_embed(texts)
+    if backend == "hash":
+        return _hash_embed(texts)
+    return _sbert_embed(texts)
+
+def _cached_embed(texts: List[str], backend: str) -> List[List[float]]:
+    """
+    Serve vectors from the on-disk cache and only send misses to the backend.
+    Duplicate texts within one call are embedded once.
+    """
+    from .embed_cache import cache_key, get_cache
+
+    cache = get_cache()
+    if cache is None:
+        return _embed_uncached(texts, backend)
+
+    model = model_name(backend)
+    keys = [cache_key(backend, model, t) for t in texts]
+    try:
+        found = cache.get_many(keys)
+    except Exception as e:
+        logger.warning(f"Failed to read embedding cache, embedding without it: {e}")
+        found = {}
+    hits = sum(1 for k in keys if k in found)
+    metrics.inc("embed_cache_total", hits, result="hit")
+    metrics.inc("embed_cache_total", len(keys) - hits, result="miss")
+
+    missing: Dict[str, str] = {}
+    for k, t in zip(keys, texts):
+        if k not in found and k not in missing:
+            missing[k] = t
+
+    if missing:
+        fresh = _embed_uncached(list(missing.values()), backend)
+        if len(fresh) != len(missing):
+            raise RuntimeError(
+                f"Embedding count mismatch: got {len(fresh)} embeddings for {len(missing)} texts"
+            )
+        new_items = list(zip(missing.keys(), fresh))
+        try:
+            cache.put_many(new_items)
+        except Exception as e:
+            logger.warning(f"Failed to write embedding cache: {e}")
+        found.update(new_items)
+
+    return [found[k] for k in keys]
+
+def cache_stats() -> Dict[str, int]:
+    """Hit/miss counters and entry count of the embedding cache."""
+    from .embed_cache import get_cache
+
+    cache = get_cache()
+    return cache.stats() if cache is not None else {"entries": 0, "hits": 0, "misses": 0}
 
 # ---- Public entry ----
+@metrics.timed("embed")
 def embed_texts(texts: List[str]) -> List[List[float]]:
     """
     Generate embeddings for a list of texts.
 
+    Vectors already in the on-disk embedding cache are returned without
+    calling the backend; only cache misses are embedded.
+
     Args:
         texts: List of text strings to embed
 
@@ -105,20 +423,14 @@ def embed_texts(texts: List[str]) -> List[List[float]]:
         raise ValueError("All texts are empty after stripping whitespace")
 
     if len(non_empty_texts) != len(texts):
-        import logging
-        logger = logging.getLogger(__name__)
         logger.warning(
             f"Filtered out {len(texts) - len(non_empty_texts)} empty texts from embedding batch"
         )
 
     backend = get_backend()
     try:
-        if backend == "google":
-            return _google_embed(non_empty_texts)
-        return _sbert_embed(non_empty_texts)
+        return _cached_embed(non_empty_texts, backend)
     except Exception as e:
-        import logging
-        logger = logging.getLogger(__name__)
         logger.error(f"Embedding failed with {backend} backend: {e}")
 
         # Safety net: if Google fails, gracefully fall back so uploads don't 500.
@@ -126,7 +438,7 @@ def embed_texts(texts: List[str]) -> List[List[float]]:
         if backend == "google":
             logger.warning("Falling back to SBERT embeddings due to Google API failure")
             try:
-                return _sbert_embed(non_empty_texts)
+                return _cached_embed(non_empty_texts, "sbert")
             except Exception as fallback_error:
                 logger.error(f"Fallback to SBERT also failed: {fallback_error}")
                 raise RuntimeError(
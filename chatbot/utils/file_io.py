@@ -1,10 +1,12 @@
 import mimetypes
 import os
 import logging
-import fitz  # PyMuPDF
-from docx import Document as Docx
-from PIL import Image
-from .ocr import ocr_image
+from typing import Any, Dict, Iterator, List, Tuple
+from django.conf import settings
+from . import metrics
+
+# PyMuPDF, python-docx, PIL and the OCR module are imported where they are
+# used, so processes that only answer questions never load them.
 
 logger = logging.getLogger(__name__)
 
@@ -32,22 +34,81 @@ def detect_type(filepath: str) -> str:
         return "image"
     return "txt"
 
-def read_pdf_text(path: str) -> str:
-    """Extract text from PDF file."""
+def _ocr_options() -> Dict[str, Any]:
+    from .ocr import default_workers
+
+    return {
+        "dpi": int(getattr(settings, "OCR_DPI", 300)),
+        "timeout": int(getattr(settings, "OCR_PAGE_TIMEOUT", 120)),
+        "workers": int(getattr(settings, "OCR_WORKERS", 0)) or default_workers(),
+        "max_side": int(getattr(settings, "OCR_MAX_SIDE", 4000)),
+    }
+
+def _resolve_pages(path: str, pending: List[Tuple[int, str]], opts: Dict[str, Any]) -> Iterator[str]:
+    """OCR the text-less pages of a batch in parallel, then yield page texts in order."""
+    min_chars = int(getattr(settings, "OCR_MIN_PAGE_CHARS", 20))
+    need = [i for i, t in pending if len(t.strip()) < min_chars]
+    ocr = {}
+    if need:
+        from .ocr import ocr_pdf_pages
+
+        with metrics.span("ocr"):
+            ocr = ocr_pdf_pages(path, need, **opts)
+        logger.info(f"OCR fallback on {len(need)} page(s) of '{path}'")
+
+    for i, t in pending:
+        o = ocr.get(i, "")
+        if len(o.strip()) > len(t.strip()):
+            t = o
+        if t:
+            yield t
+
+def _iter_pdf_page_texts(path: str) -> Iterator[str]:
+    """
+    Yield the non-empty text of each PDF page in order. Pages without a
+    usable text layer are rendered and OCR'd in batches across the OCR
+    process pool when OCR_PDF_FALLBACK is on.
+    """
+    import fitz  # PyMuPDF
+
     try:
         doc = fitz.open(path)
-        texts = []
+    except Exception as e:
+        logger.error(f"Failed to read PDF '{path}': {e}")
+        raise RuntimeError(f"Failed to read PDF file: {str(e)}")
+
+    fallback = getattr(settings, "OCR_PDF_FALLBACK", True)
+    opts = _ocr_options()
+    batch = max(1, opts["workers"] * 2)
+    pending: List[Tuple[int, str]] = []
+
+    try:
         for page_num, page in enumerate(doc):
             try:
-                page_text = page.get_text("text")
-                if page_text:
-                    texts.append(page_text)
+                page_text = page.get_text("text") or ""
             except Exception as e:
                 logger.warning(f"Failed to extract text from page {page_num + 1}: {e}")
+                page_text = ""
+
+            if not fallback:
+                if page_text:
+                    yield page_text
                 continue
+
+            pending.append((page_num, page_text))
+            if len(pending) >= batch:
+                yield from _resolve_pages(path, pending, opts)
+                pending = []
+
+        if pending:
+            yield from _resolve_pages(path, pending, opts)
+    finally:
         doc.close()
 
-        result = "\n".join(texts).strip()
+def read_pdf_text(path: str) -> str:
+    """Extract text from PDF file, falling back to OCR for scanned pages."""
+    try:
+        result = "\n".join(_iter_pdf_page_texts(path)).strip()
         if not result:
             logger.warning(f"PDF file '{path}' contains no extractable text")
         return result
@@ -58,6 +119,8 @@ def read_pdf_text(path: str) -> str:
 
 def read_docx_text(path: str) -> str:
     """Extract text from DOCX file."""
+    from docx import Document as Docx
+
     try:
         d = Docx(path)
         paragraphs = []
@@ -100,6 +163,9 @@ def read_txt(path: str) -> str:
 
 def read_image_text(path: str) -> str:
     """Extract text from image using OCR."""
+    from PIL import Image
+    from .ocr import ocr_image
+
     try:
         img = Image.open(path)
 
@@ -111,7 +177,9 @@ def read_image_text(path: str) -> str:
         if img.size[0] == 0 or img.size[1] == 0:
             raise ValueError("Image has zero dimensions")
 
-        text = ocr_image(img)
+        opts = _ocr_options()
+        with metrics.span("ocr"):
+            text = ocr_image(img, timeout=opts["timeout"], max_side=opts["max_side"], target_dpi=opts["dpi"])
         img.close()
 
         if not text:
@@ -123,6 +191,7 @@ def read_image_text(path: str) -> str:
         logger.error(f"Failed to read image '{path}': {e}")
         raise RuntimeError(f"Failed to extract text from image: {str(e)}")
 
+@metrics.timed("extract")
 def extract_text(path: str, forced_type: str | None = None) -> tuple[str, str]:
     """
     Extract text from a file based on its type.
@@ -165,3 +234,94 @@ def extract_text(path: str, forced_type: str | None = None) -> tuple[str, str]:
     except Exception as e:
         logger.error(f"Text extraction failed for '{path}' (type: {ftype}): {e}")
         raise
+
+# ---- Streaming extraction ----
+# Each iterator yields fragments whose concatenation equals the text the
+# matching read_* function returns, so chunk_stream sees the same document.
+
+def iter_pdf_pages(path: str) -> Iterator[str]:
+    """Yield PDF text one page at a time, OCR'ing scanned pages."""
+    emitted = False
+    for page_text in _iter_pdf_page_texts(path):
+        yield ("\n" + page_text) if emitted else page_text
+        emitted = True
+
+    if not emitted:
+        logger.warning(f"PDF file '{path}' contains no extractable text")
+
+def pdf_page_count(path: str) -> int:
+    """Number of pages in a PDF, or 0 if it cannot be opened."""
+    try:
+        import fitz  # PyMuPDF
+
+        with fitz.open(path) as doc:
+            return doc.page_count
+    except Exception:
+        return 0
+
+def iter_docx_paragraphs(path: str) -> Iterator[str]:
+    """Yield non-empty DOCX paragraphs."""
+    from docx import Document as Docx
+
+    try:
+        d = Docx(path)
+    except Exception as e:
+        logger.error(f"Failed to read DOCX '{path}': {e}")
+        raise RuntimeError(f"Failed to read DOCX file: {str(e)}")
+
+    emitted = False
+    for p in d.paragraphs:
+        text = p.text.strip()
+        if text:
+            yield ("\n" + text) if emitted else text
+            emitted = True
+
+    if not emitted:
+        logger.warning(f"DOCX file '{path}' contains no text")
+
+def iter_txt(path: str, block_size: int = 64 * 1024) -> Iterator[str]:
+    """Yield a text file in fixed-size blocks."""
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            while True:
+                block = f.read(block_size)
+                if not block:
+                    break
+                yield block
+    except Exception as e:
+        logger.error(f"Failed to read text file '{path}': {e}")
+        raise RuntimeError(f"Failed to read text file: {str(e)}")
+
+def extract_text_stream(path: str, forced_type: str | None = None) -> tuple[Iterator[str], str]:
+    """
+    Streaming counterpart of extract_text.
+
+    Args:
+        path: Path to the file
+        forced_type: Optional file type to force (bypasses detection)
+
+    Returns:
+        Tuple of (iterator of text fragments, file_type)
+
+    Raises:
+        RuntimeError: If file doesn't exist
+    """
+    if not os.path.exists(path):
+        raise RuntimeError(f"File not found: {path}")
+
+    if not os.path.isfile(path):
+        raise RuntimeError(f"Path is not a file: {path}")
+
+    ftype = forced_type or detect_type(path)
+
+    if os.path.getsize(path) == 0:
+        logger.warning(f"File '{path}' is empty (0 bytes)")
+        return iter(()), ftype
+
+    if ftype == "pdf":
+        return iter_pdf_pages(path), "pdf"
+    if ftype == "docx":
+        return iter_docx_paragraphs(path), "docx"
+    if ftype == "image":
+        return iter((read_image_text(path),)), "image"
+    return iter_txt(path), "txt"
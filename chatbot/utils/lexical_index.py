@@ -0,0 +1,158 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Keep hyphen/underscore inside tokens so identifiers like "AB-1234" or
+# "ERR_TIMEOUT" stay single terms
+_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS chunk_fts USING fts5(
+    content,
+    tokenize = "unicode61 tokenchars '-_'"
+);
+CREATE TABLE IF NOT EXISTS chunk_map (
+    rowid INTEGER PRIMARY KEY,
+    chunk_id TEXT NOT NULL UNIQUE,
+    doc_id TEXT NOT NULL,
+    namespace TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS chunk_map_doc ON chunk_map (doc_id);
+"""
+
+_TOKEN = re.compile(r"[\w][\w\-]*", re.UNICODE)
+_MAX_QUERY_TERMS = 32
+_SQL_BATCH = 500
+
+def _match_expr(q: str) -> str:
+    """Turn free text into an FTS5 OR-query of quoted terms (BM25 does the weighting)."""
+    terms = []
+    for tok in _TOKEN.findall(q.lower()):
+        tok = tok.strip("-_")
+        if tok and tok not in terms:
+            terms.append(tok)
+    return " OR ".join(f'"{t}"' for t in terms[:_MAX_QUERY_TERMS])
+
+class LexicalIndex:
+    """BM25 inverted index over chunk text, kept in an SQLite FTS5 table."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(chunk_map)")}
+        if "namespace" not in columns:
+            # Index files created before namespaces existed
+            self._conn.execute("ALTER TABLE chunk_map ADD COLUMN namespace TEXT NOT NULL DEFAULT ''")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS chunk_map_ns ON chunk_map (namespace)")
+        self._conn.commit()
+
+    def _delete_rowids(self, rowids: List[int]):
+        for i in range(0, len(rowids), _SQL_BATCH):
+            part = rowids[i:i + _SQL_BATCH]
+            marks = ",".join("?" * len(part))
+            self._conn.execute(f"DELETE FROM chunk_fts WHERE rowid IN ({marks})", part)
+            self._conn.execute(f"DELETE FROM chunk_map WHERE rowid IN ({marks})", part)
+
+    def _rowids_for(self, chunk_ids: List[str]) -> List[int]:
+        rowids: List[int] = []
+        for i in range(0, len(chunk_ids), _SQL_BATCH):
+            part = chunk_ids[i:i + _SQL_BATCH]
+            marks = ",".join("?" * len(part))
+            rowids.extend(r for (r,) in self._conn.execute(
+                f"SELECT rowid FROM chunk_map WHERE chunk_id IN ({marks})", part))
+        return rowids
+
+    def add(self, ids: List[str], docs: List[str], metas: List[Dict[str, Any]]):
+        """Index chunks, replacing any existing entries with the same ids."""
+        with self._lock:
+            self._delete_rowids(self._rowids_for(ids))
+            for cid, text, meta in zip(ids, docs, metas):
+                cur = self._conn.execute("INSERT INTO chunk_fts (content) VALUES (?)", (text,))
+                self._conn.execute(
+                    "INSERT INTO chunk_map (rowid, chunk_id, doc_id, namespace) VALUES (?, ?, ?, ?)",
+                    (cur.lastrowid, cid, str(meta.get("doc_id", "")), str(meta.get("namespace", ""))),
+                )
+            self._conn.commit()
+
+    def delete_ids(self, ids: List[str]):
+        with self._lock:
+            self._delete_rowids(self._rowids_for(ids))
+            self._conn.commit()
+
+    def delete_doc(self, doc_id: str):
+        with self._lock:
+            rowids = [r for (r,) in self._conn.execute(
+                "SELECT rowid FROM chunk_map WHERE doc_id = ?", (doc_id,))]
+            self._delete_rowids(rowids)
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM chunk_fts")
+            self._conn.execute("DELETE FROM chunk_map")
+            self._conn.commit()
+
+    def search(self, q: str, k: int = 20, namespace: str = "",
+               doc_ids: Optional[List[str]] = None) -> List[Tuple[str, float]]:
+        """
+        Return up to k (chunk_id, bm25 score) pairs from one namespace, best
+        first, optionally limited to some documents. FTS5's bm25() is
+        lower-is-better, so scores are negated.
+        """
+        expr = _match_expr(q)
+        if not expr:
+            return []
+        sql = ("SELECT m.chunk_id, bm25(chunk_fts) AS score "
+               "FROM chunk_fts JOIN chunk_map m ON m.rowid = chunk_fts.rowid "
+               "WHERE chunk_fts MATCH ? AND m.namespace = ?")
+        params: List[Any] = [expr, namespace or ""]
+        if doc_ids:
+            ids = [str(d) for d in doc_ids][:_SQL_BATCH]
+            sql += f" AND m.doc_id IN ({','.join('?' * len(ids))})"
+            params.extend(ids)
+        sql += " ORDER BY score LIMIT ?"
+        params.append(k)
+        with self._lock:
+            try:
+                rows = self._conn.execute(sql, params).fetchall()
+            except sqlite3.OperationalError as e:
+                logger.warning(f"Lexical search failed for {expr!r}: {e}")
+                return []
+        return [(cid, -score) for cid, score in rows]
+
+_INDEX: Optional[LexicalIndex] = None
+_INDEX_LOCK = threading.Lock()
+
+def get_lexical_index() -> Optional[LexicalIndex]:
+    """Process-wide lexical index, or None when HYBRID_SEARCH is off or FTS5 is unavailable."""
+    global _INDEX
+    if not getattr(settings, "HYBRID_SEARCH", True):
+        return None
+    if _INDEX is None:
+        with _INDEX_LOCK:
+            if _INDEX is None:
+                persist_dir = getattr(settings, "CHROMA_PERSIST_DIR", ".chroma")
+                path = os.path.join(persist_dir, "lexical.sqlite3")
+                try:
+                    _INDEX = LexicalIndex(path)
+                    logger.info(f"Lexical index initialized at {path}")
+                except sqlite3.OperationalError as e:
+                    logger.error(f"SQLite FTS5 unavailable, hybrid search disabled: {e}")
+                    return None
+    return _INDEX
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[str]:
+    """Merge ranked id lists: score(id) = sum over lists of 1 / (k + rank)."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, cid in enumerate(ranking, 1):
+            scores[cid] = scores.get(cid, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=lambda cid: scores[cid], reverse=True)
@@ -0,0 +1,161 @@
+import bisect
+import functools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds; spans range from sub-millisecond cache lookups to minute-long OCR runs
+_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+_PREFIX = "docchat"
+_Labels = Tuple[Tuple[str, str], ...]
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(_BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+_LOCK = threading.Lock()
+_HISTOGRAMS: Dict[Tuple[str, _Labels], _Histogram] = {}
+_COUNTERS: Dict[Tuple[str, _Labels], float] = {}
+_HELP: Dict[str, str] = {
+    "stage_seconds": "Wall time spent in each pipeline stage",
+    "answer_cache_total": "Semantic answer cache lookups by result",
+    "embed_cache_total": "Embedding cache lookups by result",
+    "embed_coalesced_total": "SBERT encode calls served by a coalesced forward pass",
+    "tokens_total": "Gemini tokens by kind",
+    "chunks_total": "Chunks embedded or removed by ingestion",
+    "questions_total": "Questions answered by entry point",
+    "chatlog_rows_total": "ChatLog rows by outcome (written, failed, dropped)",
+    "warmup_seconds": "Startup warm-up time per stage",
+}
+
+def _key(name: str, labels: Dict[str, str]) -> Tuple[str, _Labels]:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def observe(name: str, seconds: float, **labels):
+    """Record one observation in a histogram."""
+    key = _key(name, labels)
+    with _LOCK:
+        hist = _HISTOGRAMS.get(key)
+        if hist is None:
+            hist = _HISTOGRAMS[key] = _Histogram()
+        hist.observe(seconds)
+
+def inc(name: str, value: float = 1, **labels):
+    """Add to a counter."""
+    if not value:
+        return
+    key = _key(name, labels)
+    with _LOCK:
+        _COUNTERS[key] = _COUNTERS.get(key, 0) + value
+
+# ---- Per-request traces ----
+_local = threading.local()
+
+class Trace:
+    """Per-stage milliseconds collected while a trace() block is active."""
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float):
+        self.stages[stage] = round(self.stages.get(stage, 0.0) + seconds * 1000, 2)
+
+@contextmanager
+def trace() -> Iterator[Trace]:
+    """
+    Collect the spans recorded on this thread into a Trace (e.g. for a
+    ChatLog row). Nested traces each get their own breakdown.
+    """
+    t = Trace()
+    stack: List[Trace] = getattr(_local, "traces", None) or []
+    stack.append(t)
+    _local.traces = stack
+    try:
+        yield t
+    finally:
+        stack.pop()
+
+def record(stage: str, seconds: float):
+    """Record a stage duration in the histogram and the active trace, if any."""
+    observe("stage_seconds", seconds, stage=stage)
+    stack = getattr(_local, "traces", None)
+    if stack:
+        stack[-1].add(stage, seconds)
+
+@contextmanager
+def span(stage: str):
+    """Time a block as `stage`."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - started)
+
+def timed(stage: str):
+    """Decorator form of span()."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+# ---- Exposition ----
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _fmt_labels(labels: _Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+def render_prometheus() -> str:
+    """
+    Prometheus text exposition of this process's counters and histograms.
+    Each worker process keeps its own numbers; scrape every worker (or sum
+    them in the query).
+    """
+    with _LOCK:
+        hists = {k: (list(h.counts), h.total, h.count) for k, h in _HISTOGRAMS.items()}
+        counters = dict(_COUNTERS)
+
+    lines: List[str] = []
+    for name in sorted({n for n, _ in counters}):
+        full = f"{_PREFIX}_{name}"
+        lines.append(f"# HELP {full} {_HELP.get(name, name)}")
+        lines.append(f"# TYPE {full} counter")
+        for (n, labels), value in sorted(counters.items()):
+            if n == name:
+                lines.append(f"{full}{_fmt_labels(labels)} {value:g}")
+
+    for name in sorted({n for n, _ in hists}):
+        full = f"{_PREFIX}_{name}"
+        lines.append(f"# HELP {full} {_HELP.get(name, name)}")
+        lines.append(f"# TYPE {full} histogram")
+        for (n, labels), (counts, total, count) in sorted(hists.items()):
+            if n != name:
+                continue
+            running = 0
+            for bound, c in zip(_BUCKETS, counts):
+                running += c
+                lines.append(f"{full}_bucket{_fmt_labels(labels, ('le', f'{bound:g}'))} {running}")
+            lines.append(f"{full}_bucket{_fmt_labels(labels, ('le', '+Inf'))} {count}")
+            lines.append(f"{full}_sum{_fmt_labels(labels)} {total:.6f}")
+            lines.append(f"{full}_count{_fmt_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,455 @@
+import fcntl
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Rows scored per block, so float16 storage is upcast a slice at a time
+_BLOCK_ROWS = 65536
+
+def match_where(meta: Optional[Dict[str, Any]], where: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate the subset of Chroma's `where` syntax this app uses."""
+    if not where:
+        return True
+    if meta is None:
+        return False
+    for key, cond in where.items():
+        if key == "$and":
+            if not all(match_where(meta, c) for c in cond):
+                return False
+        elif key == "$or":
+            if not any(match_where(meta, c) for c in cond):
+                return False
+        elif isinstance(cond, dict):
+            value = meta.get(key)
+            for op, arg in cond.items():
+                if op == "$eq" and value != arg:
+                    return False
+                if op == "$ne" and value == arg:
+                    return False
+                if op == "$in" and value not in arg:
+                    return False
+                if op == "$nin" and value in arg:
+                    return False
+        elif meta.get(key) != cond:
+            return False
+    return True
+
+class NumpyCollection:
+    """
+    Exact-search vector index with the same method surface as the parts of
+    a Chroma collection the vectorstore uses (upsert/update/get/delete/
+    count/query).
+
+    Vectors are L2-normalized and appended to a memory-mapped float32 or
+    float16 matrix; metadata and documents go to an append-only JSON-lines
+    log. Deletes are tombstones, and the files are compacted once dead rows
+    pass `compact_ratio`. Other processes pick up changes by replaying the
+    log tail, under a shared file lock.
+    """
+
+    def __init__(self, path: str, dtype: str = "float32", compact_ratio: float = 0.25,
+                 compact_min: int = 1000):
+        self.path = path
+        self.compact_ratio = compact_ratio
+        self.compact_min = compact_min
+        self._default_dtype = np.dtype(dtype)
+        self._vec_path = os.path.join(path, "vectors.bin")
+        self._log_path = os.path.join(path, "log.jsonl")
+        self._manifest_path = os.path.join(path, "manifest.json")
+        self._lock_path = os.path.join(path, "lock")
+        self._lock = threading.RLock()
+        os.makedirs(path, exist_ok=True)
+        self._reset_state()
+        self._refresh()
+
+    # ---- state ----
+    def _reset_state(self):
+        self._generation: Optional[int] = None
+        self._dim: Optional[int] = None
+        self._dtype = self._default_dtype
+        self._ids: List[Optional[str]] = []
+        self._metas: List[Optional[Dict[str, Any]]] = []
+        self._doc_pos: List[int] = []
+        self._rows: Dict[str, int] = {}
+        self._alive = np.zeros(0, dtype=bool)
+        # doc_id of each row as an integer code (-1 = dead or none), so
+        # document-scoped queries build their mask without a Python loop
+        self._doc_codes = np.zeros(0, dtype=np.int32)
+        self._code_of: Dict[Any, int] = {}
+        self._dead = 0
+        self._log_pos = 0
+        self._matrix: Optional[np.ndarray] = None
+        self._signature = None
+
+    def _read_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self._manifest_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_manifest(self, generation: int):
+        tmp = self._manifest_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"dim": self._dim, "dtype": self._dtype.name, "generation": generation}, f)
+        os.replace(tmp, self._manifest_path)
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool):
+        with open(self._lock_path, "a") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _stat_signature(self):
+        sig = []
+        for p in (self._manifest_path, self._log_path):
+            try:
+                st = os.stat(p)
+                sig.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                sig.append(None)
+        return tuple(sig)
+
+    def _refresh(self):
+        """Catch up with writes from other processes if the files changed."""
+        if self._stat_signature() == self._signature:
+            return
+        with self._file_lock(exclusive=False):
+            self._catch_up()
+
+    def _catch_up(self):
+        """Replay new log records. Caller holds the file lock."""
+        manifest = self._read_manifest()
+        try:
+            size = os.path.getsize(self._log_path)
+        except OSError:
+            size = 0
+        if manifest.get("generation", 0) != self._generation or size < self._log_pos:
+            self._reset_state()
+            self._generation = manifest.get("generation", 0)
+        if self._dim is None and manifest.get("dim"):
+            # Set by the first upsert, possibly in another process
+            self._dim = manifest["dim"]
+            if manifest.get("dtype"):
+                self._dtype = np.dtype(manifest["dtype"])
+        if size > self._log_pos:
+            self._replay()
+        self._map_vectors()
+        self._signature = self._stat_signature()
+
+    def _ensure_rows(self, row: int):
+        missing = row + 1 - len(self._ids)
+        if missing <= 0:
+            return
+        # Rows skipped by an interrupted write count as dead
+        self._ids.extend([None] * missing)
+        self._metas.extend([None] * missing)
+        self._doc_pos.extend([-1] * missing)
+        self._dead += missing - 1
+        if len(self._ids) > len(self._alive):
+            size = max(len(self._ids), 2 * len(self._alive), 1024)
+            grown = np.zeros(size, dtype=bool)
+            grown[:len(self._alive)] = self._alive
+            self._alive = grown
+            codes = np.full(size, -1, dtype=np.int32)
+            codes[:len(self._doc_codes)] = self._doc_codes
+            self._doc_codes = codes
+
+    def _kill(self, row: int):
+        self._ids[row] = None
+        self._metas[row] = None
+        self._alive[row] = False
+        self._doc_codes[row] = -1
+        self._dead += 1
+
+    def _doc_code(self, meta: Optional[Dict[str, Any]]) -> int:
+        value = (meta or {}).get("doc_id")
+        if value is None:
+            return -1
+        return self._code_of.setdefault(value, len(self._code_of))
+
+    def _replay(self):
+        with open(self._log_path, "rb") as f:
+            f.seek(self._log_pos)
+            while True:
+                pos = f.tell()
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    break  # incomplete record from a writer in progress
+                rec = json.loads(line)
+                op = rec["op"]
+                if op == "put":
+                    row = rec["row"]
+                    self._ensure_rows(row)
+                    old = self._rows.get(rec["id"])
+                    if old is not None and old != row:
+                        self._kill(old)
+                    self._ids[row] = rec["id"]
+                    self._metas[row] = rec.get("meta") or {}
+                    self._doc_codes[row] = self._doc_code(self._metas[row])
+                    self._doc_pos[row] = pos
+                    self._alive[row] = True
+                    self._rows[rec["id"]] = row
+                elif op == "meta":
+                    row = self._rows.get(rec["id"])
+                    if row is not None:
+                        self._metas[row] = rec.get("meta") or {}
+                        self._doc_codes[row] = self._doc_code(self._metas[row])
+                elif op == "del":
+                    for cid in rec["ids"]:
+                        row = self._rows.pop(cid, None)
+                        if row is not None:
+                            self._kill(row)
+                self._log_pos = f.tell()
+
+    def _map_vectors(self):
+        n = len(self._ids)
+        if not n or not self._dim:
+            self._matrix = None
+            return
+        if self._matrix is None or self._matrix.shape[0] != n:
+            self._matrix = np.memmap(self._vec_path, dtype=self._dtype, mode="r", shape=(n, self._dim))
+
+    def _read_docs(self, rows: Sequence[int]) -> List[str]:
+        docs = []
+        with open(self._log_path, "rb") as f:
+            for r in rows:
+                f.seek(self._doc_pos[r])
+                docs.append(json.loads(f.readline()).get("doc", ""))
+        return docs
+
+    def _append_log(self, records: List[Dict[str, Any]]):
+        with open(self._log_path, "ab") as f:
+            f.write("".join(json.dumps(r) + "\n" for r in records).encode("utf-8"))
+            f.flush()
+
+    def _doc_mask(self, where: Dict[str, Any], total: int) -> Optional[np.ndarray]:
+        """
+        Rows matching a {"doc_id": v}, {"doc_id": {"$eq": v}} or
+        {"doc_id": {"$in": [...]}} filter, from the doc-id codes; None for
+        any other filter, which is evaluated row by row.
+        """
+        if len(where) != 1 or "doc_id" not in where:
+            return None
+        cond = where["doc_id"]
+        if isinstance(cond, dict):
+            if len(cond) != 1:
+                return None
+            op, arg = next(iter(cond.items()))
+            if op == "$eq":
+                values = [arg]
+            elif op == "$in" and isinstance(arg, (list, tuple)):
+                values = list(arg)
+            else:
+                return None
+        else:
+            values = [cond]
+        try:
+            codes = [self._code_of[v] for v in values if v in self._code_of]
+        except TypeError:
+            return None
+        return np.isin(self._doc_codes[:total], codes)
+
+    def _resolve(self, ids: Optional[List[str]], where: Optional[Dict[str, Any]]) -> List[int]:
+        if ids is None and where:
+            mask = self._doc_mask(where, len(self._ids))
+            if mask is not None:
+                return [int(r) for r in np.flatnonzero(mask & self._alive[:len(self._ids)])]
+        if ids is not None:
+            rows = [self._rows[i] for i in ids if i in self._rows]
+        else:
+            rows = [r for r, cid in enumerate(self._ids) if cid is not None]
+        if where:
+            rows = [r for r in rows if match_where(self._metas[r], where)]
+        return rows
+
+    # ---- collection API ----
+    def count(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._rows)
+
+    def upsert(self, ids: List[str], documents: List[str], embeddings, metadatas: List[Dict[str, Any]]):
+        vecs = np.asarray(embeddings, dtype=np.float32)
+        if vecs.ndim != 2 or len(vecs) != len(ids):
+            raise ValueError("embeddings must be a 2-D array with one row per id")
+        norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+        vecs = vecs / np.where(norms == 0, 1.0, norms)
+
+        with self._lock, self._file_lock(exclusive=True):
+            self._catch_up()
+            if self._dim is None:
+                self._dim = int(vecs.shape[1])
+                self._write_manifest(self._generation or 0)
+            elif vecs.shape[1] != self._dim:
+                raise ValueError(f"Embedding dimension {vecs.shape[1]} does not match index dimension {self._dim}")
+
+            row_bytes = self._dim * self._dtype.itemsize
+            try:
+                start = os.path.getsize(self._vec_path) // row_bytes
+            except OSError:
+                start = 0
+            # Vectors land before the log records that reference them
+            with open(self._vec_path, "ab") as f:
+                f.seek(start * row_bytes)
+                f.truncate()
+                f.write(vecs.astype(self._dtype).tobytes())
+            self._append_log([
+                {"op": "put", "id": cid, "row": start + i, "meta": meta, "doc": doc}
+                for i, (cid, doc, meta) in enumerate(zip(ids, documents, metadatas))
+            ])
+            self._catch_up()
+            self._maybe_compact()
+
+    def update(self, ids: List[str], metadatas: List[Dict[str, Any]]):
+        with self._lock, self._file_lock(exclusive=True):
+            self._catch_up()
+            self._append_log([
+                {"op": "meta", "id": cid, "meta": meta}
+                for cid, meta in zip(ids, metadatas) if cid in self._rows
+            ])
+            self._catch_up()
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None):
+        with self._lock, self._file_lock(exclusive=True):
+            self._catch_up()
+            rows = self._resolve(ids, where)
+            if not rows:
+                return
+            self._append_log([{"op": "del", "ids": [self._ids[r] for r in rows]}])
+            self._catch_up()
+            self._maybe_compact()
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None,
+            limit: Optional[int] = None, offset: Optional[int] = None,
+            include: Sequence[str] = ("documents", "metadatas")) -> Dict[str, Any]:
+        # The shared lock keeps another process from compacting (and so
+        # moving every document offset) while documents are read
+        with self._lock, self._file_lock(exclusive=False):
+            if self._stat_signature() != self._signature:
+                self._catch_up()
+            rows = self._resolve(ids, where)
+            start = offset or 0
+            rows = rows[start:start + limit] if limit is not None else rows[start:]
+            out: Dict[str, Any] = {"ids": [self._ids[r] for r in rows]}
+            if "documents" in include:
+                out["documents"] = self._read_docs(rows)
+            if "metadatas" in include:
+                out["metadatas"] = [dict(self._metas[r]) for r in rows]
+            if "embeddings" in include:
+                out["embeddings"] = [np.asarray(self._matrix[r], dtype=np.float32).tolist() for r in rows]
+            return out
+
+    def query(self, query_embeddings, n_results: int = 10,
+              include: Sequence[str] = ("documents", "metadatas", "distances"),
+              where: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Exact top-k by cosine distance for one or more query vectors."""
+        q = np.asarray(query_embeddings, dtype=np.float32)
+        if q.ndim == 1:
+            q = q[None, :]
+        qn = np.linalg.norm(q, axis=1, keepdims=True)
+        q = q / np.where(qn == 0, 1.0, qn)
+
+        for _ in range(3):
+            out = self._query_once(q, n_results, include, where)
+            if out is not None:
+                return out
+        # Compacted under every attempt: score while holding the index still
+        with self._lock, self._file_lock(exclusive=False):
+            return self._query_once(q, n_results, include, where)
+
+    def _query_once(self, q: np.ndarray, n_results: int, include: Sequence[str],
+                    where: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """One query against a snapshot; None if compaction replaced the rows before results were read."""
+        with self._lock:
+            self._refresh()
+            # Snapshot under the lock, score outside it
+            matrix = self._matrix
+            total = len(self._ids)
+            mask = self._alive[:total].copy()
+            if where:
+                scoped = self._doc_mask(where, total)
+                if scoped is not None:
+                    mask &= scoped
+                else:
+                    for r in np.flatnonzero(mask):
+                        if not match_where(self._metas[r], where):
+                            mask[r] = False
+            ids, metas = self._ids, self._metas
+
+        empty = {"ids": [[] for _ in q], "documents": [[] for _ in q],
+                 "metadatas": [[] for _ in q], "distances": [[] for _ in q]}
+        live = int(mask.sum())
+        if matrix is None or live == 0:
+            return empty
+        if q.shape[1] != matrix.shape[1]:
+            raise ValueError(f"Query dimension {q.shape[1]} does not match index dimension {matrix.shape[1]}")
+
+        scores = np.empty((len(q), total), dtype=np.float32)
+        for b in range(0, total, _BLOCK_ROWS):
+            block = np.asarray(matrix[b:b + _BLOCK_ROWS], dtype=np.float32)
+            scores[:, b:b + len(block)] = q @ block.T
+        scores[:, ~mask] = -np.inf
+
+        k = min(n_results, live)
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        out: Dict[str, Any] = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        if "embeddings" in include:
+            out["embeddings"] = []
+        with self._lock, self._file_lock(exclusive=False):
+            if self._stat_signature() != self._signature:
+                self._catch_up()
+            # Row numbers and document offsets only hold within the state the
+            # snapshot came from; a compaction or reset builds new lists
+            if self._ids is not ids:
+                return None
+            for qi in range(len(q)):
+                rows = top[qi][np.argsort(-scores[qi, top[qi]])]
+                rows = [int(r) for r in rows if ids[r] is not None]
+                out["ids"].append([ids[r] for r in rows])
+                out["distances"].append([float(1.0 - scores[qi, r]) for r in rows])
+                out["metadatas"].append([dict(metas[r]) for r in rows])
+                out["documents"].append(self._read_docs(rows) if "documents" in include else [])
+                if "embeddings" in include:
+                    out["embeddings"].append(np.asarray(matrix[rows], dtype=np.float32))
+        return out
+
+    # ---- maintenance ----
+    def _maybe_compact(self):
+        if self._dead >= self.compact_min and self._dead > self.compact_ratio * len(self._ids):
+            self._compact()
+
+    def _compact(self):
+        """Rewrite vectors and log with live rows only. Caller holds the exclusive lock."""
+        live = [r for r, cid in enumerate(self._ids) if cid is not None]
+        logger.info(f"Compacting vector index {self.path}: {len(live)} live of {len(self._ids)} rows")
+        vec_tmp, log_tmp = self._vec_path + ".tmp", self._log_path + ".tmp"
+        with open(vec_tmp, "wb") as vf, open(log_tmp, "wb") as lf:
+            for b in range(0, len(live), _BLOCK_ROWS):
+                part = live[b:b + _BLOCK_ROWS]
+                vf.write(np.asarray(self._matrix[part], dtype=self._dtype).tobytes())
+                docs = self._read_docs(part)
+                lf.write("".join(
+                    json.dumps({"op": "put", "id": self._ids[r], "row": b + i,
+                                "meta": self._metas[r], "doc": doc}) + "\n"
+                    for i, (r, doc) in enumerate(zip(part, docs))
+                ).encode("utf-8"))
+        self._matrix = None
+        os.replace(vec_tmp, self._vec_path)
+        os.replace(log_tmp, self._log_path)
+        self._write_manifest((self._generation or 0) + 1)
+        self._catch_up()
+
+    def compact(self):
+        with self._lock, self._file_lock(exclusive=True):
+            self._catch_up()
+            self._compact()
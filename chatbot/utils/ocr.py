@@ -1,15 +1,64 @@
 import pytesseract
 from PIL import Image
 import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional
 
 logger = logging.getLogger(__name__)
 
-def ocr_image(image: Image.Image) -> str:
+# Note: this module must stay importable without Django so that spawned
+# OCR worker processes can load it cheaply.
+
+DEFAULT_DPI = 300
+DEFAULT_MAX_SIDE = 4000
+# Default OCR pool size never exceeds this, however many cores there are
+MAX_DEFAULT_WORKERS = 4
+
+def preprocess_image(image: Image.Image, target_dpi: int = DEFAULT_DPI,
+                     max_side: int = DEFAULT_MAX_SIDE) -> Image.Image:
+    """
+    Prepare an image for Tesseract: grayscale, rescale to `target_dpi` when
+    the source DPI is known, and downscale anything larger than `max_side`
+    pixels on its longest edge.
+    """
+    if image.mode != "L":
+        image = image.convert("L")
+
+    scale = 1.0
+    dpi = image.info.get("dpi")
+    if dpi and dpi[0]:
+        try:
+            src_dpi = float(dpi[0])
+            # Only normalize clearly off-target scans; upscale at most 2x
+            if src_dpi > 0 and abs(src_dpi - target_dpi) / target_dpi > 0.2:
+                scale = min(2.0, target_dpi / src_dpi)
+        except (TypeError, ValueError):
+            pass
+
+    longest = max(image.size) * scale
+    if max_side and longest > max_side:
+        scale *= max_side / longest
+
+    if abs(scale - 1.0) > 0.01:
+        w, h = image.size
+        image = image.resize((max(1, int(w * scale)), max(1, int(h * scale))), Image.LANCZOS)
+    return image
+
+def ocr_image(image: Image.Image, preprocess: bool = True, timeout: int = 0,
+              max_side: int = DEFAULT_MAX_SIDE, target_dpi: int = DEFAULT_DPI) -> str:
     """
     Extract text from an image using OCR.
 
     Args:
         image: PIL Image object
+        preprocess: Grayscale/resize the image before OCR
+        timeout: Seconds before Tesseract is killed (0 = no limit)
+        max_side: Longest edge in pixels after preprocessing
+        target_dpi: Resolution to rescale to when preprocessing
 
     Returns:
         Extracted text string
@@ -22,12 +71,14 @@ def ocr_image(image: Image.Image) -> str:
         if image is None:
             raise ValueError("Image is None")
 
+        if preprocess:
+            image = preprocess_image(image, target_dpi=target_dpi, max_side=max_side)
         # Convert to RGB if necessary (some formats need this)
-        if image.mode not in ("RGB", "L"):
+        elif image.mode not in ("RGB", "L"):
             image = image.convert("RGB")
 
         # Perform OCR
-        text = pytesseract.image_to_string(image)
+        text = pytesseract.image_to_string(image, timeout=timeout)
 
         if text is None:
             text = ""
@@ -43,3 +94,105 @@ def ocr_image(image: Image.Image) -> str:
     except Exception as e:
         logger.error(f"OCR failed: {e}")
         raise RuntimeError(f"Failed to extract text from image: {str(e)}")
+
+def _ocr_pdf_page(path: str, page_index: int, dpi: int, timeout: int, max_side: int) -> str:
+    """Worker: render one PDF page to grayscale and OCR it."""
+    import fitz  # PyMuPDF
+
+    with fitz.open(path) as doc:
+        pix = doc[page_index].get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+        img = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+    # Rendered at the target DPI already, so only the size cap applies
+    if max_side and max(img.size) > max_side:
+        img = preprocess_image(img, target_dpi=dpi, max_side=max_side)
+    return ocr_image(img, preprocess=False, timeout=timeout)
+
+def default_workers() -> int:
+    """
+    OCR pool size when none is configured: this process's share of the CPU
+    cores (each of WEB_CONCURRENCY web workers runs its own pool), capped
+    at MAX_DEFAULT_WORKERS.
+    """
+    try:
+        web_workers = max(1, int(os.environ.get("WEB_CONCURRENCY") or 1))
+    except ValueError:
+        web_workers = 1
+    return max(1, min(MAX_DEFAULT_WORKERS, (os.cpu_count() or 1) // web_workers))
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_LOCK = threading.Lock()
+
+def _pool(workers: int) -> ProcessPoolExecutor:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            # spawn: forking a threaded web worker is unsafe
+            ctx = multiprocessing.get_context("spawn")
+            _POOL = ProcessPoolExecutor(max_workers=workers, mp_context=ctx)
+            logger.info(f"OCR process pool started with {workers} workers")
+        return _POOL
+
+def _reset_pool():
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.shutdown(wait=False, cancel_futures=True)
+            _POOL = None
+
+def ocr_pdf_pages(path: str, pages: List[int], dpi: int = DEFAULT_DPI, timeout: int = 120,
+                  workers: int = 0, max_side: int = DEFAULT_MAX_SIDE) -> Dict[int, str]:
+    """
+    Render and OCR the given 0-based PDF pages across a process pool.
+
+    Pages that fail or exceed `timeout` seconds come back as empty strings
+    rather than failing the whole document.
+
+    Args:
+        path: Path to the PDF
+        pages: 0-based page indexes to OCR
+        dpi: Render resolution
+        timeout: Per-page time limit in seconds
+        workers: Pool size (0 = default_workers())
+        max_side: Longest edge in pixels passed to Tesseract
+
+    Returns:
+        Mapping of page index to OCR text
+    """
+    results: Dict[int, str] = {}
+    if not pages:
+        return results
+
+    workers = workers or default_workers()
+    if workers == 1 or len(pages) == 1:
+        for p in pages:
+            try:
+                results[p] = _ocr_pdf_page(path, p, dpi, timeout, max_side)
+            except Exception as e:
+                logger.warning(f"OCR failed for page {p + 1} of '{path}': {e}")
+                results[p] = ""
+        return results
+
+    try:
+        pool = _pool(workers)
+        futures = {p: pool.submit(_ocr_pdf_page, path, p, dpi, timeout, max_side) for p in pages}
+    except BrokenProcessPool:
+        _reset_pool()
+        raise RuntimeError("OCR process pool is unavailable")
+
+    # Pages queue behind each other, so allow for the backlog ahead of each one
+    wait = timeout * (1 + len(pages) // workers) if timeout else None
+    for p, fut in futures.items():
+        try:
+            results[p] = fut.result(timeout=wait)
+        except FutureTimeout:
+            logger.warning(f"OCR timed out for page {p + 1} of '{path}'")
+            fut.cancel()
+            results[p] = ""
+        except BrokenProcessPool:
+            logger.error("OCR process pool died; resetting")
+            _reset_pool()
+            results[p] = ""
+        except Exception as e:
+            logger.warning(f"OCR failed for page {p + 1} of '{path}': {e}")
+            results[p] = ""
+    return results
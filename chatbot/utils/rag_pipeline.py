@@ -1,7 +1,14 @@
-from typing import List, Dict, Any
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 import logging
+import time
+import numpy as np
 from django.conf import settings
-from .vectorstore import query as vs_query
+from .vectorstore import query as vs_query, query_many as vs_query_many, corpus_version
+from .answer_cache import get_answer_cache
+from .text_splitter import approx_tokens, truncate_tokens
+from . import metrics, reranker
 
 logger = logging.getLogger(__name__)
 
@@ -19,8 +26,9 @@ SYS_PROMPT = (
 )
 
 def _gemini_client():
-    from google import genai
-    return genai.Client(api_key=getattr(settings, "GOOGLE_API_KEY", ""))
+    # Shared with the embedder: one client (and connection pool) per process
+    from .embeddings import _get_genai_client
+    return _get_genai_client()
 
 def _format_context(docs: List[str], metas: List[Dict[str, Any]], distances: List[float] = None) -> str:
     """
@@ -37,12 +45,13 @@ def _format_context(docs: List[str], metas: List[Dict[str, Any]], distances: Lis
     if not docs:
         return "No relevant documents found."
 
-    lines = ["=== DOCUMENT EXCERPTS ===\n"]
+    lines = ["DOCUMENT EXCERPTS:\n"]
 
     for i, (d, m) in enumerate(zip(docs, metas)):
         doc_name = m.get('doc_name', 'unknown')
-        doc_id = m.get('doc_id', 'unknown')
         chunk_idx = m.get('chunk_index', 0)
+        chunk_end = m.get('chunk_end', chunk_idx)
+        section = f"Section {chunk_idx + 1}" if chunk_end == chunk_idx else f"Sections {chunk_idx + 1}-{chunk_end + 1}"
 
         # Add relevance score if available
         relevance_info = ""
@@ -52,54 +61,114 @@ def _format_context(docs: List[str], metas: List[Dict[str, Any]], distances: Lis
             similarity = max(0, (1 - distances[i] / 2) * 100)
             relevance_info = f" | Relevance: {similarity:.1f}%"
 
-        header = f"[{i+1}] Source: {doc_name} (Section {chunk_idx + 1}){relevance_info}"
-        separator = "-" * min(len(header), 80)
-
-        lines.append(f"{header}")
-        lines.append(separator)
+        lines.append(f"[{i+1}] Source: {doc_name} ({section}){relevance_info}")
         lines.append(d.strip())
         lines.append("")  # Blank line between excerpts
 
     return "\n".join(lines)
 
-def ask(question: str, k: int = 8, relevance_threshold: float = 1.5) -> Dict[str, Any]:
-    """
-    Ask a question and get an expert answer based on uploaded documents.
+NO_DOCS_ANSWER = "I don't have any documents uploaded yet. Please upload documents first before asking questions."
+FALLBACK_ANSWER = "I apologize, but I couldn't generate a response. Please try again."
 
-    Args:
-        question: The question to answer
-        k: Number of document chunks to retrieve (default 8 for better coverage)
-        relevance_threshold: Maximum distance to consider relevant (cosine distance, default 1.5)
+GEN_MODEL = "gemini-2.5-flash"
+# Generate response with controlled temperature for consistency
+GEN_CONFIG = {
+    "temperature": 0.3,  # Lower temperature for more focused, accurate responses
+    "top_p": 0.9,
+    "top_k": 40,
+    "max_output_tokens": 2048,
+}
+
+def _cache_lookup(question: str, scope) -> Tuple[Any, Optional[List[float]], int, Optional[Dict[str, Any]]]:
+    """
+    Embed the question and consult the semantic answer cache.
 
     Returns:
-        Dictionary with 'answer' and 'sources' keys
+        (cache or None, query embedding or None, corpus version, cached answer or None)
     """
-    logger.info(f"Processing question: {question[:100]}...")
+    cache = get_answer_cache()
+    if cache is None:
+        return None, None, 0, None
 
-    result = vs_query(question, k=k)
+    from .embeddings import embed_texts
+
+    try:
+        qvec = embed_texts([question])[0]
+    except Exception as e:
+        logger.warning(f"Answer cache skipped, query embedding failed: {e}")
+        return cache, None, 0, None
+
+    version = corpus_version()
+    with metrics.span("answer_cache"):
+        hit = cache.get(qvec, version, scope=scope)
+    metrics.inc("answer_cache_total", result="hit" if hit is not None else "miss")
+    if hit is not None:
+        logger.info("Answer cache hit")
+        hit = {"answer": hit["answer"], "sources": [dict(s) for s in hit["sources"]]}
+    return cache, qvec, version, hit
+
+def _retrieve(question: str, k: int, relevance_threshold: float,
+              qvec: Optional[List[float]] = None, namespace: Optional[str] = None,
+              doc_ids: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Query the vectorstore, optionally rerank, and apply the relevance
+    threshold. None when nothing is indexed (in the requested scope).
+    """
+    with metrics.span("retrieve"):
+        result = vs_query(question, k=_fetch_k(k), embedding=qvec, namespace=namespace, doc_ids=doc_ids,
+                          with_embeddings=_mmr_enabled())
+    return _select(question, result, k, relevance_threshold)
+
+def _mmr_enabled() -> bool:
+    return bool(getattr(settings, "MMR_ENABLED", True))
+
+def _fetch_k(k: int) -> int:
+    """Candidates to retrieve: more when a rerank or MMR stage will cut them down."""
+    n = max(k, int(getattr(settings, "RERANK_CANDIDATES", 20))) if reranker.enabled() else k
+    if _mmr_enabled():
+        n = max(n, int(getattr(settings, "MMR_CANDIDATES", 20)))
+    return n
+
+def _select(question: str, result: Dict[str, Any], k: int,
+            relevance_threshold: float) -> Optional[Dict[str, Any]]:
+    """Rerank (if enabled), threshold and diversify one vectorstore result."""
+    use_rerank = reranker.enabled()
 
     # Handle empty vectorstore or no results
     docs = result.get("documents", [[]])[0] if result.get("documents") else []
     metas = result.get("metadatas", [[]])[0] if result.get("metadatas") else []
     distances = result.get("distances", [[]])[0] if result.get("distances") else []
+    vecs = result.get("embeddings")
+    vecs = list(vecs[0]) if vecs is not None and len(vecs) and len(vecs[0]) == len(docs) else None
 
     # If no documents found in vectorstore
     if not docs:
-        return {
-            "answer": "I don't have any documents uploaded yet. Please upload documents first before asking questions.",
-            "sources": []
-        }
+        return None
+
+    if use_rerank:
+        top_n = min(k, int(getattr(settings, "RERANK_TOP_N", 4)))
+        with metrics.span("rerank"):
+            order = reranker.rerank(question, docs, top_n)
+        if order is None:
+            order = list(range(min(k, len(docs))))
+        docs = [docs[i] for i in order]
+        metas = [metas[i] for i in order]
+        distances = [distances[i] for i in order] if distances else []
+        vecs = [vecs[i] for i in order] if vecs is not None else None
 
     # Filter by relevance threshold to improve accuracy
     filtered_docs = []
     filtered_metas = []
     filtered_distances = []
+    filtered_vecs = []
 
     for i, (doc, meta, dist) in enumerate(zip(docs, metas, distances)):
         if dist <= relevance_threshold:
             filtered_docs.append(doc)
             filtered_metas.append(meta)
             filtered_distances.append(dist)
+            if vecs is not None:
+                filtered_vecs.append(vecs[i])
 
     # If all results filtered out, use top 3 anyway but note low confidence
     if not filtered_docs and docs:
@@ -107,22 +176,220 @@ def ask(question: str, k: int = 8, relevance_threshold: float = 1.5) -> Dict[str
         filtered_docs = docs[:3]
         filtered_metas = metas[:3]
         filtered_distances = distances[:3] if distances else []
+        filtered_vecs = vecs[:3] if vecs is not None else []
         low_confidence = True
     else:
         low_confidence = False
 
+    # The cross-encoder already picked a small, ordered set
+    if _mmr_enabled() and filtered_distances and not use_rerank:
+        with metrics.span("mmr"):
+            keep = _diversify(filtered_distances, filtered_vecs if vecs is not None else None, k,
+                              ranked=bool(result.get("fused")))
+        filtered_docs = [filtered_docs[i] for i in keep]
+        filtered_metas = [filtered_metas[i] for i in keep]
+        filtered_distances = [filtered_distances[i] for i in keep]
+
     logger.info(f"Retrieved {len(filtered_docs)} relevant chunks (from {len(docs)} total)")
 
-    context = _format_context(filtered_docs, filtered_metas, filtered_distances)
+    ctx = {
+        "docs": filtered_docs,
+        "metas": filtered_metas,
+        "distances": filtered_distances,
+        "low_confidence": low_confidence,
+    }
+    if getattr(settings, "CONTEXT_PACKING", True):
+        with metrics.span("pack"):
+            ctx = _pack_context(ctx)
+    return ctx
+
+# ---- Diversity and adaptive depth ----
+def _depth(distances: np.ndarray, k: int) -> int:
+    """
+    How many of the distance-sorted candidates to consider: cut at the
+    first jump of at least MMR_DISTANCE_GAP after MMR_MIN_K hits, so a
+    question with two clear matches gets two chunks and a broad one up to k.
+    """
+    min_k = max(1, int(getattr(settings, "MMR_MIN_K", 2)))
+    gap = float(getattr(settings, "MMR_DISTANCE_GAP", 0.1) or 0)
+    n = min(k, len(distances))
+    if gap <= 0 or n <= min_k:
+        return n
+    jumps = np.diff(distances[:n])
+    big = np.flatnonzero(jumps[min_k - 1:] >= gap)
+    return min_k + int(big[0]) if big.size else n
+
+def _diversify(distances: List[float], vecs: Optional[List[Any]], k: int, ranked: bool = False) -> List[int]:
+    """
+    Indices of the candidates to keep, in selection order: up to the
+    depth-cut count, picked by maximal marginal relevance on the stored
+    vectors from the whole candidate pool, so a near-duplicate (above
+    MMR_DUPLICATE_SIM) is replaced by the next diverse candidate rather
+    than just dropped. Without vectors only the depth cut applies.
+
+    Dense results are ranked by distance, cut adaptively with _depth, and
+    scored by cosine similarity. With `ranked` (hybrid results already in
+    rank-fusion order) the incoming order is kept as the ranking and
+    relevance is 1/(rank+1): keyword-only hits have large cosine
+    distances that say nothing about their fused rank.
+    """
+    dist = np.asarray(distances, dtype=np.float32)
+    if ranked:
+        order = np.arange(len(dist))
+        n = min(k, len(dist))
+        relevance = 1.0 / (order + 1.0)
+    else:
+        order = np.argsort(dist, kind="stable")
+        n = _depth(dist[order], k)
+        relevance = 1.0 - dist
+    if vecs is None or len(vecs) != len(distances) or n <= 1:
+        return [int(i) for i in order[:n]]
+
+    V = np.asarray([np.asarray(v, dtype=np.float32) for v in vecs])
+    norms = np.linalg.norm(V, axis=1, keepdims=True)
+    V = V / np.where(norms == 0, 1.0, norms)
+    sim = V @ V.T
+
+    lam = float(getattr(settings, "MMR_LAMBDA", 0.7))
+    dup = float(getattr(settings, "MMR_DUPLICATE_SIM", 0.95))
+    first = int(order[0])
+    selected = [first]
+    max_sim = sim[first].copy()
+    # The depth cut bounds how many are kept, not which ones compete
+    available = np.ones(len(dist), dtype=bool)
+    available[first] = False
+    while len(selected) < n:
+        available &= max_sim < dup
+        if not available.any():
+            break
+        score = np.where(available, lam * relevance - (1.0 - lam) * max_sim, -np.inf)
+        j = int(np.argmax(score))
+        selected.append(j)
+        available[j] = False
+        np.maximum(max_sim, sim[j], out=max_sim)
+    return selected
+
+# ---- Context assembly ----
+# Neighbouring chunks of a document share their overlap; sending both
+# repeats that text. Runs of adjacent or overlapping chunks are stitched
+# into one excerpt, duplicates dropped, and excerpts packed by relevance
+# into CONTEXT_TOKEN_BUDGET.
+
+_OVERLAP_PROBE = 24
+_MAX_OVERLAP_CHARS = 2000
+# Header line, citation marker and blank line per excerpt
+_EXCERPT_OVERHEAD_TOKENS = 16
+# The most relevant excerpt keeps at least this much text, however small the budget
+_MIN_EXCERPT_TOKENS = 64
+
+def _overlap(a: str, b: str) -> int:
+    """Length of the longest suffix of `a` that is also a prefix of `b`."""
+    tail = a[-_MAX_OVERLAP_CHARS:]
+    probe = b[:_OVERLAP_PROBE]
+    if not tail or not probe:
+        return 0
+    start = tail.find(probe)
+    while start != -1:
+        if b.startswith(tail[start:]):
+            return len(tail) - start
+        start = tail.find(probe, start + 1)
+    return 0
+
+def _stitch(a: str, b: str, adjacent: bool) -> Optional[str]:
+    """`a` followed by `b` without the shared text, or None if they are unrelated."""
+    if b in a:
+        return a
+    if a in b:
+        return b
+    n = _overlap(a, b)
+    if n:
+        return a + b[n:]
+    return f"{a}\n{b}" if adjacent else None
+
+def _assemble_excerpts(docs: List[str], metas: List[Dict[str, Any]],
+                       distances: List[float]) -> List[Dict[str, Any]]:
+    """
+    Merge same-document chunks into excerpts, most relevant first. Each
+    excerpt keeps its best distance and the first chunk's metadata, with
+    chunk_end marking the last chunk it covers.
+    """
+    by_doc: Dict[Any, List[Tuple[int, int, str, Dict[str, Any], Optional[float]]]] = {}
+    for rank, (d, m) in enumerate(zip(docs, metas)):
+        dist = distances[rank] if rank < len(distances) else None
+        key = m.get("doc_id") or f"#{rank}"
+        by_doc.setdefault(key, []).append((int(m.get("chunk_index", 0) or 0), rank, d.strip(), m, dist))
+
+    excerpts: List[Dict[str, Any]] = []
+    for chunks in by_doc.values():
+        chunks.sort(key=lambda c: (c[0], c[1]))
+        current = None
+        for idx, rank, text, meta, dist in chunks:
+            if current is not None:
+                merged = _stitch(current["text"], text, adjacent=idx <= current["end"] + 1)
+                if merged is not None:
+                    current["text"] = merged
+                    current["end"] = max(current["end"], idx)
+                    current["rank"] = min(current["rank"], rank)
+                    if dist is not None and (current["dist"] is None or dist < current["dist"]):
+                        current["dist"] = dist
+                    continue
+                excerpts.append(current)
+            current = {"text": text, "start": idx, "end": idx, "rank": rank, "meta": meta, "dist": dist}
+        if current is not None:
+            excerpts.append(current)
+
+    excerpts.sort(key=lambda e: e["rank"])
+    # Text already covered by a more relevant excerpt (e.g. the same file under two names) is sent once
+    unique: List[Dict[str, Any]] = []
+    for e in excerpts:
+        if not any(e["text"] in u["text"] for u in unique):
+            unique.append(e)
+    return unique
+
+def _pack_context(ctx: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Replace a selected context's chunks with merged excerpts that fit the
+    token budget, taken greedily in relevance order. The most relevant
+    excerpt is always kept (truncated if it alone exceeds the budget, but
+    never below _MIN_EXCERPT_TOKENS).
+    """
+    budget = int(getattr(settings, "CONTEXT_TOKEN_BUDGET", 3000) or 0)
+    excerpts = _assemble_excerpts(ctx["docs"], ctx["metas"], ctx["distances"])
+
+    packed: List[Dict[str, Any]] = []
+    used = 0
+    for e in excerpts:
+        cost = approx_tokens(e["text"]) + _EXCERPT_OVERHEAD_TOKENS
+        if budget and used + cost > budget:
+            if not packed:
+                e["text"] = truncate_tokens(e["text"], max(budget - _EXCERPT_OVERHEAD_TOKENS,
+                                                           _MIN_EXCERPT_TOKENS))
+                packed.append(e)
+                used = budget
+            continue
+        packed.append(e)
+        used += cost
+
+    if len(packed) < len(ctx["docs"]):
+        logger.info(f"Packed {len(ctx['docs'])} chunks into {len(packed)} excerpts (~{used} tokens)")
+    return {
+        "docs": [e["text"] for e in packed],
+        "metas": [{**e["meta"], "chunk_index": e["start"], "chunk_end": e["end"]} for e in packed],
+        "distances": [e["dist"] for e in packed] if ctx["distances"] else [],
+        "low_confidence": ctx["low_confidence"],
+    }
+
+def _build_prompt(question: str, ctx: Dict[str, Any]) -> str:
+    context = _format_context(ctx["docs"], ctx["metas"], ctx["distances"])
 
     # Build expert-level prompt
     prompt_parts = [
         SYS_PROMPT,
-        "\n" + "="*80 + "\n",
+        "---",
         f"QUESTION: {question}",
-        "\n" + "="*80 + "\n",
+        "---",
         context,
-        "\n" + "="*80 + "\n",
+        "---",
         "INSTRUCTIONS FOR YOUR RESPONSE:",
         "1. Read all provided document excerpts carefully",
         "2. Provide a comprehensive, well-structured answer",
@@ -131,55 +398,69 @@ def ask(question: str, k: int = 8, relevance_threshold: float = 1.5) -> Dict[str
         "5. Use clear formatting (bullet points, paragraphs, etc.) for readability"
     ]
 
-    if low_confidence:
+    if ctx["low_confidence"]:
         prompt_parts.append(
             "\nNOTE: Document relevance is low. Be explicit about any limitations in your answer."
         )
 
-    prompt = "\n".join(prompt_parts)
-
-    client = _gemini_client()
-    model = "gemini-2.5-flash"
+    return "\n".join(prompt_parts)
+
+def _response_text(resp) -> str:
+    """Safely extract answer text from a (possibly partial) generation response."""
+    answer_text = ""
+    if hasattr(resp, "text") and resp.text:
+        answer_text = resp.text
+    elif hasattr(resp, "candidates") and resp.candidates:
+        candidate = resp.candidates[0]
+        if hasattr(candidate, "content") and hasattr(candidate.content, "parts"):
+            for part in candidate.content.parts or []:
+                if hasattr(part, "text") and part.text:
+                    answer_text += part.text
+    return answer_text
+
+def _count_tokens(resp):
+    """Add a response's usage metadata to the token counters."""
+    usage = getattr(resp, "usage_metadata", None)
+    if usage is None:
+        return
+    metrics.inc("tokens_total", getattr(usage, "prompt_token_count", 0) or 0, kind="prompt")
+    metrics.inc("tokens_total", getattr(usage, "candidates_token_count", 0) or 0, kind="completion")
+
+def _generate(client, prompt: str) -> Tuple[str, bool]:
+    """
+    Run one (non-streaming) generation.
 
+    Returns:
+        (answer text, whether the answer may be cached)
+    """
     try:
-        # Generate response with controlled temperature for consistency
-        config = {
-            "temperature": 0.3,  # Lower temperature for more focused, accurate responses
-            "top_p": 0.9,
-            "top_k": 40,
-            "max_output_tokens": 2048,
-        }
-
-        resp = client.models.generate_content(
-            model=model,
-            contents=prompt,
-            config=config
-        )
-
-        # Safely extract answer text
-        answer_text = ""
-        if hasattr(resp, "text") and resp.text:
-            answer_text = resp.text
-        elif hasattr(resp, "candidates") and resp.candidates:
-            candidate = resp.candidates[0]
-            if hasattr(candidate, "content") and hasattr(candidate.content, "parts"):
-                for part in candidate.content.parts:
-                    if hasattr(part, "text"):
-                        answer_text += part.text
-
+        with metrics.span("generate"):
+            resp = client.models.generate_content(
+                model=GEN_MODEL,
+                contents=prompt,
+                config=GEN_CONFIG
+            )
+        _count_tokens(resp)
+
+        answer_text = _response_text(resp)
+        cacheable = bool(answer_text)
         if not answer_text:
             logger.error("No text extracted from LLM response")
-            answer_text = "I apologize, but I couldn't generate a response. Please try again."
+            answer_text = FALLBACK_ANSWER
 
         logger.info(f"Generated answer of length {len(answer_text)}")
 
     except Exception as e:
         logger.error(f"Error generating response: {e}")
         answer_text = f"Error generating response: {str(e)}"
+        cacheable = False
 
+    return answer_text.strip(), cacheable
+
+def _build_sources(ctx: Dict[str, Any]) -> List[Dict[str, Any]]:
     # Build sources list from filtered results
     sources = []
-    for i, (d, m, dist) in enumerate(zip(filtered_docs, filtered_metas, filtered_distances)):
+    for i, (d, m, dist) in enumerate(zip(ctx["docs"], ctx["metas"], ctx["distances"])):
         # Convert distance to relevance percentage
         relevance_pct = None
         if dist is not None:
@@ -195,7 +476,240 @@ def ask(question: str, k: int = 8, relevance_threshold: float = 1.5) -> Dict[str
             "score": float(dist) if dist is not None else None,
             "relevance": f"{relevance_pct:.1f}%" if relevance_pct is not None else None,
         })
+    return sources
+
+def _scope_key(k: int, relevance_threshold: float, namespace: Optional[str],
+               doc_ids: Optional[List[str]]) -> Tuple[Any, ...]:
+    return (k, relevance_threshold, namespace or "", tuple(sorted(str(d) for d in doc_ids or ())))
+
+@metrics.timed("ask")
+def ask(question: str, k: int = 8, relevance_threshold: float = 1.5,
+        namespace: Optional[str] = None, doc_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Ask a question and get an expert answer based on uploaded documents.
+
+    Args:
+        question: The question to answer
+        k: Number of document chunks to retrieve (default 8 for better coverage)
+        relevance_threshold: Maximum distance to consider relevant (cosine distance, default 1.5)
+        namespace: Only search documents in this namespace (default namespace if None)
+        doc_ids: Only search these documents
+
+    Returns:
+        Dictionary with 'answer' and 'sources' keys
+    """
+    logger.info(f"Processing question: {question[:100]}...")
+
+    # Semantic answer cache: near-identical questions reuse a stored answer
+    scope = _scope_key(k, relevance_threshold, namespace, doc_ids)
+    cache, qvec, version, hit = _cache_lookup(question, scope)
+    if hit is not None:
+        return hit
+
+    ctx = _retrieve(question, k, relevance_threshold, qvec, namespace, doc_ids)
+    if ctx is None:
+        return {"answer": NO_DOCS_ANSWER, "sources": []}
 
+    with metrics.span("prompt"):
+        prompt = _build_prompt(question, ctx)
+    answer_text, cacheable = _generate(_gemini_client(), prompt)
+
+    sources = _build_sources(ctx)
     logger.info(f"Returning answer with {len(sources)} sources")
 
-    return {"answer": answer_text.strip(), "sources": sources}
+    out = {"answer": answer_text, "sources": sources}
+    if cache is not None and qvec is not None and cacheable:
+        cache.put(qvec, version, {"answer": out["answer"], "sources": [dict(s) for s in sources]}, scope=scope)
+    return out
+
+def ask_stream(question: str, k: int = 8, relevance_threshold: float = 1.5,
+               namespace: Optional[str] = None, doc_ids: Optional[List[str]] = None) -> Iterator[Tuple[str, Any]]:
+    """
+    Streaming variant of ask.
+
+    Yields (event, data) pairs: one ("sources", list) as soon as retrieval
+    finishes, ("token", str) for each piece of generated text, an optional
+    ("error", str), and finally ("done", {"answer", "sources"}).
+
+    Stage timings include time the consumer spends between events.
+    """
+    logger.info(f"Processing streamed question: {question[:100]}...")
+    started = time.perf_counter()
+
+    scope = _scope_key(k, relevance_threshold, namespace, doc_ids)
+    cache, qvec, version, hit = _cache_lookup(question, scope)
+    if hit is not None:
+        yield "sources", hit["sources"]
+        yield "token", hit["answer"]
+        yield "done", hit
+        return
+
+    ctx = _retrieve(question, k, relevance_threshold, qvec, namespace, doc_ids)
+    if ctx is None:
+        yield "sources", []
+        yield "token", NO_DOCS_ANSWER
+        yield "done", {"answer": NO_DOCS_ANSWER, "sources": []}
+        return
+
+    sources = _build_sources(ctx)
+    yield "sources", sources
+
+    with metrics.span("prompt"):
+        prompt = _build_prompt(question, ctx)
+    client = _gemini_client()
+    parts: List[str] = []
+    cacheable = False
+    last = None
+    gen_started = time.perf_counter()
+
+    try:
+        for chunk in client.models.generate_content_stream(
+            model=GEN_MODEL,
+            contents=prompt,
+            config=GEN_CONFIG
+        ):
+            last = chunk
+            piece = _response_text(chunk)
+            if piece:
+                if not parts:
+                    metrics.record("first_token", time.perf_counter() - started)
+                parts.append(piece)
+                yield "token", piece
+
+        cacheable = bool(parts)
+        if not parts:
+            logger.error("No text extracted from streamed LLM response")
+            parts.append(FALLBACK_ANSWER)
+            yield "token", FALLBACK_ANSWER
+
+    except Exception as e:
+        logger.error(f"Error streaming response: {e}")
+        message = f"Error generating response: {str(e)}"
+        parts.append(("\n\n" if parts else "") + message)
+        yield "error", message
+
+    metrics.record("generate", time.perf_counter() - gen_started)
+    if last is not None:
+        # Streamed usage metadata is cumulative; the final chunk has the totals
+        _count_tokens(last)
+    metrics.record("ask_stream", time.perf_counter() - started)
+
+    out = {"answer": "".join(parts).strip(), "sources": sources}
+    logger.info(f"Streamed answer of length {len(out['answer'])} with {len(sources)} sources")
+    if cache is not None and qvec is not None and cacheable:
+        cache.put(qvec, version, {"answer": out["answer"], "sources": [dict(s) for s in sources]}, scope=scope)
+    yield "done", out
+
+def ask_batch(questions: Iterable[str], k: int = 8, relevance_threshold: float = 1.5,
+              namespace: Optional[str] = None, doc_ids: Optional[List[str]] = None,
+              concurrency: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Answer many questions: embeddings and vector searches are batched, and
+    generation runs on up to `concurrency` threads (ASK_BATCH_CONCURRENCY).
+
+    Args:
+        questions: Questions to answer
+        k: Number of document chunks to retrieve per question
+        relevance_threshold: Maximum distance to consider relevant
+        namespace: Only search documents in this namespace (default namespace if None)
+        doc_ids: Only search these documents
+        concurrency: Maximum generations in flight
+
+    Yields:
+        One dict per question, in input order, with 'index', 'question',
+        'answer' and 'sources' (plus 'error' when the question failed)
+    """
+    questions = [(q or "").strip() for q in questions]
+    logger.info(f"Processing batch of {len(questions)} questions")
+    results: Dict[int, Dict[str, Any]] = {}
+    contexts: Dict[int, Dict[str, Any]] = {}
+    vectors: Dict[int, List[float]] = {}
+
+    for i, q in enumerate(questions):
+        if not q:
+            results[i] = {"answer": "", "sources": [], "error": "Empty question"}
+
+    pending = [i for i in range(len(questions)) if i not in results]
+    if pending:
+        from .embeddings import embed_texts
+
+        try:
+            vectors = dict(zip(pending, embed_texts([questions[i] for i in pending])))
+        except Exception as e:
+            logger.error(f"Batch embedding failed: {e}")
+            for i in pending:
+                results[i] = {"answer": "", "sources": [], "error": f"Failed to embed question: {e}"}
+            pending = []
+
+    scope = _scope_key(k, relevance_threshold, namespace, doc_ids)
+    cache = get_answer_cache()
+    version = corpus_version()
+    if cache is not None and pending:
+        misses = []
+        for i in pending:
+            hit = cache.get(vectors[i], version, scope=scope)
+            if hit is None:
+                misses.append(i)
+            else:
+                results[i] = {"answer": hit["answer"], "sources": [dict(s) for s in hit["sources"]]}
+        logger.info(f"Answer cache served {len(pending) - len(misses)} of {len(pending)} questions")
+        pending = misses
+
+    if pending:
+        try:
+            found = vs_query_many([questions[i] for i in pending], k=_fetch_k(k),
+                                  embeddings=[vectors[i] for i in pending],
+                                  namespace=namespace, doc_ids=doc_ids, with_embeddings=_mmr_enabled())
+        except Exception as e:
+            logger.error(f"Batch retrieval failed: {e}")
+            for i in pending:
+                results[i] = {"answer": "", "sources": [], "error": f"Failed to search documents: {e}"}
+            found = []
+        for i, result in zip(pending, found):
+            ctx = _select(questions[i], result, k, relevance_threshold)
+            if ctx is None:
+                results[i] = {"answer": NO_DOCS_ANSWER, "sources": []}
+            else:
+                contexts[i] = ctx
+
+    client = None
+    if contexts:
+        try:
+            client = _gemini_client()
+        except Exception as e:
+            logger.error(f"Failed to create Gemini client: {e}")
+            for i in contexts:
+                results[i] = {"answer": "", "sources": [], "error": f"Failed to reach the language model: {e}"}
+            contexts.clear()
+
+    def answer(i: int) -> Dict[str, Any]:
+        out = {"index": i, "question": questions[i]}
+        if i in results:
+            out.update(results.pop(i))
+            return out
+        ctx = contexts.pop(i)
+        answer_text, cacheable = _generate(client, _build_prompt(questions[i], ctx))
+        sources = _build_sources(ctx)
+        out.update({"answer": answer_text, "sources": sources})
+        if cache is not None and cacheable:
+            cache.put(vectors[i], version, {"answer": answer_text, "sources": [dict(s) for s in sources]}, scope=scope)
+        return out
+
+    # Keep a bounded window of futures and yield them in submission order
+    workers = max(1, int(concurrency or getattr(settings, "ASK_BATCH_CONCURRENCY", 4) or 1))
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ask-batch")
+    inflight: deque = deque()
+    order = iter(range(len(questions)))
+    try:
+        for i in order:
+            inflight.append(pool.submit(answer, i))
+            if len(inflight) >= workers * 2:
+                break
+        while inflight:
+            yield inflight.popleft().result()
+            nxt = next(order, None)
+            if nxt is not None:
+                inflight.append(pool.submit(answer, nxt))
+    finally:
+        # The consumer may stop early (e.g. client disconnect): drop queued work
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,119 @@
+import logging
+import threading
+import time
+from typing import List, Optional
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_MODEL = None
+_LOADING = False
+# Held for the whole model load
+_LOCK = threading.Lock()
+# Guards the small state below; never held while loading or scoring
+_STATE_LOCK = threading.Lock()
+# monotonic() of the last failed load; background loads wait RERANK_RETRY_AFTER before retrying
+_FAILED_AT: Optional[float] = None
+
+# Running estimate of cross-encoder cost per (question, chunk) pair
+_ema_ms_per_pair: Optional[float] = None
+_skips = 0
+# After this many budget skips, rerank once anyway to re-measure
+_REMEASURE_AFTER = 20
+
+def enabled() -> bool:
+    return bool(getattr(settings, "RERANK_ENABLED", False))
+
+def _model_name() -> str:
+    return getattr(settings, "RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+
+def load_model():
+    """Load the cross-encoder once per process (CPU)."""
+    global _MODEL, _LOADING, _FAILED_AT
+    if _MODEL is not None:
+        return _MODEL
+    try:
+        with _LOCK:
+            if _MODEL is None:
+                from sentence_transformers import CrossEncoder
+
+                started = time.perf_counter()
+                _MODEL = CrossEncoder(_model_name(), device="cpu")
+                logger.info(f"Cross-encoder {_model_name()} loaded in {time.perf_counter() - started:.1f}s")
+    except Exception:
+        with _STATE_LOCK:
+            _FAILED_AT = time.monotonic()
+        raise
+    finally:
+        with _STATE_LOCK:
+            _LOADING = False
+    return _MODEL
+
+def _warm_in_background():
+    global _LOADING
+    retry_after = float(getattr(settings, "RERANK_RETRY_AFTER", 300))
+    with _STATE_LOCK:
+        if _LOADING or _MODEL is not None:
+            return
+        if _FAILED_AT is not None and time.monotonic() - _FAILED_AT < retry_after:
+            return
+        _LOADING = True
+
+    def _run():
+        try:
+            load_model()
+        except Exception as e:
+            logger.error(f"Failed to load cross-encoder (retrying in {retry_after:.0f}s): {e}")
+
+    threading.Thread(target=_run, name="rerank-load", daemon=True).start()
+
+def rerank(question: str, docs: List[str], top_n: int) -> Optional[List[int]]:
+    """
+    Score (question, chunk) pairs in one batched forward pass.
+
+    Returns:
+        Indexes of the best `top_n` docs, best first, or None when the stage
+        was skipped (model still loading, or over RERANK_BUDGET_MS)
+    """
+    global _ema_ms_per_pair, _skips
+    if not docs:
+        return []
+
+    if _MODEL is None:
+        # Never make a request wait for the model download/load
+        _warm_in_background()
+        return None
+
+    budget_ms = float(getattr(settings, "RERANK_BUDGET_MS", 250))
+    with _STATE_LOCK:
+        estimate = _ema_ms_per_pair * len(docs) if _ema_ms_per_pair is not None else None
+        if estimate is not None and estimate > budget_ms:
+            _skips += 1
+            skip = _skips < _REMEASURE_AFTER
+        else:
+            skip = False
+        if not skip:
+            _skips = 0
+    if skip:
+        logger.info(f"Rerank skipped: ~{estimate:.0f}ms estimated > {budget_ms:.0f}ms budget")
+        return None
+
+    started = time.perf_counter()
+    try:
+        scores = _MODEL.predict(
+            [(question, d) for d in docs],
+            batch_size=len(docs),
+            show_progress_bar=False,
+        )
+    except Exception as e:
+        logger.error(f"Rerank failed: {e}")
+        return None
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    per_pair = elapsed_ms / len(docs)
+    with _STATE_LOCK:
+        _ema_ms_per_pair = per_pair if _ema_ms_per_pair is None else 0.8 * _ema_ms_per_pair + 0.2 * per_pair
+
+    order = sorted(range(len(docs)), key=lambda i: float(scores[i]), reverse=True)
+    logger.info(f"Reranked {len(docs)} candidates in {elapsed_ms:.0f}ms")
+    return order[:top_n]
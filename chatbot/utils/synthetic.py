@@ -0,0 +1,101 @@
+import itertools
+import os
+import random
+from typing import Iterator, List
+
+# Deterministic synthetic documents for benchmarks: the same (seed, size)
+# always produces byte-identical output, independent of platform.
+
+_ONSETS = ["b", "c", "d", "f", "g", "h", "k", "l", "m", "n", "p", "r", "s", "t", "v", "w", "st", "tr", "pl", "gr"]
+_VOWELS = ["a", "e", "i", "o", "u", "ai", "ea", "ou"]
+_CODAS = ["", "", "n", "r", "s", "t", "l", "nd", "ck", "st"]
+
+def vocabulary(seed: int = 0, size: int = 5000) -> List[str]:
+    rng = random.Random(seed)
+    words, seen = [], set()
+    while len(words) < size:
+        w = "".join(rng.choice(_ONSETS) + rng.choice(_VOWELS) + rng.choice(_CODAS)
+                    for _ in range(rng.choice((1, 1, 2, 2, 3))))
+        if w not in seen:
+            seen.add(w)
+            words.append(w)
+    return words
+
+class Corpus:
+    """
+    Generator of paragraphs with Zipf-distributed words, section headings
+    and occasional bullet lists. Paragraphs are numbered so chunks stay
+    distinct (content-addressed chunk ids would otherwise collapse them).
+    """
+
+    def __init__(self, seed: int = 0, vocab_size: int = 5000, pool: int = 2000):
+        self.seed = seed
+        self.words = vocabulary(seed, vocab_size)
+        self._cum = list(itertools.accumulate(1.0 / (r + 1) for r in range(len(self.words))))
+        rng = random.Random(seed + 1)
+        # Pre-built paragraph bodies keep multi-GB generation fast
+        self._pool = [self._paragraph(rng) for _ in range(pool)]
+
+    def sentence(self, rng: random.Random) -> str:
+        words = rng.choices(self.words, cum_weights=self._cum, k=rng.randint(6, 20))
+        return " ".join(words).capitalize() + rng.choice((".", ".", ".", "?", ";"))
+
+    def _paragraph(self, rng: random.Random) -> str:
+        if rng.random() < 0.1:
+            return "\n".join(f"- {self.sentence(rng)}" for _ in range(rng.randint(3, 6)))
+        return " ".join(self.sentence(rng) for _ in range(rng.randint(3, 8)))
+
+    def paragraphs(self) -> Iterator[str]:
+        rng = random.Random(self.seed + 2)
+        for n in itertools.count(1):
+            if n % 12 == 1:
+                yield f"Section {n // 12 + 1}: {self.sentence(rng).rstrip('.?;')}"
+            yield f"[{n}] {rng.choice(self._pool)}"
+
+    def questions(self, n: int) -> List[str]:
+        rng = random.Random(self.seed + 3)
+        return [self.sentence(rng).rstrip(".?;") + "?" for _ in range(n)]
+
+    def write_text(self, path: str, nbytes: int) -> str:
+        """Write about `nbytes` of text to `path` once; reused on later runs."""
+        if os.path.exists(path) and os.path.getsize(path) >= nbytes:
+            return path
+        tmp = path + ".tmp"
+        size = 0
+        with open(tmp, "w", encoding="utf-8") as f:
+            for p in self.paragraphs():
+                if size >= nbytes:
+                    break
+                f.write(p + "\n\n")
+                size += len(p.encode("utf-8")) + 2
+        os.replace(tmp, path)
+        return path
+
+    def write_pdf(self, path: str, pages: int) -> str:
+        import fitz  # PyMuPDF
+
+        if os.path.exists(path):
+            return path
+        doc = fitz.open()
+        paras = self.paragraphs()
+        for _ in range(pages):
+            page = doc.new_page()
+            body = "\n\n".join(next(paras) for _ in range(5))
+            page.insert_textbox(fitz.Rect(50, 50, page.rect.width - 50, page.rect.height - 50), body, fontsize=9)
+        doc.save(path)
+        doc.close()
+        return path
+
+    def write_docx(self, path: str, paragraphs: int) -> str:
+        from docx import Document as Docx
+
+        if os.path.exists(path):
+            return path
+        doc = Docx()
+        for p in itertools.islice(self.paragraphs(), paragraphs):
+            if p.startswith("Section "):
+                doc.add_heading(p, level=2)
+            else:
+                doc.add_paragraph(p)
+        doc.save(path)
+        return path
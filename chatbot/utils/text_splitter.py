@@ -1,33 +1,27 @@
 import re
-from typing import List
+from typing import Generator, Iterable, Iterator, List, Tuple
+from . import metrics
+
+_MULTI_NEWLINE = re.compile(r"\n{3,}")
 
 def clean_text(s: str) -> str:
     s = s.replace("\r", "\n")
-    s = re.sub(r"\n{3,}", "\n\n", s)
+    s = _MULTI_NEWLINE.sub("\n\n", s)
     return s.strip()
 
-def chunk_text(s: str, max_chars: int = 1200, overlap: int = 150, min_chunk_size: int = 50) -> List[str]:
+def _windows(s: str, max_chars: int, overlap: int, min_chunk_size: int,
+             final: bool = True) -> Generator[str, None, int]:
     """
-    Split text into overlapping chunks with proper boundary detection.
-
-    Args:
-        s: Text to split
-        max_chars: Maximum characters per chunk
-        overlap: Number of characters to overlap between chunks
-        min_chunk_size: Minimum chunk size to keep (filters out tiny chunks)
-
-    Returns:
-        List of text chunks
+    Yield overlapping chunks of `s` and return the offset where the next
+    window starts. With final=False, stops before any window that would
+    reach the end of `s`, so the caller can append more text and resume.
     """
-    s = clean_text(s)
-
-    if not s or len(s) < min_chunk_size:
-        return []
-
-    chunks = []
     start = 0
 
     while start < len(s):
+        if not final and start + max_chars >= len(s):
+            break
+
         end = min(len(s), start + max_chars)
         chunk = s[start:end]
 
@@ -49,7 +43,7 @@ def chunk_text(s: str, max_chars: int = 1200, overlap: int = 150, min_chunk_size
         # Only add non-empty chunks that meet minimum size
         chunk_stripped = chunk.strip()
         if len(chunk_stripped) >= min_chunk_size:
-            chunks.append(chunk_stripped)
+            yield chunk_stripped
 
         # Move to next chunk with proper overlap
         # Fixed bug: was `max(end - overlap, end)` which always returned `end`
@@ -65,4 +59,320 @@ def chunk_text(s: str, max_chars: int = 1200, overlap: int = 150, min_chunk_size
             # We've reached the end
             start = end
 
-    return chunks
+    return start
+
+@metrics.timed("chunk")
+def chunk_text(s: str, max_chars: int = 1200, overlap: int = 150, min_chunk_size: int = 50) -> List[str]:
+    """
+    Split text into overlapping chunks with proper boundary detection.
+
+    Args:
+        s: Text to split
+        max_chars: Maximum characters per chunk
+        overlap: Number of characters to overlap between chunks
+        min_chunk_size: Minimum chunk size to keep (filters out tiny chunks)
+
+    Returns:
+        List of text chunks
+    """
+    s = clean_text(s)
+
+    if not s or len(s) < min_chunk_size:
+        return []
+
+    return list(_windows(s, max_chars, overlap, min_chunk_size))
+
+def chunk_stream(fragments: Iterable[str], max_chars: int = 1200, overlap: int = 150,
+                 min_chunk_size: int = 50) -> Iterator[str]:
+    """
+    Chunk a document given as an iterator of text fragments (pages, reads)
+    whose concatenation is the full text.
+
+    Produces the same chunks as chunk_text on the concatenated text while
+    only holding a carry-over buffer of a few windows in memory.
+
+    Args:
+        fragments: Iterable of text pieces, in document order
+        max_chars: Maximum characters per chunk
+        overlap: Number of characters to overlap between chunks
+        min_chunk_size: Minimum chunk size to keep (filters out tiny chunks)
+
+    Yields:
+        Text chunks
+    """
+    buf = ""
+    # Trailing whitespace is held back until more text arrives: chunk_text
+    # strips it from the end of the document, so window ends must be decided
+    # against the stripped length
+    tail = ""
+    started = False
+
+    for frag in fragments:
+        if not frag:
+            continue
+        frag = frag.replace("\r", "\n")
+        if not started:
+            frag = frag.lstrip()
+            if not frag:
+                continue
+            started = True
+
+        text = _MULTI_NEWLINE.sub("\n\n", tail + frag)
+        stripped = text.rstrip()
+        tail = text[len(stripped):]
+        if not stripped:
+            continue
+        buf += stripped
+        if len(buf) > 2 * max_chars:
+            start = yield from _windows(buf, max_chars, overlap, min_chunk_size, final=False)
+            buf = buf[start:]
+
+    if buf:
+        yield from _windows(buf, max_chars, overlap, min_chunk_size)
+
+# ---- Token-aware, structure-aware chunking ----
+
+_WORD_OR_PUNCT = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_LONG_WORD = re.compile(r"\w{7,}", re.UNICODE)
+_PARA_BREAK = re.compile(r"\n[ \t]*\n")
+_SENTENCE_END = re.compile(r"(?:(?<=[.!?])|(?<=[.!?][\"')\]]))\s+(?=[\"'(\[]?[A-Z0-9])")
+_LIST_ITEM = re.compile(r"^\s*(?:[-*•]|\d{1,3}[.)])\s+")
+_NUMBERED_HEADING = re.compile(r"^(?:#{1,6}\s|\d+(?:\.\d+)*\.?\s|[IVXLC]+\.\s|(?:chapter|section|part|appendix)\b)", re.IGNORECASE)
+# A paragraph larger than this is emitted in pieces rather than carried whole
+_MAX_CARRY = 64 * 1024
+
+def approx_tokens(text: str) -> int:
+    """
+    Cheap, deterministic estimate of subword tokens: one per punctuation
+    mark and one per word, plus one per further 6 characters of long words.
+    """
+    n = len(_WORD_OR_PUNCT.findall(text))
+    for word in _LONG_WORD.findall(text):
+        n += (len(word) - 1) // 6
+    return n
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Cut `text` after roughly `max_tokens` approximate tokens, at a token boundary."""
+    if max_tokens <= 0:
+        return ""
+    for i, m in enumerate(_WORD_OR_PUNCT.finditer(text)):
+        if i + 1 >= max_tokens:
+            return text[:m.end()]
+    return text
+
+def _is_heading(para: str) -> bool:
+    if "\n" in para or len(para) > 80:
+        return False
+    if _NUMBERED_HEADING.match(para):
+        return not para.rstrip().endswith((".", ",", ";"))
+    if para[-1] in ".,;:!?":
+        return False
+    letters = [c for c in para if c.isalpha()]
+    if letters and all(c.isupper() for c in letters):
+        return True
+    return para[0].isupper() and len(para.split()) <= 8
+
+def _units(para: str, continued: bool) -> Iterator[Tuple[str, int, str]]:
+    """
+    Split one paragraph into (text, tokens, kind) units. kind says how the
+    unit joins the previous one: "head" (heading), "para" (new paragraph),
+    "item" (list line) or "cont" (next sentence of the same paragraph).
+    """
+    para = para.strip()
+    if not para:
+        return
+    if not continued and _is_heading(para):
+        yield para, approx_tokens(para), "head"
+        return
+
+    first = not continued
+    lines = para.split("\n")
+    if len(lines) > 1 and all(_LIST_ITEM.match(l) for l in lines if l.strip()):
+        for line in lines:
+            line = line.strip()
+            if line:
+                yield line, approx_tokens(line), "para" if first else "item"
+                first = False
+        return
+
+    # Wrapped lines (e.g. PDF layout) belong to the same sentence
+    flat = " ".join(l.strip() for l in lines if l.strip())
+    for sentence in _SENTENCE_END.split(flat):
+        if sentence:
+            yield sentence, approx_tokens(sentence), "para" if first else "cont"
+            first = False
+
+class _Packer:
+    """Greedy packing of units into chunks of at most max_tokens."""
+
+    _SEPARATORS = {"head": "\n\n", "para": "\n\n", "item": "\n", "cont": " "}
+
+    def __init__(self, max_tokens: int, overlap_tokens: int, min_tokens: int):
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.min_tokens = min_tokens
+        self.units: List[Tuple[str, int, str]] = []
+        self.tokens = 0
+        self.carried = 0  # leading units repeated from the previous chunk as overlap
+        self.fresh = False  # holds units not yet emitted in a previous chunk
+        # The last chunk is held back one step so a small final remainder can join it
+        self.last = ""
+        self.last_tokens = 0
+
+    def _join(self, units: List[Tuple[str, int, str]]) -> str:
+        parts = [units[0][0]]
+        for text, _, kind in units[1:]:
+            parts.append(self._SEPARATORS[kind])
+            parts.append(text)
+        return "".join(parts)
+
+    def _emit(self, overlap: bool) -> Iterator[str]:
+        if self.fresh:
+            if self.last:
+                yield self.last
+            self.last = self._join(self.units)
+            self.last_tokens = self.tokens
+
+        carry: List[Tuple[str, int, str]] = []
+        if overlap:
+            # Trailing units of the current paragraph, within the overlap budget
+            budget = self.overlap_tokens
+            for unit in reversed(self.units):
+                if unit[1] > budget:
+                    break
+                carry.append(unit)
+                budget -= unit[1]
+                if unit[2] in ("para", "head"):
+                    break
+            carry.reverse()
+        self.units = carry
+        self.tokens = sum(u[1] for u in carry)
+        self.carried = len(carry)
+        self.fresh = False
+
+    def _split_long(self, text: str, kind: str) -> Iterator[Tuple[str, int, str]]:
+        """Break a unit longer than max_tokens at word boundaries."""
+        words: List[str] = []
+        count = 0
+        for word in text.split():
+            n = approx_tokens(word)
+            if n > self.max_tokens:
+                # No spaces to split on (URLs, base64, tables): cut by characters
+                if words:
+                    yield " ".join(words), count, kind
+                    kind = "cont"
+                    words, count = [], 0
+                for i in range(0, len(word), self.max_tokens):
+                    piece = word[i:i + self.max_tokens]
+                    yield piece, approx_tokens(piece), kind
+                    kind = "cont"
+                continue
+            if words and count + n > self.max_tokens:
+                yield " ".join(words), count, kind
+                kind = "cont"
+                words, count = [], 0
+            words.append(word)
+            count += n
+        if words:
+            yield " ".join(words), count, kind
+
+    def add(self, text: str, tokens: int, kind: str) -> Iterator[str]:
+        if tokens > self.max_tokens:
+            for piece in self._split_long(text, kind):
+                yield from self.add(*piece)
+            return
+
+        # Text pending below min_tokens is merged forward rather than emitted alone
+        ready = self.fresh and self.tokens >= self.min_tokens
+        if kind == "head" and (ready or not self.fresh):
+            # Sections start a new chunk, without overlap from the previous one
+            yield from self._emit(overlap=False)
+        elif ready and self.tokens + tokens > self.max_tokens:
+            # Overlap only helps when the split lands inside a paragraph
+            yield from self._emit(overlap=kind in ("cont", "item"))
+
+        # Overlap carried into a chunk must leave room for this unit
+        while self.units and not self.fresh and self.tokens + tokens > self.max_tokens:
+            self.tokens -= self.units.pop(0)[1]
+            self.carried -= 1
+
+        self.units.append((text, tokens, kind))
+        self.tokens += tokens
+        self.fresh = True
+
+    def finish(self) -> Iterator[str]:
+        new = self.units[self.carried:]
+        size = sum(u[1] for u in new)
+        if (self.fresh and self.last and size < self.min_tokens
+                and self.last_tokens + size < self.max_tokens + self.min_tokens):
+            # Too small to stand alone (a sign-off, a contact line): append it
+            # to the previous chunk rather than lose it
+            self.last += self._SEPARATORS[new[0][2]] + self._join(new)
+        elif self.fresh and (self.last or self.tokens >= self.min_tokens):
+            yield from self._emit(overlap=False)
+        if self.last:
+            yield self.last
+        self.last = ""
+        self.last_tokens = 0
+
+def chunk_blocks(blocks: Iterable[str], max_tokens: int = 256, overlap_tokens: int = 32,
+                 min_tokens: int = 12) -> Iterator[str]:
+    """
+    Chunk a document given as an iterator of text blocks (pages, reads,
+    paragraphs) whose concatenation is the full text, sizing chunks by
+    approximate token count.
+
+    Each block is scanned once to find paragraph, heading, list-item and
+    sentence boundaries. Chunks end on those boundaries, a heading starts
+    a new chunk, and consecutive chunks of one paragraph share up to
+    `overlap_tokens` of trailing sentences. Only the current (unfinished)
+    paragraph and two chunks are buffered. Output is deterministic and, for
+    paragraphs under 64KB, independent of how the text was split into blocks.
+
+    Args:
+        blocks: Iterable of text pieces, in document order
+        max_tokens: Maximum approximate tokens per chunk (exceeded by less
+            than min_tokens when a small remainder is merged into a neighbour)
+        overlap_tokens: Maximum tokens of overlap inside a paragraph
+        min_tokens: Smaller pending text is merged into the next chunk, and
+            a smaller final remainder into the previous one; only a whole
+            document below it yields nothing
+
+    Yields:
+        Text chunks
+    """
+    packer = _Packer(max_tokens, overlap_tokens, min_tokens)
+    carry = ""
+    continued = False
+    cr = ""
+
+    for block in blocks:
+        if not block:
+            continue
+        # Hold a trailing "\r" back in case the next block starts with "\n"
+        block, cr = cr + block, ""
+        if block.endswith("\r"):
+            block, cr = block[:-1], "\r"
+        text = carry + block.replace("\r\n", "\n").replace("\r", "\n")
+        paras = _PARA_BREAK.split(text)
+        # The last paragraph may continue in the next block
+        carry = paras.pop()
+        for para in paras:
+            for unit in _units(para, continued):
+                yield from packer.add(*unit)
+            continued = False
+
+        if len(carry) > _MAX_CARRY:
+            # Flush complete sentences of a very long paragraph
+            cut = max(carry.rfind(". "), carry.rfind("? "), carry.rfind("! "))
+            if cut <= 0:
+                cut = carry.rfind(" ")
+            if cut > 0:
+                for unit in _units(carry[:cut + 1], continued):
+                    yield from packer.add(*unit)
+                carry = carry[cut + 1:]
+                continued = True
+
+    for unit in _units(carry + ("\n" if cr else ""), continued):
+        yield from packer.add(*unit)
+    yield from packer.finish()
@@ -1,18 +1,34 @@
-import chromadb
-from chromadb.config import Settings
-from typing import List, Dict, Any
+import hashlib
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Protocol, Tuple
 import logging
+import numpy as np
 from django.conf import settings
+from .lexical_index import get_lexical_index, reciprocal_rank_fusion
+from . import metrics
 
 logger = logging.getLogger(__name__)
 
 _CLIENT = None
-_COLLECTION = None
+# One collection per namespace, keyed by collection name
+_COLLECTIONS: Dict[str, Any] = {}
+_COLLECTIONS_LOCK = threading.Lock()
+
+BASE_COLLECTION = "docchat"
+# Chroma collection names allow 3-63 chars of [a-zA-Z0-9._-]
+_NAMESPACE_RE = re.compile(r"^[a-z0-9](?:[a-z0-9_-]{0,46}[a-z0-9])?$")
 
 def _client():
     """Get or create ChromaDB client with persistent storage."""
     global _CLIENT
     if _CLIENT is None:
+        # Imported lazily so the numpy backend works without chromadb loaded
+        import chromadb
+        from chromadb.config import Settings
+
         persist_dir = getattr(settings, "CHROMA_PERSIST_DIR", ".chroma")
         _CLIENT = chromadb.Client(Settings(
             is_persistent=True,
@@ -21,105 +37,541 @@ def _client():
         logger.info(f"ChromaDB client initialized with persist_directory: {persist_dir}")
     return _CLIENT
 
-def get_collection(name: str = "docchat"):
-    """Get or create a ChromaDB collection."""
-    global _COLLECTION
-    if _COLLECTION is None:
-        _COLLECTION = _client().get_or_create_collection(
-            name=name,
-            metadata={"hnsw:space": "cosine"}
-        )
-        logger.info(f"ChromaDB collection '{name}' initialized")
-    return _COLLECTION
+class VectorBackend(Protocol):
+    """
+    Collection interface the vectorstore functions rely on. Chroma
+    collections satisfy it natively; NumpyCollection implements the same
+    surface for in-process exact search.
+    """
 
-def upsert_chunks(doc_id: str, chunks: List[str], metadoc: Dict[str, Any]):
+    def upsert(self, ids: List[str], documents: List[str], embeddings: Any, metadatas: List[Dict[str, Any]]) -> Any: ...
+    def update(self, ids: List[str], metadatas: List[Dict[str, Any]]) -> Any: ...
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None,
+            limit: Optional[int] = None, offset: Optional[int] = None, include: Any = ...) -> Dict[str, Any]: ...
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None) -> Any: ...
+    def count(self) -> int: ...
+    def query(self, query_embeddings: Any, n_results: int = 10, include: Any = ...,
+              where: Optional[Dict[str, Any]] = None) -> Dict[str, Any]: ...
+
+def hnsw_params(name: str = "docchat") -> Dict[str, int]:
     """
-    Insert or update document chunks in the vectorstore.
+    HNSW construction/search parameters for a collection: the global
+    HNSW_* settings, overridden per collection by HNSW_COLLECTION_PARAMS.
+    """
+    params = {
+        "M": int(getattr(settings, "HNSW_M", 16)),
+        "ef_construction": int(getattr(settings, "HNSW_EF_CONSTRUCTION", 100)),
+        "ef_search": int(getattr(settings, "HNSW_EF_SEARCH", 10)),
+    }
+    overrides = (getattr(settings, "HNSW_COLLECTION_PARAMS", {}) or {}).get(name, {})
+    params.update({k: int(v) for k, v in overrides.items() if k in params})
+    return params
 
-    Args:
-        doc_id: Unique document identifier
-        chunks: List of text chunks
-        metadoc: Metadata dictionary to attach to all chunks
+def hnsw_metadata(name: str = "docchat", params: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    """
+    Chroma collection metadata for the given HNSW parameters. Chroma fixes
+    these when a collection is created, so changing them means re-creating
+    (re-ingesting) the collection.
+    """
+    p = params or hnsw_params(name)
+    return {
+        "hnsw:space": "cosine",
+        "hnsw:M": p["M"],
+        "hnsw:construction_ef": p["ef_construction"],
+        "hnsw:search_ef": p["ef_search"],
+    }
+
+# What Chroma uses for a key missing from a collection's metadata (collections
+# created before HNSW parameters were configurable carry only "hnsw:space")
+_CHROMA_HNSW_DEFAULTS: Dict[str, Any] = {
+    "hnsw:space": "l2",
+    "hnsw:M": 16,
+    "hnsw:construction_ef": 100,
+    "hnsw:search_ef": 10,
+}
+
+def get_backend_name() -> str:
+    val = (getattr(settings, "VECTOR_BACKEND", "chroma") or "chroma").lower()
+    return val if val in ("chroma", "numpy") else "chroma"
+
+def normalize_namespace(namespace: Optional[str]) -> str:
+    """
+    Canonical form of a namespace ("" is the default, shared namespace).
 
     Raises:
-        ValueError: If chunks are empty or embeddings fail
+        ValueError: If the namespace can't be used in a collection name
     """
-    if not chunks:
-        raise ValueError("Cannot upsert empty chunks list")
+    ns = (namespace or "").strip().lower()
+    if ns and not _NAMESPACE_RE.match(ns):
+        raise ValueError(
+            f"Invalid namespace '{namespace}': use up to 48 letters, digits, '-' or '_'"
+        )
+    return ns
 
-    if not doc_id:
-        raise ValueError("doc_id cannot be empty")
+def collection_name(namespace: Optional[str] = None) -> str:
+    """Collection backing a namespace; the default namespace keeps the original name."""
+    ns = normalize_namespace(namespace)
+    return f"{BASE_COLLECTION}__{ns}" if ns else BASE_COLLECTION
+
+def _numpy_root() -> str:
+    return os.path.join(getattr(settings, "CHROMA_PERSIST_DIR", ".chroma"), "numpy")
+
+def _collection_names() -> List[str]:
+    if get_backend_name() == "numpy":
+        root = _numpy_root()
+        return os.listdir(root) if os.path.isdir(root) else []
+    # Older Chroma returns Collection objects, newer returns names
+    return [getattr(c, "name", c) for c in _client().list_collections()]
+
+def _open_collection(name: str) -> VectorBackend:
+    if get_backend_name() == "numpy":
+        from .numpy_index import NumpyCollection
+
+        col = NumpyCollection(
+            os.path.join(_numpy_root(), name),
+            dtype=getattr(settings, "NUMPY_INDEX_DTYPE", "float32"),
+            compact_ratio=float(getattr(settings, "NUMPY_INDEX_COMPACT_RATIO", 0.25)),
+        )
+        logger.info(f"NumPy vector index '{name}' initialized")
+        return col
+
+    wanted = hnsw_metadata(name)
+    col = _client().get_or_create_collection(
+        name=name,
+        metadata=wanted
+    )
+    current = {**_CHROMA_HNSW_DEFAULTS, **(col.metadata or {})}
+    stale = {k: current.get(k) for k in wanted if current.get(k) != wanted[k]}
+    if stale:
+        logger.warning(
+            f"ChromaDB collection '{name}' was built with {stale}; "
+            f"re-create it to apply {hnsw_params(name)}"
+        )
+    logger.info(f"ChromaDB collection '{name}' initialized")
+    return col
+
+def get_collection(name: str = BASE_COLLECTION, create: bool = True) -> Optional[VectorBackend]:
+    """
+    Get (and cache) a collection for the configured VECTOR_BACKEND.
+
+    With create=False a collection that doesn't exist yet is not made and
+    None is returned, so read paths can't leave empty collections behind.
+    """
+    col = _COLLECTIONS.get(name)
+    if col is None:
+        with _COLLECTIONS_LOCK:
+            col = _COLLECTIONS.get(name)
+            if col is None:
+                if not create and name not in _collection_names():
+                    return None
+                col = _open_collection(name)
+                _COLLECTIONS[name] = col
+    return col
+
+def namespace_collection(namespace: Optional[str] = None, create: bool = True) -> Optional[VectorBackend]:
+    return get_collection(collection_name(namespace), create=create)
+
+def namespaces() -> List[str]:
+    """Namespaces that currently have a collection on disk ("" first)."""
+    prefix = f"{BASE_COLLECTION}__"
+    found = {n[len(prefix):] for n in _collection_names() if n.startswith(prefix)}
+    return [""] + sorted(found)
+
+def _where_docs(doc_ids: Optional[List[str]]) -> Optional[Dict[str, Any]]:
+    if not doc_ids:
+        return None
+    ids = [str(d) for d in doc_ids]
+    return {"doc_id": ids[0]} if len(ids) == 1 else {"doc_id": {"$in": ids}}
 
-    col = get_collection()
-    ids = [f"{doc_id}::chunk::{i}" for i in range(len(chunks))]
+def _version_path() -> str:
+    return os.path.join(getattr(settings, "CHROMA_PERSIST_DIR", ".chroma"), ".corpus_version")
+
+def corpus_version() -> int:
+    """
+    Stamp that changes whenever chunks are added, re-labelled or deleted.
+    Kept on disk next to the index so every worker process sees it.
+    """
+    try:
+        return os.stat(_version_path()).st_mtime_ns
+    except OSError:
+        return 0
+
+# Per-namespace chunk counts, valid while the corpus version is unchanged
+_COUNTS: Dict[str, Tuple[int, int]] = {}
+
+def chunk_count(namespace: Optional[str] = None) -> int:
+    """
+    Chunks stored in a namespace. Only re-counted after the corpus version
+    changes, so the query path pays one stat() instead of a count().
+    """
+    namespace = normalize_namespace(namespace)
+    version = corpus_version()
+    cached = _COUNTS.get(namespace)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    col = namespace_collection(namespace, create=False)
+    count = col.count() if col is not None else 0
+    _COUNTS[namespace] = (version, count)
+    return count
+
+def _bump_corpus_version():
+    path = _version_path()
+    previous = corpus_version()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(str(time.time_ns()))
+        # Guarantee a new stamp even on filesystems with coarse mtimes
+        now = time.time_ns()
+        os.utime(path, ns=(now, max(now, previous + 1)))
+    except OSError as e:
+        logger.warning(f"Failed to bump corpus version: {e}")
+
+def chunk_hash(text: str) -> str:
+    """Stable content hash of a chunk, used in its id and metadata."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+def _existing_chunks(col, doc_id: str) -> Dict[str, Dict[str, Any]]:
+    """Map of chunk id -> metadata for everything currently stored for a document."""
+    res = col.get(where={"doc_id": doc_id}, include=["metadatas"])
+    return dict(zip(res.get("ids") or [], res.get("metadatas") or []))
+
+def _upsert_window(col, doc_id: str, chunks: List[str], metadoc: Dict[str, Any],
+                   seen: Dict[str, int], existing: Optional[Dict[str, Dict[str, Any]]] = None,
+                   relabel: Optional[Dict[str, Dict[str, Any]]] = None) -> int:
+    """
+    Embed and upsert one run of chunks. Chunks already in `seen` (repeated
+    text within the document) are skipped; with `existing`, chunks already
+    stored are never re-embedded and their new metadata is collected in
+    `relabel`, to be applied by _finish_update once the whole new version
+    is stored.
+
+    Returns:
+        Number of chunks that were embedded
+    """
+    ids: List[str] = []
+    docs: List[str] = []
+    metadata: List[Dict[str, Any]] = []
+
+    for chunk in chunks:
+        h = chunk_hash(chunk)
+        # Content-addressed so unchanged chunks keep their id across re-ingestion
+        cid = f"{doc_id}::chunk::{h}"
+        if cid in seen:
+            continue
+        meta = {**metadoc, "chunk_index": len(seen), "chunk_hash": h}
+        seen[cid] = meta["chunk_index"]
+        if existing is not None and cid in existing:
+            if existing[cid] != meta and relabel is not None:
+                relabel[cid] = meta
+            continue
+        ids.append(cid)
+        docs.append(chunk)
+        metadata.append(meta)
+
+    if not ids:
+        return 0
 
     from .embeddings import embed_texts
 
     try:
-        vectors = embed_texts(chunks)
+        vectors = embed_texts(docs)
     except Exception as e:
         logger.error(f"Failed to generate embeddings for doc {doc_id}: {e}")
         raise ValueError(f"Failed to generate embeddings: {str(e)}")
 
     # Validate embeddings match chunks
-    if len(vectors) != len(chunks):
+    if len(vectors) != len(docs):
         raise ValueError(
-            f"Embedding count mismatch: got {len(vectors)} embeddings for {len(chunks)} chunks"
+            f"Embedding count mismatch: got {len(vectors)} embeddings for {len(docs)} chunks"
         )
 
-    metadata = [{**metadoc, "chunk_index": i} for i in range(len(chunks))]
-
     try:
         col.upsert(
             ids=ids,
-            documents=chunks,
+            documents=docs,
             embeddings=vectors,
             metadatas=metadata
         )
-        logger.info(f"Successfully upserted {len(chunks)} chunks for doc {doc_id}")
     except Exception as e:
         logger.error(f"Failed to upsert chunks for doc {doc_id}: {e}")
         raise
 
-def delete_doc(doc_id: str):
+    lexical = get_lexical_index()
+    if lexical is not None:
+        try:
+            lexical.add(ids, docs, metadata)
+        except Exception as e:
+            logger.error(f"Failed to update lexical index for doc {doc_id}: {e}")
+
+    _bump_corpus_version()
+    metrics.inc("chunks_total", len(ids), op="embedded")
+    return len(ids)
+
+def _drop_stale(col, doc_id: str, existing: Dict[str, Dict[str, Any]], seen: Dict[str, int],
+                namespace: Optional[str] = None) -> int:
+    stale = [cid for cid in existing if cid not in seen]
+    if stale:
+        delete_chunks(stale, namespace)
+        metrics.inc("chunks_total", len(stale), op="removed")
+    return len(stale)
+
+def _finish_update(col, doc_id: str, existing: Dict[str, Dict[str, Any]], seen: Dict[str, int],
+                   relabel: Dict[str, Dict[str, Any]], namespace: Optional[str] = None,
+                   window: int = 256) -> int:
+    """
+    Switch an incremental update over once every new chunk is stored:
+    re-label the chunks kept from the previous version, then drop the ones
+    that disappeared.
+
+    Returns:
+        Number of stale chunks removed
+    """
+    ids = list(relabel)
+    for i in range(0, len(ids), window):
+        part = ids[i:i + window]
+        col.update(ids=part, metadatas=[relabel[cid] for cid in part])
+    if ids:
+        _bump_corpus_version()
+    return _drop_stale(col, doc_id, existing, seen, namespace)
+
+def _rollback_update(doc_id: str, existing: Dict[str, Dict[str, Any]], seen: Dict[str, int],
+                     namespace: Optional[str] = None):
+    """Delete the chunks a failed incremental update added, leaving the previous version as it was."""
+    added = [cid for cid in seen if cid not in existing]
+    if added:
+        logger.warning(f"Rolling back {len(added)} new chunks of doc {doc_id} after a failed update")
+        delete_chunks(added, namespace)
+
+@metrics.timed("upsert")
+def upsert_chunks(doc_id: str, chunks: List[str], metadoc: Dict[str, Any], incremental: bool = False,
+                  namespace: Optional[str] = None) -> int:
+    """
+    Insert or update document chunks in the vectorstore.
+
+    Args:
+        doc_id: Unique document identifier
+        chunks: List of text chunks
+        metadoc: Metadata dictionary to attach to all chunks
+        incremental: Diff against the chunks already stored for doc_id,
+            embedding only new ones and deleting stale ones; on failure
+            the previous version is left as it was
+        namespace: Namespace (collection) the document belongs to
+
+    Returns:
+        Number of distinct chunks now stored for the document
+
+    Raises:
+        ValueError: If chunks are empty or embeddings fail
+    """
+    if not chunks:
+        raise ValueError("Cannot upsert empty chunks list")
+
+    if not doc_id:
+        raise ValueError("doc_id cannot be empty")
+
+    col = namespace_collection(namespace)
+    existing = _existing_chunks(col, doc_id) if incremental else None
+    seen: Dict[str, int] = {}
+    relabel: Dict[str, Dict[str, Any]] = {}
+    try:
+        added = _upsert_window(col, doc_id, chunks, metadoc, seen, existing, relabel)
+        removed = _finish_update(col, doc_id, existing, seen, relabel, namespace) if existing else 0
+    except Exception:
+        if existing is not None:
+            _rollback_update(doc_id, existing, seen, namespace)
+        raise
+    logger.info(f"Successfully upserted chunks for doc {doc_id}: {len(seen)} total, {added} embedded, {removed} removed")
+    return len(seen)
+
+@metrics.timed("upsert_stream")
+def upsert_chunk_stream(doc_id: str, chunks: Iterable[str], metadoc: Dict[str, Any],
+                        window: Optional[int] = None,
+                        on_window: Optional[Callable[[int], None]] = None,
+                        incremental: bool = False,
+                        namespace: Optional[str] = None) -> int:
+    """
+    Embed and upsert chunks from an iterator in fixed-size windows, so only
+    one window of chunks and vectors is held in memory at a time.
+
+    Args:
+        doc_id: Unique document identifier
+        chunks: Iterable of text chunks
+        metadoc: Metadata dictionary to attach to all chunks
+        window: Chunks per embed/upsert round (defaults to INGEST_WINDOW)
+        on_window: Optional callback receiving the running chunk count
+        incremental: Diff against the chunks already stored for doc_id,
+            embedding only new ones and deleting stale ones; on failure
+            the previous version is left as it was
+        namespace: Namespace (collection) the document belongs to
+
+    Returns:
+        Number of distinct chunks now stored for the document
+
+    Raises:
+        ValueError: If doc_id is empty or embeddings fail
+    """
+    if not doc_id:
+        raise ValueError("doc_id cannot be empty")
+
+    window = window or int(getattr(settings, "INGEST_WINDOW", 256) or 256)
+    col = namespace_collection(namespace)
+    existing = _existing_chunks(col, doc_id) if incremental else None
+    seen: Dict[str, int] = {}
+    relabel: Dict[str, Dict[str, Any]] = {}
+    added = 0
+    batch: List[str] = []
+
+    # An update only adds new chunks while streaming; the previous version
+    # stays intact until _finish_update, and a failure removes what was added
+    try:
+        for chunk in chunks:
+            batch.append(chunk)
+            if len(batch) >= window:
+                added += _upsert_window(col, doc_id, batch, metadoc, seen, existing, relabel)
+                batch = []
+                if on_window:
+                    on_window(len(seen))
+
+        if batch:
+            added += _upsert_window(col, doc_id, batch, metadoc, seen, existing, relabel)
+            if on_window:
+                on_window(len(seen))
+
+        # Never wipe a document because its new version produced no chunks
+        removed = _finish_update(col, doc_id, existing, seen, relabel, namespace, window) if existing and seen else 0
+    except Exception:
+        if existing is not None:
+            _rollback_update(doc_id, existing, seen, namespace)
+        raise
+    logger.info(f"Successfully streamed chunks for doc {doc_id}: {len(seen)} total, {added} embedded, {removed} removed")
+    return len(seen)
+
+def delete_doc(doc_id: str, namespace: Optional[str] = None):
     """
     Delete all chunks for a document from the vectorstore.
 
     Args:
         doc_id: Document identifier to delete
+        namespace: Namespace (collection) the document belongs to
     """
     if not doc_id:
         logger.warning("Attempted to delete document with empty doc_id")
         return
 
-    col = get_collection()
+    col = namespace_collection(namespace)
     try:
         col.delete(where={"doc_id": doc_id})
+        lexical = get_lexical_index()
+        if lexical is not None:
+            lexical.delete_doc(doc_id)
+        _bump_corpus_version()
         logger.info(f"Deleted all chunks for doc {doc_id}")
     except Exception as e:
         logger.error(f"Failed to delete doc {doc_id}: {e}")
         # Don't raise - deletion failures shouldn't break the app
 
+def delete_chunks(ids: List[str], namespace: Optional[str] = None):
+    """
+    Delete specific chunks from the vectorstore.
+
+    Args:
+        ids: Chunk ids to delete
+        namespace: Namespace (collection) holding the chunks
+    """
+    if not ids:
+        return
+
+    col = namespace_collection(namespace)
+    try:
+        col.delete(ids=ids)
+        lexical = get_lexical_index()
+        if lexical is not None:
+            lexical.delete_ids(ids)
+        _bump_corpus_version()
+        logger.info(f"Deleted {len(ids)} chunks")
+    except Exception as e:
+        logger.error(f"Failed to delete {len(ids)} chunks: {e}")
+
 def stats() -> Dict[str, Any]:
-    """Get vectorstore statistics."""
-    col = get_collection()
+    """Get vectorstore statistics, in total and per namespace."""
     try:
-        count = col.count()
-        return {"count": count}
+        per_ns = {ns: namespace_collection(ns).count() for ns in namespaces()}
+        return {"count": sum(per_ns.values()), "namespaces": per_ns}
     except Exception as e:
         logger.error(f"Failed to get vectorstore stats: {e}")
-        return {"count": 0}
+        return {"count": 0, "namespaces": {}}
 
-def query(q: str, k: int = 5) -> Dict[str, Any]:
+def _hybrid_merge(col, lexical, q: str, qvec: List[float], dense: Dict[str, Any],
+                  k: int, n_candidates: int, namespace: str = "",
+                  doc_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Fuse dense and BM25 candidate lists with reciprocal rank fusion and
+    return the top k in Chroma's result shape, in fused order and marked
+    "fused". Lexical-only hits get their true cosine distance so downstream
+    thresholds still apply. Vectors are passed through when `dense`
+    carries "embeddings".
+    """
+    found: Dict[str, Tuple[str, Dict[str, Any], float, Any]] = {}
+    dense_ids = (dense.get("ids") or [[]])[0]
+    # Newer Chroma returns numpy arrays, so no truthiness tests
+    vecs = dense.get("embeddings")
+    dense_vecs = vecs[0] if vecs is not None and len(vecs) else None
+    for i, (cid, doc, meta, dist) in enumerate(zip(dense_ids, dense["documents"][0], dense["metadatas"][0],
+                                                   dense["distances"][0])):
+        found[cid] = (doc, meta, dist, dense_vecs[i] if dense_vecs is not None else None)
+
+    try:
+        lex_ids = [cid for cid, _ in lexical.search(q, k=n_candidates, namespace=namespace, doc_ids=doc_ids)]
+    except Exception as e:
+        logger.error(f"Lexical search failed: {e}")
+        lex_ids = []
+
+    rrf_k = int(getattr(settings, "HYBRID_RRF_K", 60) or 60)
+    fused = reciprocal_rank_fusion([dense_ids, lex_ids], k=rrf_k)
+
+    # Fetch text, metadata and vectors for lexical hits dense search missed
+    missing = [cid for cid in fused[:k * 2] if cid not in found]
+    if missing:
+        got = col.get(ids=missing, include=["documents", "metadatas", "embeddings"])
+        qv = np.asarray(qvec, dtype=np.float32)
+        qv = qv / (np.linalg.norm(qv) or 1.0)
+        for cid, doc, meta, emb in zip(got["ids"], got["documents"], got["metadatas"], got["embeddings"]):
+            ev = np.asarray(emb, dtype=np.float32)
+            dist = float(1.0 - np.dot(qv, ev) / (np.linalg.norm(ev) or 1.0))
+            found[cid] = (doc, meta, dist, ev)
+
+    # Lexical ids without a stored chunk (stale entries) are skipped
+    top = [cid for cid in fused if cid in found][:k]
+    out = {
+        "ids": [top],
+        "documents": [[found[cid][0] for cid in top]],
+        "metadatas": [[found[cid][1] for cid in top]],
+        "distances": [[found[cid][2] for cid in top]],
+        # The order is the ranking; distances are not sorted
+        "fused": True,
+    }
+    if dense_vecs is not None:
+        out["embeddings"] = [[found[cid][3] for cid in top]]
+    return out
+
+@metrics.timed("vector_query")
+def query(q: str, k: int = 5, embedding: Optional[List[float]] = None,
+          namespace: Optional[str] = None, doc_ids: Optional[List[str]] = None,
+          with_embeddings: bool = False) -> Dict[str, Any]:
     """
     Query the vectorstore for relevant chunks.
 
     Args:
         q: Query string
         k: Number of results to return
+        embedding: Precomputed query embedding (skips embedding `q` again)
+        namespace: Only search this namespace's collection (default namespace if None)
+        doc_ids: Only search chunks of these documents
+        with_embeddings: Also return the stored vector of each hit
 
     Returns:
-        Dictionary with documents, metadatas, and distances
+        Dictionary with documents, metadatas, and distances (and embeddings)
 
     Raises:
         ValueError: If query is empty or embedding fails
@@ -127,12 +579,14 @@ def query(q: str, k: int = 5) -> Dict[str, Any]:
     if not q or not q.strip():
         raise ValueError("Query cannot be empty")
 
-    col = get_collection()
+    namespace = normalize_namespace(namespace)
+    # Questions never create collections; only uploads do
+    col = namespace_collection(namespace, create=False)
+    where = _where_docs(doc_ids)
 
     # Check if collection is empty
     try:
-        count = col.count()
-        if count == 0:
+        if col is None or chunk_count(namespace) == 0:
             logger.warning("Vectorstore is empty, no documents to query")
             return {
                 "documents": [[]],
@@ -142,20 +596,30 @@ def query(q: str, k: int = 5) -> Dict[str, Any]:
     except Exception as e:
         logger.error(f"Failed to check collection count: {e}")
 
-    from .embeddings import embed_texts
+    if embedding is not None:
+        qvec = embedding
+    else:
+        from .embeddings import embed_texts
 
-    try:
-        qvec = embed_texts([q])[0]
-    except Exception as e:
-        logger.error(f"Failed to generate query embedding: {e}")
-        raise ValueError(f"Failed to generate query embedding: {str(e)}")
+        try:
+            qvec = embed_texts([q])[0]
+        except Exception as e:
+            logger.error(f"Failed to generate query embedding: {e}")
+            raise ValueError(f"Failed to generate query embedding: {str(e)}")
+
+    lexical = get_lexical_index()
+    n_dense = max(k * 3, 20) if lexical is not None else k
+    include = ["documents", "metadatas", "distances"] + (["embeddings"] if with_embeddings else [])
 
     try:
         results = col.query(
             query_embeddings=[qvec],
-            n_results=k,
-            include=["documents", "metadatas", "distances"]
+            n_results=n_dense,
+            where=where,
+            include=include
         )
+        if lexical is not None:
+            return _hybrid_merge(col, lexical, q, qvec, results, k, n_dense, namespace, doc_ids)
         return results
     except Exception as e:
         logger.error(f"Failed to query vectorstore: {e}")
@@ -165,3 +629,82 @@ def query(q: str, k: int = 5) -> Dict[str, Any]:
             "metadatas": [[]],
             "distances": [[]]
         }
+
+@metrics.timed("vector_query_batch")
+def query_many(qs: List[str], k: int = 5, embeddings: Optional[List[List[float]]] = None,
+               namespace: Optional[str] = None, doc_ids: Optional[List[str]] = None,
+               batch_size: Optional[int] = None, with_embeddings: bool = False) -> List[Dict[str, Any]]:
+    """
+    Query the vectorstore for many questions at once: one embedding call
+    and one multi-vector search per `batch_size` questions.
+
+    Args:
+        qs: Query strings (must be non-empty)
+        k: Number of results per question
+        embeddings: Precomputed query embeddings, aligned with `qs`
+        namespace: Only search this namespace's collection (default namespace if None)
+        doc_ids: Only search chunks of these documents
+        batch_size: Query vectors per search call (defaults to ASK_BATCH_QUERY_SIZE)
+        with_embeddings: Also return the stored vector of each hit
+
+    Returns:
+        One result per question, in input order, each shaped like query()'s
+
+    Raises:
+        ValueError: If a query is empty or embedding fails
+    """
+    if any(not q or not q.strip() for q in qs):
+        raise ValueError("Query cannot be empty")
+    if not qs:
+        return []
+
+    def empty() -> Dict[str, Any]:
+        return {"ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]]}
+
+    namespace = normalize_namespace(namespace)
+    col = namespace_collection(namespace, create=False)
+    where = _where_docs(doc_ids)
+
+    try:
+        if col is None or chunk_count(namespace) == 0:
+            logger.warning("Vectorstore is empty, no documents to query")
+            return [empty() for _ in qs]
+    except Exception as e:
+        logger.error(f"Failed to check collection count: {e}")
+
+    if embeddings is None:
+        from .embeddings import embed_texts
+
+        try:
+            embeddings = embed_texts(qs)
+        except Exception as e:
+            logger.error(f"Failed to generate query embeddings: {e}")
+            raise ValueError(f"Failed to generate query embeddings: {str(e)}")
+
+    lexical = get_lexical_index()
+    n_dense = max(k * 3, 20) if lexical is not None else k
+    batch_size = batch_size or int(getattr(settings, "ASK_BATCH_QUERY_SIZE", 64) or 64)
+    include = ["documents", "metadatas", "distances"] + (["embeddings"] if with_embeddings else [])
+    keys = ("ids", "documents", "metadatas", "distances") + (("embeddings",) if with_embeddings else ())
+
+    out: List[Dict[str, Any]] = []
+    for start in range(0, len(qs), batch_size):
+        vecs = list(embeddings[start:start + batch_size])
+        try:
+            res = col.query(
+                query_embeddings=vecs,
+                n_results=n_dense,
+                where=where,
+                include=include
+            )
+        except Exception as e:
+            logger.error(f"Failed to query vectorstore for {len(vecs)} questions: {e}")
+            out.extend(empty() for _ in vecs)
+            continue
+
+        for j, qvec in enumerate(vecs):
+            single = {key: [res[key][j]] for key in keys if res.get(key) is not None}
+            if lexical is not None:
+                single = _hybrid_merge(col, lexical, qs[start + j], qvec, single, k, n_dense, namespace, doc_ids)
+            out.append(single)
+    return out
@@ -1,12 +1,19 @@
 from django.shortcuts import render, redirect
-from django.http import JsonResponse, HttpRequest
-from django.views.decorators.http import require_POST
+import json
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import HttpResponse, JsonResponse, HttpRequest, StreamingHttpResponse
+from django.views.decorators.http import require_GET, require_POST
 from .forms import DocumentUploadForm
-from .models import Document, ChatLog, VectorStat
-from .utils.file_io import extract_text
-from .utils.text_splitter import chunk_text
-from .utils.vectorstore import upsert_chunks, delete_doc, stats
-from .utils.rag_pipeline import ask as rag_ask
+from .models import Document, IngestionJob
+from .chatlog import log_chat
+from .ingest import content_hash
+from .jobs import ACTIVE_STATUSES, recover_stale_jobs, submit_ingestion
+from .corpus_stats import corpus_stats, record_removed
+from .utils.vectorstore import delete_doc, normalize_namespace
+from .utils import metrics
+from .utils.rag_pipeline import ask as rag_ask, ask_stream as rag_ask_stream, ask_batch as rag_ask_batch
 
 def home(request: HttpRequest):
     return redirect("chat")
@@ -15,9 +22,14 @@ def chat(request: HttpRequest):
     return render(request, "chat.html")
 
 def admin_dashboard(request: HttpRequest):
-    vstats = stats()
-    docs = Document.objects.order_by("-uploaded_at")
-    return render(request, "admin_dashboard.html", {"docs": docs, "vstats": vstats})
+    vstats = corpus_stats()
+    docs = Document.objects.only("id", "name", "file_type", "namespace", "num_chunks", "size_bytes", "embedded")
+    namespace = request.GET.get("ns")
+    if namespace is not None:
+        docs = docs.filter(namespace=namespace)
+    per_page = int(getattr(settings, "DASHBOARD_PAGE_SIZE", 50) or 50)
+    page = Paginator(docs.order_by("-uploaded_at", "-id"), per_page).get_page(request.GET.get("page"))
+    return render(request, "admin_dashboard.html", {"page": page, "vstats": vstats, "namespace": namespace})
 from django.views.decorators.csrf import csrf_exempt
 
 @csrf_exempt
@@ -27,47 +39,94 @@ def upload(request: HttpRequest):
     if not form.is_valid():
         return JsonResponse({"ok": False, "error": form.errors.as_json()}, status=400)
 
+    try:
+        doc_id = int(request.POST["doc_id"]) if (request.POST.get("doc_id") or "").strip() else None
+    except ValueError:
+        return JsonResponse({"ok": False, "error": "doc_id must be an integer"}, status=400)
+
+    # A stale id must not turn an update into a new, duplicate document
+    if doc_id is not None and not Document.objects.filter(id=doc_id).exists():
+        return JsonResponse({"ok": False, "error": "Document not found"}, status=404)
+
     f = form.cleaned_data["file"]
-    doc = Document.objects.create(name=f.name, file=f, file_type="txt")
-    path = doc.file.path
+    namespace = form.cleaned_data.get("namespace", "")
+    sha = content_hash(f)
+    # A job orphaned by a restart must not be handed back as "already working on it"
+    recover_stale_jobs()
 
+    # Byte-identical upload: reuse the indexed document or the job already working on it
+    same = Document.objects.filter(content_hash=sha, namespace=namespace).order_by("-uploaded_at").first()
+    if same is not None:
+        pending = same.jobs.filter(status__in=ACTIVE_STATUSES).first()
+        if pending is not None:
+            return JsonResponse({"ok": True, "doc_id": same.id, "job_id": pending.id, "status": pending.status}, status=202)
+        if same.embedded:
+            return JsonResponse({"ok": True, "doc_id": same.id, "chunks": same.num_chunks, "duplicate": True})
+
+    # New version of an existing document (explicit doc_id or same name): re-ingest incrementally.
+    # The new file is staged on the job; the document keeps its current file until that succeeds.
+    target = _update_target(doc_id, f.name, namespace)
+    if target is not None:
+        try:
+            with transaction.atomic():
+                target = Document.objects.select_for_update().get(id=target.id)
+                pending = target.jobs.filter(status__in=ACTIVE_STATUSES).order_by("-id").first()
+                if pending is not None and pending.content_hash == sha:
+                    return JsonResponse({"ok": True, "doc_id": target.id, "job_id": pending.id,
+                                         "status": pending.status}, status=202)
+                if pending is not None:
+                    return JsonResponse({"ok": False, "doc_id": target.id, "job_id": pending.id,
+                                         "error": "A previous update of this document is still being indexed"},
+                                        status=409)
+                job = submit_ingestion(target, incremental=True, upload=f, content_hash=sha)
+        except Exception as e:
+            return JsonResponse({"ok": False, "error": str(e)}, status=500)
+        return JsonResponse({"ok": True, "doc_id": target.id, "job_id": job.id, "status": job.status}, status=202)
+
+    doc = Document.objects.create(name=f.name, file=f, file_type="txt", content_hash=sha, namespace=namespace)
     try:
-        text, ftype = extract_text(path)
-        doc.file_type = ftype
-
-        # Validate extracted text is not empty
-        if not text or len(text.strip()) < 10:
-            raise ValueError(f"Document '{doc.name}' contains no readable text or is too short (extracted {len(text)} chars)")
-
-        chunks = chunk_text(text)
-
-        # Validate chunks were created
-        if not chunks:
-            raise ValueError(f"Failed to create chunks from document '{doc.name}'. Text length: {len(text)}")
-
-        meta = {"doc_id": str(doc.id), "doc_name": doc.name}
-        upsert_chunks(doc_id=meta["doc_id"], chunks=chunks, metadoc=meta)
-        doc.num_chunks = len(chunks)
-        doc.embedded = True
-        doc.save()
-        vs = stats()
-        VectorStat.objects.update_or_create(key="docchat", defaults={"value": vs.get("count", 0)})
-        return JsonResponse({"ok": True, "doc_id": doc.id, "chunks": doc.num_chunks})
+        job = submit_ingestion(doc)
     except Exception as e:
         doc.delete()
         return JsonResponse({"ok": False, "error": str(e)}, status=500)
+    return JsonResponse({"ok": True, "doc_id": doc.id, "job_id": job.id, "status": job.status}, status=202)
+
+def _update_target(doc_id, name: str, namespace: str):
+    # An explicit doc_id keeps that document's namespace
+    if doc_id is not None:
+        return Document.objects.filter(id=doc_id).first()
+    return Document.objects.filter(name=name, namespace=namespace, embedded=True).order_by("-uploaded_at").first()
+
+def _scope(request: HttpRequest):
+    """(namespace, doc_ids) a question is restricted to, from the POST body."""
+    namespace = normalize_namespace(request.POST.get("namespace"))
+    # Repeated fields, comma-separated values, or both
+    doc_ids = [p.strip() for d in request.POST.getlist("doc_ids") for p in d.split(",") if p.strip()]
+    return namespace, doc_ids or None
+
+@require_GET
+def job_status(request: HttpRequest, job_id: int):
+    recover_stale_jobs()
+    try:
+        job = IngestionJob.objects.get(id=job_id)
+    except IngestionJob.DoesNotExist:
+        return JsonResponse({"ok": False, "error": "Job not found"}, status=404)
+    return JsonResponse({"ok": True, "job": job.as_dict()})
 
 @require_POST
 def remove_document(request: HttpRequest):
     doc_id = request.POST.get("doc_id")
     try:
-        doc = Document.objects.get(id=doc_id)
-    except Document.DoesNotExist:
+        # Delete the row before its chunks: a running ingestion job re-checks
+        # the row under this lock and cleans up whatever it wrote since
+        with transaction.atomic():
+            doc = Document.objects.select_for_update().get(id=doc_id)
+            pk = doc.id
+            doc.delete()
+            record_removed(doc)
+    except (Document.DoesNotExist, ValueError):
         return JsonResponse({"ok": False, "error": "Document not found"}, status=404)
-    delete_doc(str(doc.id))
-    doc.delete()
-    vs = stats()
-    VectorStat.objects.update_or_create(key="docchat", defaults={"value": vs.get("count", 0)})
+    delete_doc(str(pk), doc.namespace)
     return JsonResponse({"ok": True})
 
 @csrf_exempt
@@ -77,9 +136,111 @@ def ask(request: HttpRequest):
     if not q:
         return JsonResponse({"ok": False, "answer": "Please type a question."}, status=400)
     try:
-        # Use k=8 for better context coverage and expert-level responses
-        out = rag_ask(q, k=8)
-        ChatLog.objects.create(question=q, answer=out["answer"], sources=out["sources"])
+        namespace, doc_ids = _scope(request)
+    except ValueError as e:
+        return JsonResponse({"ok": False, "answer": str(e)}, status=400)
+    try:
+        metrics.inc("questions_total", endpoint="ask")
+        with metrics.trace() as t:
+            # Hybrid BM25 + vector retrieval recalls well enough for a smaller k
+            out = rag_ask(q, k=6, namespace=namespace, doc_ids=doc_ids)
+        log_chat(q, out["answer"], out["sources"], t.stages)
         return JsonResponse({"ok": True, "answer": out["answer"], "sources": out["sources"]})
     except Exception as e:
         return JsonResponse({"ok": False, "answer": f"Error: {e}"}, status=500)
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@csrf_exempt
+@require_POST
+def ask_stream(request: HttpRequest):
+    """Server-sent events: sources first, then answer tokens as Gemini produces them."""
+    q = (request.POST.get("question") or "").strip()
+    if not q:
+        return JsonResponse({"ok": False, "answer": "Please type a question."}, status=400)
+    try:
+        namespace, doc_ids = _scope(request)
+    except ValueError as e:
+        return JsonResponse({"ok": False, "answer": str(e)}, status=400)
+
+    metrics.inc("questions_total", endpoint="ask_stream")
+
+    def events():
+        try:
+            with metrics.trace() as t:
+                for event, data in rag_ask_stream(q, k=6, namespace=namespace, doc_ids=doc_ids):
+                    if event == "done":
+                        log_chat(q, data["answer"], data["sources"], t.stages)
+                    yield _sse(event, data)
+        except Exception as e:
+            yield _sse("error", f"Error: {e}")
+            yield _sse("done", {"answer": f"Error: {e}", "sources": []})
+
+    resp = StreamingHttpResponse(events(), content_type="text/event-stream")
+    resp["Cache-Control"] = "no-cache"
+    resp["X-Accel-Buffering"] = "no"  # keep nginx from buffering the stream
+    return resp
+
+@csrf_exempt
+@require_POST
+def ask_batch(request: HttpRequest):
+    """
+    JSON body {"questions": [...], "k"?, "namespace"?, "doc_ids"?}; answers
+    stream back as JSON lines in input order. Each question costs a
+    generation, so the endpoint needs the ASK_BATCH_TOKEN bearer token and
+    is disabled while that is unset.
+    """
+    token = getattr(settings, "ASK_BATCH_TOKEN", "")
+    if not token:
+        return JsonResponse({"ok": False, "error": "Batch answering is disabled"}, status=403)
+    if request.headers.get("Authorization", "") != f"Bearer {token}":
+        return JsonResponse({"ok": False, "error": "Unauthorized"}, status=401)
+    try:
+        body = json.loads(request.body or b"{}")
+        questions = body.get("questions")
+        if not isinstance(questions, list) or not all(isinstance(q, str) for q in questions):
+            raise ValueError("'questions' must be a list of strings")
+        limit = int(getattr(settings, "ASK_BATCH_MAX_QUESTIONS", 100))
+        if len(questions) > limit:
+            raise ValueError(f"At most {limit} questions per batch")
+        k = int(body.get("k", 6))
+        max_k = int(getattr(settings, "ASK_BATCH_MAX_K", 50))
+        if not 1 <= k <= max_k:
+            raise ValueError(f"'k' must be between 1 and {max_k}")
+        namespace = normalize_namespace(body.get("namespace"))
+        doc_ids = body.get("doc_ids")
+        if doc_ids is not None and (not isinstance(doc_ids, list) or not all(
+                isinstance(d, (int, str)) and not isinstance(d, bool) for d in doc_ids)):
+            raise ValueError("'doc_ids' must be a list of document ids")
+        doc_ids = [str(d).strip() for d in doc_ids or [] if str(d).strip()] or None
+    except (ValueError, TypeError, AttributeError) as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=400)
+
+    metrics.inc("questions_total", len(questions), endpoint="ask_batch")
+
+    def lines():
+        for row in rag_ask_batch(questions, k=k, namespace=namespace, doc_ids=doc_ids):
+            yield json.dumps(row) + "\n"
+
+    resp = StreamingHttpResponse(lines(), content_type="application/x-ndjson")
+    resp["X-Accel-Buffering"] = "no"
+    return resp
+
+@require_GET
+def metrics_view(request: HttpRequest):
+    """Prometheus scrape endpoint for this worker's counters and stage histograms."""
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if token and request.headers.get("Authorization", "") != f"Bearer {token}":
+        return HttpResponse("Unauthorized", status=401)
+    return HttpResponse(metrics.render_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+@require_GET
+def startup_view(request: HttpRequest):
+    """This worker's startup report: time to ready and per-stage warm-up timings."""
+    from .warmup import startup_report
+
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if token and request.headers.get("Authorization", "") != f"Bearer {token}":
+        return JsonResponse({"ok": False, "error": "Unauthorized"}, status=401)
+    return JsonResponse({"ok": True, **startup_report()})
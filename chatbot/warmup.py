@@ -0,0 +1,225 @@
+import gc
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Tuple
+from django.conf import settings
+from .utils import metrics
+
+logger = logging.getLogger(__name__)
+
+def _process_started() -> float:
+    """Wall-clock start of this process (Linux /proc), else the time of this import."""
+    try:
+        with open("/proc/self/stat", "r") as f:
+            # Field 22 (starttime, in clock ticks since boot); the command name may contain spaces
+            ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime", "r") as f:
+            uptime = float(f.read().split()[0])
+        return time.time() - uptime + ticks / os.sysconf("SC_CLK_TCK")
+    except Exception:
+        return time.time()
+
+_PROCESS_STARTED = _process_started()
+_PRELOAD_PID = 0
+_LOCK = threading.Lock()
+_REPORT: Dict[str, Any] = {
+    "pid": os.getpid(),
+    "mode": "off",
+    "preloaded": [],
+    "ready_ms": None,
+    "state": "pending",
+    "stages": {},
+    "total_ms": None,
+}
+
+def _mode() -> str:
+    val = (getattr(settings, "WARMUP_MODE", "background") or "background").lower()
+    return val if val in ("off", "background", "blocking") else "background"
+
+_SERVERS = ("gunicorn", "uvicorn")
+
+def _serving() -> bool:
+    """
+    True only in processes that will answer requests: a gunicorn or
+    uvicorn process, the runserver child (not its autoreload parent), or
+    any process started with WARMUP=1. Scripts, shells, tests, other
+    management commands and background workers stay lazy.
+    """
+    forced = str(getattr(settings, "WARMUP", "") or "").strip().lower()
+    if forced:
+        return forced in ("1", "true", "yes", "on")
+    argv = sys.argv
+    if not argv:
+        return False
+    # "gunicorn ..." or "python -m gunicorn ..." (argv[0] is then the package's __main__.py)
+    if any(server in argv[0] for server in _SERVERS):
+        return True
+    if not os.path.basename(argv[0]).startswith("manage"):
+        return False
+    if len(argv) < 2 or argv[1] != "runserver":
+        return False
+    return "--noreload" in argv or os.environ.get("RUN_MAIN") == "true"
+
+def _forks_workers() -> bool:
+    """
+    True in a server parent that loads the app once and then forks its
+    workers (gunicorn --preload, or PRELOAD_APP / PRELOAD_MODELS set for
+    a preload_app config file). Nothing that holds handles, threads or
+    locks may start there.
+    """
+    if getattr(settings, "PRELOAD_APP", False) or getattr(settings, "PRELOAD_MODELS", False):
+        return True
+    # "gunicorn ..." or "python -m gunicorn ..."
+    if not sys.argv or "gunicorn" not in sys.argv[0]:
+        return False
+    args = sys.argv[1:] + os.environ.get("GUNICORN_CMD_ARGS", "").split()
+    return "--preload" in args
+
+# ---- Stages ----
+# Read-only models are safe to load before fork; their weights are then
+# shared copy-on-write. Clients holding sockets, threads or SQLite handles
+# must be created in each worker.
+
+def _load_sbert():
+    from .utils.embeddings import _get_sbert_model, get_backend
+
+    if get_backend() == "sbert" or getattr(settings, "SBERT_PRELOAD", False):
+        _get_sbert_model()
+
+def _load_reranker():
+    from .utils import reranker
+
+    if reranker.enabled():
+        reranker.load_model()
+
+def _open_vectorstore():
+    from .utils.vectorstore import get_collection
+
+    # Open the collection if it exists; ingestion creates it
+    get_collection(create=False)
+
+def _open_lexical_index():
+    from .utils.lexical_index import get_lexical_index
+
+    get_lexical_index()
+
+def _open_embed_cache():
+    from .utils.embed_cache import get_cache
+
+    get_cache()
+
+def _open_genai_client():
+    from .utils.embeddings import _get_genai_client
+
+    if getattr(settings, "GOOGLE_API_KEY", ""):
+        _get_genai_client()
+
+_MODEL_STAGES: List[Tuple[str, Callable[[], None]]] = [
+    ("sbert", _load_sbert),
+    ("reranker", _load_reranker),
+]
+_CLIENT_STAGES: List[Tuple[str, Callable[[], None]]] = [
+    ("vectorstore", _open_vectorstore),
+    ("lexical_index", _open_lexical_index),
+    ("embed_cache", _open_embed_cache),
+    ("genai_client", _open_genai_client),
+]
+
+def _run(name: str, fn: Callable[[], None]):
+    """Run one stage; failures are logged and reported, never raised."""
+    started = time.perf_counter()
+    error = ""
+    try:
+        fn()
+    except Exception as e:
+        error = str(e)
+        logger.warning(f"Warm-up stage '{name}' failed: {e}")
+    secs = time.perf_counter() - started
+    metrics.observe("warmup_seconds", secs, stage=name)
+    with _LOCK:
+        _REPORT["stages"][name] = {"ms": round(secs * 1000, 1), "ok": not error, **({"error": error} if error else {})}
+
+def _run_stages(stages: List[Tuple[str, Callable[[], None]]]):
+    started = time.perf_counter()
+    with _LOCK:
+        _REPORT["state"] = "running"
+    for name, fn in stages:
+        with _LOCK:
+            done = name in _REPORT["stages"]
+        if not done:
+            _run(name, fn)
+    with _LOCK:
+        _REPORT["state"] = "done"
+        _REPORT["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        summary = ", ".join(f"{k}={v['ms']:.0f}ms" for k, v in _REPORT["stages"].items())
+    logger.info(f"Warm-up finished in pid {os.getpid()}: {summary}")
+
+def _start(blocking: bool):
+    stages = _MODEL_STAGES + _CLIENT_STAGES
+    if blocking:
+        _run_stages(stages)
+    else:
+        threading.Thread(target=_run_stages, args=(stages,), name="warmup", daemon=True).start()
+
+def _after_fork():
+    global _PROCESS_STARTED, _LOCK
+    # Only direct children of the preloading process are workers
+    if os.getppid() != _PRELOAD_PID:
+        return
+    _PROCESS_STARTED = time.time()
+    _LOCK = threading.Lock()
+    # Inherited from the preloading parent: keep its model timings, reset the rest
+    with _LOCK:
+        _REPORT["pid"] = os.getpid()
+        _REPORT["state"] = "pending"
+        _REPORT["total_ms"] = None
+        _REPORT["stages"] = {k: v for k, v in _REPORT["stages"].items() if k in _REPORT["preloaded"]}
+    _start(blocking=_REPORT["mode"] == "blocking")
+
+def preload(models: bool = True):
+    """
+    Prepare a parent process that is about to fork its workers. With
+    `models`, load the read-only models here and freeze the heap, so
+    workers share the pages instead of each loading a copy. Every
+    remaining stage runs in each worker right after fork.
+
+    No inference and no threads start here: torch thread pools or locks
+    held by a warm-up thread at fork time can deadlock the children.
+    """
+    global _PRELOAD_PID
+    if models:
+        for name, fn in _MODEL_STAGES:
+            _run(name, fn)
+        with _LOCK:
+            _REPORT["preloaded"] = [name for name, _ in _MODEL_STAGES]
+        # Keep the collector from touching (and so copying) preloaded objects
+        gc.freeze()
+    with _LOCK:
+        _REPORT["state"] = "deferred"
+    _PRELOAD_PID = os.getpid()
+    os.register_at_fork(after_in_child=_after_fork)
+
+def on_ready():
+    """Entry point from ChatbotConfig.ready()."""
+    with _LOCK:
+        _REPORT["ready_ms"] = round((time.time() - _PROCESS_STARTED) * 1000, 1)
+        _REPORT["mode"] = _mode()
+    if _REPORT["mode"] == "off" or not _serving():
+        with _LOCK:
+            _REPORT["state"] = "skipped"
+        return
+    if _forks_workers():
+        preload(models=getattr(settings, "PRELOAD_MODELS", False))
+        return
+    _start(blocking=_REPORT["mode"] == "blocking")
+
+def startup_report() -> Dict[str, Any]:
+    """Startup timings for this process: time to AppConfig.ready and each warm-up stage."""
+    with _LOCK:
+        report = dict(_REPORT)
+        report["stages"] = dict(_REPORT["stages"])
+    report["uptime_s"] = round(time.time() - _PROCESS_STARTED, 1)
+    return report
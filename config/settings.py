@@ -1,4 +1,5 @@
 from pathlib import Path
+import json
 import os
 from dotenv import load_dotenv
 
@@ -50,13 +51,115 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 
 # App settings
 CHROMA_PERSIST_DIR = os.getenv("CHROMA_PERSIST_DIR", str(BASE_DIR / ".chroma"))
-EMBED_BACKEND = os.getenv("EMBED_BACKEND", "google")
+# HNSW index parameters (Chroma defaults); per-collection overrides as JSON,
+# e.g. HNSW_COLLECTION_PARAMS='{"docchat": {"M": 32, "ef_search": 64}}'
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "100"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "10"))
+HNSW_COLLECTION_PARAMS = json.loads(os.getenv("HNSW_COLLECTION_PARAMS", "{}"))
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")  # "chroma" or "numpy"
+NUMPY_INDEX_DTYPE = os.getenv("NUMPY_INDEX_DTYPE", "float32")  # or "float16"
+NUMPY_INDEX_COMPACT_RATIO = float(os.getenv("NUMPY_INDEX_COMPACT_RATIO", "0.25"))
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "google")  # "google", "sbert" or "hash" (offline, deterministic)
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY", "")
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "100"))
+EMBED_MAX_CONCURRENCY = int(os.getenv("EMBED_MAX_CONCURRENCY", "4"))
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "5"))
+# SBERT (local model and Google fallback): encode batch size, multi-process pool
+# for large ingestion jobs (0 or 1 = single process), cross-thread coalescing
+# window for query-sized calls (0 disables) and "fp32" or "int8" CPU inference
+SBERT_BATCH_SIZE = int(os.getenv("SBERT_BATCH_SIZE", "64"))
+SBERT_PROCESSES = int(os.getenv("SBERT_PROCESSES", "0"))
+SBERT_POOL_MIN_TEXTS = int(os.getenv("SBERT_POOL_MIN_TEXTS", "2000"))
+SBERT_COALESCE_MS = float(os.getenv("SBERT_COALESCE_MS", "5"))
+SBERT_COALESCE_MAX_TEXTS = int(os.getenv("SBERT_COALESCE_MAX_TEXTS", "8"))
+SBERT_PRECISION = os.getenv("SBERT_PRECISION", "fp32")
+EMBED_CACHE_ENABLED = os.getenv("EMBED_CACHE_ENABLED", "true").lower() == "true"
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", str(BASE_DIR / ".embed_cache" / "embeddings.sqlite3"))
+EMBED_CACHE_MAX_ENTRIES = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "200000"))
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "true").lower() == "true"
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+RERANK_TOP_N = int(os.getenv("RERANK_TOP_N", "4"))
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "250"))
+RERANK_RETRY_AFTER = float(os.getenv("RERANK_RETRY_AFTER", "300"))  # seconds before retrying a failed model load
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_MAX_DISTANCE = float(os.getenv("ANSWER_CACHE_MAX_DISTANCE", "0.05"))
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")  # bearer token required by /metrics when set
+ASK_BATCH_CONCURRENCY = int(os.getenv("ASK_BATCH_CONCURRENCY", "4"))  # parallel LLM calls per batch
+ASK_BATCH_QUERY_SIZE = int(os.getenv("ASK_BATCH_QUERY_SIZE", "64"))  # query vectors per search call
+ASK_BATCH_MAX_QUESTIONS = int(os.getenv("ASK_BATCH_MAX_QUESTIONS", "100"))  # per HTTP request
+ASK_BATCH_TOKEN = os.getenv("ASK_BATCH_TOKEN", "")  # bearer token for /api/ask/batch/; unset disables it
+ASK_BATCH_MAX_K = int(os.getenv("ASK_BATCH_MAX_K", "50"))  # largest "k" a batch request may ask for
+# "tokens": structure-aware chunks sized in approximate tokens; "chars": legacy character windows
+CHUNKER = os.getenv("CHUNKER", "tokens")
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "256"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "32"))
+CHUNK_MIN_TOKENS = int(os.getenv("CHUNK_MIN_TOKENS", "12"))
+# Startup: "background" warms models and clients after AppConfig.ready, "blocking"
+# finishes first, "off" keeps everything lazy. A parent that forks workers after
+# loading the app (gunicorn --preload, or PRELOAD_APP=true for preload_app in a
+# config file) defers warm-up to each worker; PRELOAD_MODELS also loads read-only
+# models in that parent so workers share them copy-on-write.
+WARMUP_MODE = os.getenv("WARMUP_MODE", "background")
+# Only gunicorn, uvicorn and runserver warm up; WARMUP=1 forces it (another server), WARMUP=0 disables it
+WARMUP = os.getenv("WARMUP", "")
+PRELOAD_APP = os.getenv("PRELOAD_APP", "false").lower() == "true"
+PRELOAD_MODELS = os.getenv("PRELOAD_MODELS", "false").lower() == "true"
+SBERT_PRELOAD = os.getenv("SBERT_PRELOAD", "false").lower() == "true"  # also load SBERT when it is only the fallback
+# Retrieval post-processing: over-fetch MMR_CANDIDATES, cut at the first distance jump of
+# MMR_DISTANCE_GAP (after MMR_MIN_K hits), then pick diverse chunks by maximal marginal relevance
+MMR_ENABLED = os.getenv("MMR_ENABLED", "true").lower() == "true"
+MMR_CANDIDATES = int(os.getenv("MMR_CANDIDATES", "20"))
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))  # 1.0 = relevance only
+MMR_DUPLICATE_SIM = float(os.getenv("MMR_DUPLICATE_SIM", "0.95"))
+MMR_DISTANCE_GAP = float(os.getenv("MMR_DISTANCE_GAP", "0.1"))  # 0 disables the adaptive cut
+MMR_MIN_K = int(os.getenv("MMR_MIN_K", "2"))
+# Merge overlapping neighbour chunks into excerpts and pack them into a prompt token budget
+CONTEXT_PACKING = os.getenv("CONTEXT_PACKING", "true").lower() == "true"
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))  # approximate tokens; 0 = unlimited
+CORPUS_STATS_TTL = float(os.getenv("CORPUS_STATS_TTL", "5"))  # seconds a worker reuses the corpus counters
+DASHBOARD_PAGE_SIZE = int(os.getenv("DASHBOARD_PAGE_SIZE", "50"))
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+INGEST_STREAMING = os.getenv("INGEST_STREAMING", "true").lower() == "true"
+INGEST_WINDOW = int(os.getenv("INGEST_WINDOW", "256"))
+# Workers touch their active jobs every INGEST_HEARTBEAT seconds; jobs silent for
+# INGEST_STALE_AFTER seconds are re-queued, up to INGEST_MAX_ATTEMPTS starts in total
+INGEST_HEARTBEAT = float(os.getenv("INGEST_HEARTBEAT", "15"))
+INGEST_STALE_AFTER = float(os.getenv("INGEST_STALE_AFTER", "120"))
+INGEST_MAX_ATTEMPTS = int(os.getenv("INGEST_MAX_ATTEMPTS", "2"))
+OCR_PDF_FALLBACK = os.getenv("OCR_PDF_FALLBACK", "true").lower() == "true"
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "0"))  # 0 = cores / WEB_CONCURRENCY, at most 4
+OCR_DPI = int(os.getenv("OCR_DPI", "300"))
+OCR_PAGE_TIMEOUT = int(os.getenv("OCR_PAGE_TIMEOUT", "120"))
+OCR_MAX_SIDE = int(os.getenv("OCR_MAX_SIDE", "4000"))
+OCR_MIN_PAGE_CHARS = int(os.getenv("OCR_MIN_PAGE_CHARS", "20"))
 MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "25"))
+# ChatLog rows are queued and bulk-written by a background thread (CHATLOG_ASYNC=false writes inline)
+CHATLOG_ASYNC = os.getenv("CHATLOG_ASYNC", "true").lower() == "true"
+CHATLOG_BATCH_SIZE = int(os.getenv("CHATLOG_BATCH_SIZE", "100"))
+CHATLOG_FLUSH_INTERVAL = float(os.getenv("CHATLOG_FLUSH_INTERVAL", "1.0"))  # seconds
+CHATLOG_MAX_QUEUE = int(os.getenv("CHATLOG_MAX_QUEUE", "10000"))
+CHATLOG_PUT_TIMEOUT = float(os.getenv("CHATLOG_PUT_TIMEOUT", "0.5"))  # max wait on a full queue before dropping
+CHATLOG_RETENTION_DAYS = int(os.getenv("CHATLOG_RETENTION_DAYS", "90"))
 WA_ACCESS_TOKEN = os.getenv("WA_ACCESS_TOKEN", "")
 WA_PHONE_NUMBER_ID = os.getenv("WA_PHONE_NUMBER_ID", "")
 WA_VERIFY_TOKEN = os.getenv("WA_VERIFY_TOKEN", "")
 WA_API_VERSION = os.getenv("WA_API_VERSION", "v19.0")
+WA_WORKERS = int(os.getenv("WA_WORKERS", "4"))
+WA_MAX_PENDING = int(os.getenv("WA_MAX_PENDING", "100"))
+# Seconds a message id stays in whatsappbot.SeenMessage; redeliveries inside it are dropped
+WA_DEDUPE_TTL = int(os.getenv("WA_DEDUPE_TTL", "86400"))
+WA_POOL_SIZE = int(os.getenv("WA_POOL_SIZE", "10"))
+WA_MAX_RPS = float(os.getenv("WA_MAX_RPS", "80"))  # Graph API throughput tier
+WA_MAX_RETRIES = int(os.getenv("WA_MAX_RETRIES", "4"))
+# Document namespace each sender searches, e.g. WA_NAMESPACES='{"15551234567": "hr"}'
+WA_NAMESPACES = json.loads(os.getenv("WA_NAMESPACES", "{}"))
+WA_DEFAULT_NAMESPACE = os.getenv("WA_DEFAULT_NAMESPACE", "")
 
 # For production (DEBUG=False), enable hashed/compressed files:
 if not DEBUG:
@@ -2,13 +2,24 @@ from __future__ import annotations
 
 import json
 import logging
-from typing import Any, Dict
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
 
 import requests
+from requests.adapters import HTTPAdapter
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
+# WhatsApp rejects text bodies longer than this
+MAX_BODY_CHARS = 4096
+# Sends are not idempotent: only retry when the request was never processed.
+# A 5xx or a read timeout may already have delivered the message.
+_RETRY_STATUSES = {429}
+_MAX_RETRY_DELAY = 30.0
+
 
 def _require_setting(name: str) -> str:
     value = getattr(settings, name, "") or ""
@@ -18,9 +29,132 @@ def _require_setting(name: str) -> str:
     return value
 
 
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a token is available."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+_SESSION: Optional[requests.Session] = None
+_BUCKET: Optional[TokenBucket] = None
+_INIT_LOCK = threading.Lock()
+
+
+def _session() -> requests.Session:
+    """Process-wide keep-alive session so replies reuse TLS connections."""
+    global _SESSION
+    if _SESSION is None:
+        with _INIT_LOCK:
+            if _SESSION is None:
+                pool = int(getattr(settings, "WA_POOL_SIZE", 10) or 10)
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool)
+                session.mount("https://", adapter)
+                _SESSION = session
+    return _SESSION
+
+
+def _bucket() -> TokenBucket:
+    global _BUCKET
+    if _BUCKET is None:
+        with _INIT_LOCK:
+            if _BUCKET is None:
+                rate = float(getattr(settings, "WA_MAX_RPS", 80) or 80)
+                _BUCKET = TokenBucket(rate=rate, capacity=max(1.0, rate))
+    return _BUCKET
+
+
+def split_message(message: str, limit: int = MAX_BODY_CHARS) -> List[str]:
+    """
+    Split a long answer into ordered parts that fit the WhatsApp body limit,
+    preferring paragraph, line, sentence and word boundaries.
+    """
+    message = message.strip()
+    if len(message) <= limit:
+        return [message]
+
+    # Leave room for a "(i/n) " prefix on every part
+    room = limit - 12
+    parts: List[str] = []
+    rest = message
+    while len(rest) > room:
+        window = rest[:room]
+        cut = -1
+        for sep in ("\n\n", "\n", ". ", " "):
+            idx = window.rfind(sep)
+            if idx > room // 2:
+                cut = idx + len(sep)
+                break
+        if cut <= 0:
+            cut = room
+        parts.append(rest[:cut].strip())
+        rest = rest[cut:].strip()
+    if rest:
+        parts.append(rest)
+
+    total = len(parts)
+    return [f"({i}/{total}) {p}" for i, p in enumerate(parts, 1)]
+
+
+def _post_with_retry(url: str, headers: Dict[str, str], payload: Dict[str, Any]) -> requests.Response:
+    retries = int(getattr(settings, "WA_MAX_RETRIES", 4) or 0)
+    attempt = 0
+    while True:
+        _bucket().acquire()
+        try:
+            response = _session().post(url, headers=headers, json=payload, timeout=10)
+        except requests.ReadTimeout as exc:
+            raise RuntimeError(f"WhatsApp API did not answer in time: {exc}") from exc
+        except requests.ConnectionError as exc:
+            # Includes ConnectTimeout: the message never reached the API
+            if attempt >= retries:
+                raise RuntimeError(f"WhatsApp API unreachable: {exc}") from exc
+            response = None
+
+        if response is not None and response.status_code not in _RETRY_STATUSES:
+            return response
+        if attempt >= retries:
+            return response
+
+        delay = min(_MAX_RETRY_DELAY, 0.5 * (2 ** attempt)) * (0.5 + random.random())
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                delay = min(_MAX_RETRY_DELAY, max(delay, float(retry_after)))
+            except ValueError:
+                pass
+        logger.warning(
+            "WhatsApp send got %s; retrying in %.1fs (%s/%s)",
+            response.status_code if response is not None else "connection error",
+            delay, attempt + 1, retries,
+        )
+        time.sleep(delay)
+        attempt += 1
+
+
 def send_text_message(recipient: str, message: str) -> Dict[str, Any]:
     """
     Send a plain text WhatsApp message to `recipient` using the Business Cloud API.
+
+    Messages over the body limit are sent as numbered parts in order; the
+    API responses are then returned under "parts".
     """
     access_token = _require_setting("WA_ACCESS_TOKEN")
     phone_number_id = _require_setting("WA_PHONE_NUMBER_ID")
@@ -31,21 +165,26 @@ def send_text_message(recipient: str, message: str) -> Dict[str, Any]:
         "Authorization": f"Bearer {access_token}",
         "Content-Type": "application/json",
     }
-    payload = {
-        "messaging_product": "whatsapp",
-        "recipient_type": "individual",
-        "to": recipient,
-        "type": "text",
-        "text": {"preview_url": False, "body": message},
-    }
 
-    response = requests.post(url, headers=headers, json=payload, timeout=10)
-    if response.status_code >= 400:
-        logger.error("WhatsApp send failed (%s): %s", response.status_code, response.text)
-        raise RuntimeError(f"WhatsApp API error {response.status_code}")
+    results: List[Dict[str, Any]] = []
+    for body in split_message(message):
+        payload = {
+            "messaging_product": "whatsapp",
+            "recipient_type": "individual",
+            "to": recipient,
+            "type": "text",
+            "text": {"preview_url": False, "body": body},
+        }
+
+        response = _post_with_retry(url, headers, payload)
+        if response.status_code >= 400:
+            logger.error("WhatsApp send failed (%s): %s", response.status_code, response.text)
+            raise RuntimeError(f"WhatsApp API error {response.status_code}")
+
+        try:
+            results.append(response.json())
+        except json.JSONDecodeError:
+            logger.warning("WhatsApp API returned non-JSON response: %s", response.text)
+            results.append({"raw": response.text})
 
-    try:
-        return response.json()
-    except json.JSONDecodeError:
-        logger.warning("WhatsApp API returned non-JSON response: %s", response.text)
-        return {"raw": response.text}
+    return results[0] if len(results) == 1 else {"parts": results}
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+
+from .models import SeenMessage
+
+logger = logging.getLogger(__name__)
+
+_PRUNE_EVERY = 3600.0  # seconds between sweeps of expired message ids
+_prune_lock = threading.Lock()
+_pruned_at = 0.0
+
+
+def _prune(cutoff) -> None:
+    global _pruned_at
+    now = time.monotonic()
+    with _prune_lock:
+        if now - _pruned_at < _PRUNE_EVERY:
+            return
+        _pruned_at = now
+    try:
+        SeenMessage.objects.filter(seen_at__lt=cutoff).delete()
+    except DatabaseError as exc:
+        logger.warning("Could not prune seen WhatsApp message ids: %s", exc)
+
+
+def mark_seen(message_id: str) -> bool:
+    """
+    Record a WhatsApp message id. Returns False if it was already seen within
+    WA_DEDUPE_TTL seconds, i.e. the webhook is a redelivery.
+
+    Ids live in a unique-keyed table, so every worker and restart shares them.
+    """
+    ttl = int(getattr(settings, "WA_DEDUPE_TTL", 86400) or 86400)
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=ttl)
+    _prune(cutoff)
+    try:
+        with transaction.atomic():
+            SeenMessage.objects.create(message_id=message_id, seen_at=now)
+        return True
+    except IntegrityError:
+        # An expired row counts as unseen; the conditional update lets one request claim it
+        return SeenMessage.objects.filter(message_id=message_id, seen_at__lt=cutoff).update(seen_at=now) == 1
+
+
+def forget(message_id: str) -> None:
+    """Allow a message id to be processed again (e.g. when it could not be queued)."""
+    SeenMessage.objects.filter(message_id=message_id).delete()
+
+
+class BoundedExecutor:
+    """Thread pool that refuses work instead of queueing without limit."""
+
+    def __init__(self, max_workers: int, max_pending: int):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="whatsapp")
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+
+    def try_submit(self, fn: Callable, *args) -> bool:
+        if not self._slots.acquire(blocking=False):
+            return False
+        try:
+            future = self._pool.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _f: self._slots.release())
+        return True
+
+
+_EXECUTOR: Optional[BoundedExecutor] = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def _executor() -> BoundedExecutor:
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        with _EXECUTOR_LOCK:
+            if _EXECUTOR is None:
+                workers = max(1, int(getattr(settings, "WA_WORKERS", 4) or 1))
+                pending = max(0, int(getattr(settings, "WA_MAX_PENDING", 100) or 0))
+                _EXECUTOR = BoundedExecutor(workers, pending)
+                logger.info("WhatsApp executor started with %s workers, %s pending slots", workers, pending)
+    return _EXECUTOR
+
+
+def namespace_for(from_number: str) -> str:
+    """Document namespace a sender's questions are answered from."""
+    mapping = getattr(settings, "WA_NAMESPACES", {}) or {}
+    return mapping.get(from_number, getattr(settings, "WA_DEFAULT_NAMESPACE", "") or "")
+
+
+def handle_message(from_number: str, text_body: str) -> None:
+    """Answer one inbound message with the RAG pipeline and reply to the sender."""
+    from chatbot.chatlog import log_chat
+    from chatbot.utils import metrics
+    from chatbot.utils.rag_pipeline import ask as rag_ask
+
+    from .client import send_text_message
+
+    close_old_connections()
+    try:
+        answer_text = "Sorry, I'm having trouble answering that right now."
+        sources = []
+        timings = {}
+        metrics.inc("questions_total", endpoint="whatsapp")
+        try:
+            with metrics.trace() as t:
+                result = rag_ask(text_body, k=4, namespace=namespace_for(from_number))
+            timings = t.stages
+            answer_text = (result.get("answer") or "").strip() or "I could not find an answer to that."
+            sources = result.get("sources", [])
+        except Exception as exc:
+            logger.exception("RAG pipeline failed for WhatsApp message: %s", exc)
+
+        log_chat(text_body, answer_text, sources, timings)
+
+        try:
+            send_text_message(from_number, answer_text)
+        except Exception as exc:
+            logger.exception("Failed to send WhatsApp reply: %s", exc)
+    finally:
+        close_old_connections()
+
+
+def dispatch(from_number: str, text_body: str) -> bool:
+    """Queue a message for background handling. Returns False when the executor is full."""
+    return _executor().try_submit(handle_message, from_number, text_body)
@@ -0,0 +1,11 @@
+from django.db import models
+from django.utils import timezone
+
+
+class SeenMessage(models.Model):
+    # Webhook message ids already accepted; the unique key makes the insert the dedupe check
+    message_id = models.CharField(max_length=255, unique=True)
+    seen_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return self.message_id
@@ -7,10 +7,7 @@ from django.conf import settings
 from django.http import HttpRequest, HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 
-from chatbot.models import ChatLog
-from chatbot.utils.rag_pipeline import ask as rag_ask
-
-from .client import send_text_message
+from .dispatcher import dispatch, forget, mark_seen
 
 logger = logging.getLogger(__name__)
 
@@ -38,6 +35,7 @@ def webhook(request: HttpRequest):
         return HttpResponse(status=400)
 
     handled = False
+    rejected = False
     entries = payload.get("entry", [])
     for entry in entries:
         changes = entry.get("changes", [])
@@ -46,6 +44,7 @@ def webhook(request: HttpRequest):
             messages = value.get("messages", []) or []
             for msg in messages:
                 handled = True
+                msg_id = msg.get("id")
                 msg_type = msg.get("type")
                 from_number = msg.get("from")
                 if msg_type != "text":
@@ -57,23 +56,21 @@ def webhook(request: HttpRequest):
                     logger.info("Skipping WhatsApp message with missing text or sender: %s", msg)
                     continue
 
-                answer_text = "Sorry, I'm having trouble answering that right now."
-                sources = []
-                try:
-                    result = rag_ask(text_body, k=5)
-                    answer_text = (result.get("answer") or "").strip() or "I could not find an answer to that."
-                    sources = result.get("sources", [])
-                except Exception as exc:
-                    logger.exception("RAG pipeline failed for WhatsApp message: %s", exc)
-
-                ChatLog.objects.create(question=text_body, answer=answer_text, sources=sources)
+                if msg_id and not mark_seen(msg_id):
+                    logger.info("Dropping redelivered WhatsApp message id=%s", msg_id)
+                    continue
 
-                try:
-                    send_text_message(from_number, answer_text)
-                except Exception as exc:
-                    logger.exception("Failed to send WhatsApp reply: %s", exc)
+                # Answer in the background so the webhook returns before Meta's retry timeout
+                if not dispatch(from_number, text_body):
+                    logger.warning("WhatsApp executor full; asking Meta to redeliver id=%s", msg_id)
+                    if msg_id:
+                        forget(msg_id)
+                    rejected = True
 
     if not handled:
         logger.debug("Received WhatsApp webhook with no messages: %s", payload)
 
+    if rejected:
+        return JsonResponse({"ok": False, "error": "busy"}, status=503)
+
     return JsonResponse({"ok": True})